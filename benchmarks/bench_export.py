@@ -0,0 +1,70 @@
+"""
+Benchmark: IPA27_Results.xlsx export, legacy pandas/openpyxl path vs src.export.
+
+Usage (from the project root):
+    python benchmarks/bench_export.py [--periods 64] [--regions 18] [--indicators 40] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.export import write_results_workbook
+
+def synthetic_master(n_periods, n_regions, n_indicators, seed=0):
+    rng = np.random.default_rng(seed)
+    periods = [f"{2010 + i // 4}-Q{i % 4 + 1}" for i in range(n_periods)]
+    regions = [f"R{r:02d}" for r in range(n_regions)]
+    idx = pd.MultiIndex.from_product([periods, regions], names=['Periodo', 'Region']).to_frame(index=False)
+    values = rng.normal(50, 10, size=(len(idx), n_indicators))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    return pd.concat([idx, pd.DataFrame(values, columns=[f"IND_{i:02d}" for i in range(n_indicators)])], axis=1)
+
+def legacy_export(merged_df, path):
+    """The export previously inlined in IPA27Consolidator.consolidate."""
+    with pd.ExcelWriter(path) as writer:
+        merged_df.to_excel(writer, sheet_name='Master_Table', index=False)
+        for reg in merged_df['Region'].unique():
+            merged_df[merged_df['Region'] == reg].to_excel(writer, sheet_name=f'Data_{reg}', index=False)
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--periods', type=int, default=64)
+    parser.add_argument('--regions', type=int, default=18)
+    parser.add_argument('--indicators', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_master(args.periods, args.regions, args.indicators)
+    print(f"📊 Master table: {len(df)} rows x {df.shape[1]} columns, {args.regions} regional sheets")
+    tmp = tempfile.mkdtemp()
+    candidates = [('legacy (pandas + openpyxl)', lambda p: legacy_export(df, p))]
+    for engine in ('xlsxwriter', 'openpyxl'):
+        try:
+            __import__(engine)
+        except ImportError:
+            print(f"   ⚠️ {engine} not installed, skipping")
+            continue
+        candidates.append((f"src.export ({engine})", lambda p, e=engine: write_results_workbook(df, p, engine=e)))
+
+    baseline = None
+    for label, fn in candidates:
+        path = os.path.join(tmp, f"{len(label)}.xlsx")
+        t = best_of(lambda: fn(path), args.repeat)
+        baseline = baseline or t
+        print(f"   {label:<30} {t:8.3f} s  (x{baseline / t:.1f})  {os.path.getsize(path) / 1e6:.2f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Load and resilience harness for the connectors against the local stand-in server.
+
+1. fetch: --requests GETs of the URLs the connectors request (TEMPUS, JAXI, IECA, MIR crime, REE),
+   --concurrency at a time through src.http_client.HttpClient (no response cache). Reports
+   throughput, outcome counts and p50/p95/p99 latency overall and per source.
+2. connectors: each download method run once against the same faulty server (save=False),
+   with its rows, time and outcome, to see which faults are retried, fall back or are lost.
+   Also checks that running-year quarters also present in DatosBalanceAnt keep its values.
+
+The stand-in is started in-process with the given faults, or pass --url to use a running one
+(benchmarks/standin_server.py).
+
+Usage (from the project root):
+    python benchmarks/bench_load.py [--requests 500] [--concurrency 16] [--latency 50]
+        [--error-rate 0.05] [--truncate-rate 0.02] [--rate-limit 50] [--skip-connectors] [--json out.json]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import itertools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+import numpy as np
+import pandas as pd
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+from standin_server import fault_arguments, from_arguments
+from src.config import REE_GEO_IDS
+from src.http_client import HttpClient, get_client, set_client
+from src.connectors import IneConnector, ReeConnector, CrimeConnector
+from src import extractors
+
+def fetch_mix(tables=8):
+    """(source, url, params) of the requests the connectors make, one per endpoint kind."""
+    ine, crime, ree = IneConnector(), CrimeConnector(), ReeConnector()
+    jobs = [('tempus', f"{ine.base_url}DATOS_TABLA/SYN{t}?date=20150101:", None) for t in range(tables)]
+    jobs += [('jaxi', f"{ine.jaxi_base_urls[0]}SYN{t}.csv", None) for t in range(tables)]
+    jobs += [('ieca', extractors.GDP_AND_URL, None), ('tempus', extractors.GDP_ESP_URL, None)]
+    jobs += [('crime', url, None) for _, _, _, url in crime._candidates(2016)]
+    jobs += [('ree', ree.base_url + ree.widget, ree._params(geo_id, year))
+             for geo_id in list(REE_GEO_IDS)[:6] for year in (2022, 2023)]
+    return jobs
+
+def fetch(client, job):
+    """(source, seconds, outcome) of one GET, reading the whole body."""
+    source, url, params = job
+    start = time.perf_counter()
+    try:
+        r = client.get(url, params=params, timeout=30, use_cache=False)
+        r.content
+        outcome = str(r.status_code)
+    except requests.RequestException as e:
+        outcome = type(e).__name__
+    return source, time.perf_counter() - start, outcome
+
+def percentiles(seconds):
+    p50, p95, p99 = np.percentile(np.asarray(seconds) * 1000, [50, 95, 99]) if seconds else (np.nan,) * 3
+    return {'p50_ms': round(float(p50), 1), 'p95_ms': round(float(p95), 1), 'p99_ms': round(float(p99), 1)}
+
+def run_fetch(client, n_requests, concurrency):
+    jobs = list(itertools.islice(itertools.cycle(fetch_mix()), n_requests))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda job: fetch(client, job), jobs))
+    elapsed = time.perf_counter() - start
+    report = {'requests': len(results), 'seconds': round(elapsed, 3),
+              'throughput_rps': round(len(results) / elapsed, 1),
+              'outcomes': dict(Counter(o for _, _, o in results)), **percentiles([s for _, s, _ in results])}
+    by_source = {}
+    for source, seconds, outcome in results:
+        by_source.setdefault(source, []).append((seconds, outcome))
+    report['sources'] = {
+        source: {'requests': len(rows), 'ok': sum(o == '200' for _, o in rows), **percentiles([s for s, _ in rows])}
+        for source, rows in sorted(by_source.items())
+    }
+    return report
+
+def closed_year_kept(crime, df, n_regions):
+    """
+    For the running year's quarters, whose stand-in DatosBalanceAct values differ from the
+    DatosBalanceAnt ones: True when download_crime kept the Ant (closed-year) values.
+    """
+    year = pd.Timestamp.now().year
+    got = df[df['Año'] == year].set_index(['Trimestre', 'Region', 'Categoria'])['Valor_Acumulado']
+    if got.empty:
+        return None
+    expected = pd.concat([crime._parse(synthetic.crime_csv(year, q, n_regions), year)[1].assign(Trimestre=q)
+                          for q in got.index.unique('Trimestre')])
+    expected = expected.set_index(['Trimestre', 'Region', 'Categoria'])['Valor_Acumulado']
+    return bool(np.allclose(got.sort_index(), expected.reindex(got.sort_index().index)))
+
+def run_connectors(client, n_regions):
+    """Rows, seconds and outcome of each download method against the stand-in."""
+    ine, crime = IneConnector(client=client), CrimeConnector(client=client)
+    ree = ReeConnector(client=client, rate=50, burst=50, checkpoint_dir=tempfile.mkdtemp(prefix='ipa27_ree_'))
+
+    def pib():
+        previous = get_client()
+        set_client(client)
+        try:
+            return extractors.extract_pib(save=False)
+        finally:
+            set_client(previous)
+
+    cases = {
+        'download_tempus': lambda: ine.download_tempus('SYN0', 'SYN_TEMPUS', save=False),
+        'download_jaxi (fallback)': lambda: ine.download_jaxi('SYN_WIDE', 'SYN_WIDE', save=False),
+        'download_jaxi_long': lambda: ine.download_jaxi_long({'ESP': 'SYN1', 'AND': 'SYN2'}, 'SYN_LONG', save=False),
+        'extract_pib (INE + IECA)': pib,
+        'download_crime': lambda: crime.download_crime('SYN_CRIME', start_year=2016, save=False),
+        'download_renewables': lambda: ree.download_renewables('SYN_REE', years=[2022, 2023], save=False),
+    }
+    report, outputs = {}, {}
+    for name, fn in cases.items():
+        start = time.perf_counter()
+        log = io.StringIO()
+        try:
+            with redirect_stdout(log):
+                df = fn()
+            outcome = 'ok' if df is not None and len(df) else 'no data'
+        except Exception as e:
+            df, outcome = None, f"{type(e).__name__}: {e}"
+        outputs[name] = df
+        report[name] = {'seconds': round(time.perf_counter() - start, 3), 'rows': 0 if df is None else len(df),
+                        'outcome': outcome, 'warnings': sum(line.lstrip().startswith(('❌', '⚠️')) for line in log.getvalue().splitlines())}
+    if ree.failures:
+        report['download_renewables']['failed_cells'] = len(ree.failures)
+    if crime.report is not None:
+        report['download_crime']['files'] = crime.report['Estado'].value_counts().to_dict()
+    if outputs['download_crime'] is not None:
+        report['download_crime']['keeps_closed_year'] = closed_year_kept(crime, outputs['download_crime'], n_regions)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='base URL of a running stand-in server (default: start one)')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--skip-connectors', action='store_true')
+    parser.add_argument('--json', help='also write the report to this file')
+    fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.url is None:
+        server = from_arguments(args)
+        args.url = server.start()
+    print(f"🧪 Stand-in {args.url}: latency {args.latency:.0f} ms, errors {args.error_rate:.0%}, "
+          f"truncated {args.truncate_rate:.0%}, rate limit {args.rate_limit or 'none'}")
+    client = HttpClient(max_per_host=args.concurrency, pool_size=args.concurrency, standin=args.url)
+    try:
+        report = {'fetch': run_fetch(client, args.requests, args.concurrency)}
+        f = report['fetch']
+        print(f"⏱️ {f['requests']} requests in {f['seconds']:.1f}s: {f['throughput_rps']:.1f} req/s, "
+              f"p50 {f['p50_ms']:.0f} ms, p95 {f['p95_ms']:.0f} ms, p99 {f['p99_ms']:.0f} ms")
+        print(f"   outcomes: {', '.join(f'{k} {v}' for k, v in sorted(f['outcomes'].items()))}")
+        for source, s in f['sources'].items():
+            print(f"   {source:<7} {s['ok']:>4}/{s['requests']:<4} ok  p50 {s['p50_ms']:7.1f}  p95 {s['p95_ms']:7.1f}  p99 {s['p99_ms']:7.1f} ms")
+        if not args.skip_connectors:
+            report['connectors'] = run_connectors(client, args.regions)
+            print("🔌 Connectors:")
+            for name, c in report['connectors'].items():
+                print(f"   {'✅' if c['outcome'] == 'ok' else '❌'} {name:<26} {c['rows']:>6} rows  {c['seconds']:6.2f} s  "
+                      f"{c['warnings']} warnings  {c['outcome']}")
+            kept = report['connectors']['download_crime'].get('keeps_closed_year')
+            if kept is not None:
+                print(f"   {'✅' if kept else '❌'} duplicated running-year quarters keep the DatosBalanceAnt values")
+        if server is not None:
+            report['server'] = server.stats
+    finally:
+        if server is not None:
+            server.stop()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as out:
+            json.dump(report, out, indent=1, ensure_ascii=False)
+        print(f"💾 Report: {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Offline benchmark suite: connectors, consolidation and export on synthetic payloads.
+
+TEMPUS, JAXI, IECA and CIS-like payloads (see synthetic.py) are generated at the chosen scale and
+served from an offline response cache, so the real parsers run with no network. Each case is
+timed best-of --repeat and compared against benchmarks/baselines.json for the same scale; the
+run fails (exit 1) if a case is more than --tolerance slower than its baseline. Baselines are
+only comparable on the machine that recorded them (see their 'machine' entry): re-record them
+with --save-baseline after changing machines.
+
+Cases:
+    tempus       IneConnector.download_tempus parsing of a DATOS_TABLA payload
+    jaxi         IneConnector.download_jaxi reshaping of a wide ISO-8859-15 CSV
+    ieca         extract_pib on the INE + IECA GDP payloads
+    cis          weighted stats, alpha sensitivity and bootstrap on CIS-like microdata
+    consolidate  IPA27Consolidator.consolidate (full rebuild, master CSV + Excel)
+    export       write_results_workbook of the master table
+    end_to_end   TEMPUS + JAXI download, store, consolidate and export
+
+Usage (from the project root):
+    python benchmarks/bench_offline.py [--scale small|default|large] [--regions N] [--series N]
+        [--periods N] [--respondents N] [--repeat 3] [--cases tempus,jaxi,...]
+        [--save-baseline] [--tolerance 0.5] [--min-delta 0.02]
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+from src.connectors import IneConnector
+from src.consolidator import IPA27Consolidator
+from src.export import write_results_workbook
+from src.storage import save_indicator
+from src.survey import weighted_stats
+from src.sensitivity import AlphaSensitivity, bootstrap_index
+from src import extractors, http_client
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# regions x series x periods (and CIS respondents per study, one study per period)
+SCALES = {
+    'small': {'regions': 20, 'series': 2, 'periods': 24, 'respondents': 500},
+    'default': {'regions': 20, 'series': 10, 'periods': 40, 'respondents': 2500},
+    'large': {'regions': 20, 'series': 50, 'periods': 120, 'respondents': 5000},
+}
+
+TEMPUS_TABLE = 'SYN_TEMPUS'
+JAXI_TABLE = 'SYN_JAXI'
+
+def build_payloads(p):
+    return {
+        f"{synthetic.TEMPUS_BASE}DATOS_TABLA/{TEMPUS_TABLE}?date=20150101:":
+            synthetic.tempus_payload(p['regions'], p['series'], p['periods']),
+        f"{synthetic.JAXI_BASE}{JAXI_TABLE}.csv": synthetic.jaxi_csv(p['regions'], p['series'], p['periods']),
+        extractors.GDP_ESP_URL: synthetic.gdp_esp_payload(p['periods']),
+        extractors.GDP_AND_URL: synthetic.ieca_payload(p['periods']),
+    }
+
+def store_indicators(ine, directory, n_series):
+    """Downloads the synthetic TEMPUS and JAXI tables and stores one indicator per series."""
+    tempus = ine.download_tempus(TEMPUS_TABLE, 'SYN_TEMPUS', save=False)
+    jaxi = ine.download_jaxi(JAXI_TABLE, 'SYN_JAXI', save=False)
+    for s in range(n_series):
+        save_indicator(tempus.assign(Indicador=f"SYN_T{s:02d}", Valor=tempus['Valor'] + s), f"SYN_T{s:02d}", directory)
+    save_indicator(jaxi, 'SYN_JAXI', directory)
+
+def make_cases(p, client, work):
+    ine = IneConnector(client=client)
+    microdata = synthetic.cis_microdata(p['periods'], p['respondents'])
+    indicators_dir = os.path.join(work, 'indicadores')
+    store_indicators(ine, indicators_dir, p['series'])
+    master = IPA27Consolidator(directory=indicators_dir).consolidate(incremental=False)
+
+    def ieca():
+        previous = http_client.get_client()
+        http_client.set_client(client)
+        try:
+            return extractors.extract_pib(save=False)
+        finally:
+            http_client.set_client(previous)
+
+    def cis():
+        weighted_stats(microdata, ['ESTU', 'CCAA'], ['SCORE_POLITICO_BRUTO', 'INDICE_ANCLAJE', 'PROBVOTO'],
+                       stats=('mean', 'std', 'n', 'neff', 'q'))
+        AlphaSensitivity(microdata, weight='PESO').sweep()
+        return bootstrap_index(microdata, 'PROBVOTO', n_boot=200)
+
+    def consolidate():
+        return IPA27Consolidator(directory=indicators_dir).consolidate(incremental=False)
+
+    def end_to_end():
+        directory = os.path.join(work, 'e2e')
+        shutil.rmtree(directory, ignore_errors=True)
+        store_indicators(ine, directory, p['series'])
+        return IPA27Consolidator(directory=directory).consolidate(incremental=False)
+
+    return {
+        'tempus': lambda: ine.download_tempus(TEMPUS_TABLE, 'SYN_TEMPUS', save=False),
+        'jaxi': lambda: ine.download_jaxi(JAXI_TABLE, 'SYN_JAXI', save=False),
+        'ieca': ieca,
+        'cis': cis,
+        'consolidate': consolidate,
+        'export': lambda: write_results_workbook(master, os.path.join(work, 'export.xlsx')),
+        'end_to_end': end_to_end,
+    }
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):  # The connectors report every download
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    return min(times)
+
+def machine():
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count()}
+
+def load_baselines():
+    try:
+        with open(BASELINES_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=SCALES, default='default')
+    for key in SCALES['default']:
+        parser.add_argument(f'--{key}', type=int, help=f'override the scale preset ({key})')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', help='comma-separated subset of cases')
+    parser.add_argument('--save-baseline', action='store_true', help='store these timings as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown over the baseline (0.5 = +50%%)')
+    parser.add_argument('--min-delta', type=float, default=0.02, help='seconds of slowdown always tolerated (timer noise)')
+    args = parser.parse_args()
+
+    p = {key: getattr(args, key) or value for key, value in SCALES[args.scale].items()}
+    scale_key = '_'.join(f"{key}={value}" for key, value in p.items())
+    print(f"📊 Offline benchmarks ({scale_key}, best of {args.repeat})")
+
+    work = tempfile.mkdtemp(prefix='ipa27_bench_')
+    try:
+        client = synthetic.seed_cache(os.path.join(work, 'http_cache'), build_payloads(p))
+        with redirect_stdout(io.StringIO()):
+            cases = make_cases(p, client, work)
+        selected = args.cases.split(',') if args.cases else list(cases)
+        unknown = [c for c in selected if c not in cases]
+        if unknown:
+            parser.error(f"unknown cases: {', '.join(unknown)}")
+        results = {name: round(best_of(cases[name], args.repeat), 4) for name in selected}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    baselines = load_baselines()
+    baseline = baselines.get(scale_key, {}).get('results', {})
+    failed = []
+    for name, t in results.items():
+        ref = baseline.get(name)
+        if ref is None:
+            print(f"   {name:<12} {t:8.3f} s  (no baseline)")
+            continue
+        slow = t > ref * (1 + args.tolerance) and t - ref > args.min_delta
+        failed += [name] if slow else []
+        print(f"   {'❌' if slow else '✅'} {name:<12} {t:8.3f} s  baseline {ref:.3f} s  (x{t / ref:.2f})")
+
+    if args.save_baseline:
+        entry = baselines.setdefault(scale_key, {'results': {}})
+        entry['machine'] = machine()
+        entry['saved'] = time.strftime('%Y-%m-%d')
+        entry['results'].update(results)
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f"💾 Baseline saved: {BASELINES_PATH}")
+    elif failed:
+        print(f"❌ Slower than baseline (+{args.tolerance:.0%}): {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
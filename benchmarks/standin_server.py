@@ -0,0 +1,254 @@
+"""
+Local stand-in for the INE TEMPUS / JAXI, IECA, MIR crime and REE endpoints, with fault injection.
+
+Paths and queries are those the connectors request (see src/connectors.py and src/extractors.py);
+bodies are synthetic (see synthetic.py). Every response can be delayed and, with the given
+probabilities, replaced by a 5xx error, a truncated body (full Content-Length, half the bytes,
+then the connection is closed) or, above --rate-limit requests per second, a 429.
+
+Point the connectors at it with IPA27_STANDIN_URL=http://127.0.0.1:8765 (or
+HttpClient(standin=...)); scheme and host are swapped, paths stay the same.
+
+Usage (from the project root):
+    python benchmarks/standin_server.py [--port 8765] [--latency 50] [--jitter 0.5] [--error-rate 0.05]
+        [--truncate-rate 0.02] [--rate-limit 20]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synthetic
+from src.http_client import TokenBucket
+
+JSON = 'application/json; charset=utf-8'
+CSV = 'text/csv; charset=ISO-8859-15'
+CRIME_SUFFIXES = {'001': 1, '004': 2, '007': 3, '010': 4}
+
+class Faults:
+    """Fault mix: latency (median ms, lognormal jitter) and error / truncation / rate-limit settings."""
+
+    def __init__(self, latency_ms=0.0, jitter=0.5, error_rate=0.0, truncate_rate=0.0, rate_limit=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.limiter = TokenBucket(rate_limit) if rate_limit else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """(delay in seconds, fault) for one request; fault is a 5xx status, 'truncate' or None."""
+        with self._lock:
+            delay = self.latency_ms / 1000 * self._random.lognormvariate(0, self.jitter) if self.latency_ms else 0.0
+            u = self._random.random()
+            status = self._random.choice((500, 502, 503))
+        if u < self.error_rate:
+            return delay, status
+        if u < self.error_rate + self.truncate_rate:
+            return delay, 'truncate'
+        return delay, None
+
+    def throttled(self):
+        """True when the request is over the rate limit (never blocks)."""
+        return self.limiter is not None and not self.limiter.try_acquire()
+
+class Payloads:
+    """Synthetic bodies per route, generated once per distinct request."""
+
+    def __init__(self, regions=20, series=3, periods=40, wide_tables=('SYN_WIDE',)):
+        self.regions = regions
+        self.series = series
+        self.periods = periods
+        self.wide_tables = set(wide_tables)
+        self.routes = [
+            (re.compile(r'/wstempus/js/ES/DATOS_TABLA/(?P<id>[^/?]+)'), self.tempus),
+            (re.compile(r'/wstempus/js/ES/DATOS_SERIE/(?P<id>[^/?]+)'), self.tempus_serie),
+            (re.compile(r'/jaxiT3/files/t/(?:es/)?(?P<kind>csv_bdsc|csv)/(?P<id>[^/]+)\.csv'), self.jaxi),
+            (re.compile(r'/institutodeestadisticaycartografia/.*/consulta/(?P<id>\d+)'), self.ieca),
+            (re.compile(r'/sec/jaxiPx/files/_px/es/csv_bdsc/DatosBalance(?P<src>Ant|Act)/l0/(?P<code>\d+)\.csv_bdsc'), self.crime),
+            (re.compile(r'/es/datos/generacion/evolucion-renovable-no-renovable'), self.ree),
+        ]
+
+    def route(self, path):
+        """Name of the source a path belongs to (for reports), or None."""
+        for pattern, handler in self.routes:
+            if pattern.search(path):
+                return handler.__name__
+        return None
+
+    def body(self, path, query):
+        """(status, content type, body) for a request path and its parsed query."""
+        for pattern, handler in self.routes:
+            match = pattern.search(path)
+            if match:
+                return handler(match, query)
+        return 404, JSON, b'{"error": "not found"}'
+
+    @staticmethod
+    def _seed(key):
+        return sum(ord(c) for c in key)
+
+    @lru_cache(maxsize=256)
+    def _tempus(self, table_id):
+        return synthetic.tempus_payload(self.regions, self.series, self.periods, seed=self._seed(table_id))
+
+    def tempus(self, match, query):
+        return 200, JSON, self._tempus(match['id'])
+
+    def tempus_serie(self, match, query):
+        return 200, JSON, synthetic.gdp_esp_payload(self.periods)
+
+    @lru_cache(maxsize=256)
+    def _jaxi(self, table_id, wide):
+        if wide:
+            return synthetic.jaxi_csv(self.regions, self.series, self.periods, seed=self._seed(table_id))
+        return synthetic.jaxi_long_csv(self.regions, self.series, self.periods, seed=self._seed(table_id))
+
+    def jaxi(self, match, query):
+        # Wide tables are only published as plain CSV: their csv_bdsc URLs 404, as on the real site
+        wide = match['id'] in self.wide_tables
+        if wide and match['kind'] == 'csv_bdsc':
+            return 404, 'text/html', b'<html>No encontrado</html>'
+        return 200, CSV, self._jaxi(match['id'], wide)
+
+    def ieca(self, match, query):
+        return 200, JSON, synthetic.ieca_payload(self.periods)
+
+    @lru_cache(maxsize=256)
+    def _crime(self, year, quarter, running=False):
+        # Running-year files are provisional: other values than the closed-year file of the same quarter
+        return synthetic.crime_csv(year, quarter, self.regions, seed=int(running))
+
+    def crime(self, match, query):
+        code = match['code']
+        quarter = CRIME_SUFFIXES.get(code[-3:])
+        head = code[:-3]
+        if quarter is None:
+            return 404, 'text/html', b''
+        if match['src'] == 'Act':
+            year = time.localtime().tm_year
+        else:
+            year = 2010 + int(head[:-1] if len(head) == 2 else head[:-2])  # '<y>9' before 2020, '<yy>09' after
+        return 200, 'text/csv; charset=utf-8', self._crime(year, quarter, match['src'] == 'Act')
+
+    def ree(self, match, query):
+        year = int(query.get('start_date', ['2023'])[0][:4])
+        return 200, JSON, synthetic.ree_payload(year)
+
+class StandInServer:
+    """Threaded stand-in server; start() runs it in the background and returns its base URL."""
+
+    def __init__(self, faults=None, payloads=None, host='127.0.0.1', port=0):
+        self.faults = faults or Faults()
+        self.payloads = payloads or Payloads()
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, route, outcome):
+        with self._stats_lock:
+            per_route = self.stats.setdefault(route or 'unknown', {})
+            per_route[outcome] = per_route.get(outcome, 0) + 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, as the real hosts
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, content_type, body, headers=()):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                route = server.payloads.route(parts.path)
+                if parts.path == '/__stats__':
+                    return self._send(200, JSON, json.dumps(server.stats).encode())
+                if server.faults.throttled():
+                    server._count(route, '429')
+                    return self._send(429, JSON, b'{"error": "Too Many Requests"}', [('Retry-After', '1')])
+                delay, fault = server.faults.draw()
+                if delay:
+                    time.sleep(delay)
+                if isinstance(fault, int):
+                    server._count(route, str(fault))
+                    return self._send(fault, 'text/html', b'<html>Error</html>')
+                status, content_type, body = server.payloads.body(parts.path, parse_qs(parts.query))
+                if fault == 'truncate' and status == 200:
+                    server._count(route, 'truncated')
+                    self.send_response(200)
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                    return
+                server._count(route, str(status))
+                self._send(status, content_type, body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='standin-server', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def fault_arguments(parser):
+    """Adds the fault options shared by this script and the load harness."""
+    parser.add_argument('--latency', type=float, default=0.0, help='median response delay (ms)')
+    parser.add_argument('--jitter', type=float, default=0.5, help='lognormal sigma of the delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 500/502/503 responses')
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='share of truncated bodies')
+    parser.add_argument('--rate-limit', type=float, default=None, help='requests per second before 429s')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--regions', type=int, default=20)
+    parser.add_argument('--series', type=int, default=3)
+    parser.add_argument('--periods', type=int, default=40)
+
+def from_arguments(args, port=0):
+    faults = Faults(args.latency, args.jitter, args.error_rate, args.truncate_rate, args.rate_limit, args.seed)
+    return StandInServer(faults, Payloads(args.regions, args.series, args.periods), port=port)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    fault_arguments(parser)
+    args = parser.parse_args()
+    server = from_arguments(args, port=args.port)
+    print(f"🧪 Stand-in server on {server.url} (IPA27_STANDIN_URL={server.url}); stats at {server.url}/__stats__")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Synthetic INE / IECA / CIS payloads for the offline benchmarks.
+
+Payloads mimic what the sources return (TEMPUS JSON, JAXI semicolon CSV in ISO-8859-15 with
+Spanish decimals, IECA REST JSON, MIR crime balance CSV, REE REData JSON, CIS-like respondent
+microdata) at a configurable scale of
+regions x series x periods. seed_cache() stores them in a ResponseCache under the URLs the
+connectors request, so the real HTTP client, cache and parsers run without network access.
+"""
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+import requests
+from requests.structures import CaseInsensitiveDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config import REGIONS, CCAA_CODES, CRIME_CATEGORIES
+from src.cache import ResponseCache
+from src.http_client import HttpClient
+from src.connectors import IneConnector
+
+TEMPUS_BASE = IneConnector().base_url
+JAXI_BASE = IneConnector().jaxi_base_urls[0]
+
+def region_names(n_regions):
+    """The first n_regions official names (España first), as they appear in series names."""
+    return list(REGIONS.values())[:min(n_regions, len(REGIONS))]
+
+def quarter_starts(n_periods, first_year=2015):
+    return pd.date_range(f"{first_year}-01-01", periods=n_periods, freq='QS')
+
+def madrid_midnight_ms(dates):
+    """INE timestamps: local midnight of each date, i.e. 22:00/23:00 UTC the day before."""
+    local = pd.DatetimeIndex(dates).tz_localize('Europe/Madrid')
+    return local.tz_convert('UTC').tz_localize(None).as_unit('ms').asi8.tolist()
+
+def tempus_payload(n_regions, n_series, n_periods, seed=0):
+    """DATOS_TABLA JSON: one series per (region, breakdown), quarterly points."""
+    rng = np.random.default_rng(seed)
+    dates = quarter_starts(n_periods)
+    fechas = madrid_midnight_ms(dates)
+    series = []
+    for s in range(n_series):
+        for region in region_names(n_regions):
+            values = np.round(50 + np.cumsum(rng.normal(0, 1, n_periods)), 2)
+            series.append({
+                'COD': f"SYN{s:03d}{len(series):05d}",
+                'Nombre': f"{region}. Serie sintética {s}. Total. ",
+                'FK_Unidad': 3, 'FK_Escala': 1,
+                'Data': [{'Fecha': f, 'FK_TipoDato': 1, 'FK_Periodo': 19 + d.quarter, 'Anyo': d.year,
+                          'Valor': float(v), 'Secreto': False}
+                         for f, d, v in zip(fechas, dates, values)]
+            })
+    return json.dumps(series).encode('utf-8')
+
+def spanish_number(x):
+    """1234.5 -> '1.234,5' (JAXI files use '.' for thousands and ',' for decimals)."""
+    return f"{x:,.1f}".replace(',', ' ').replace('.', ',').replace(' ', '.')
+
+def jaxi_csv(n_regions, n_series, n_periods, seed=0, first_year=2000):
+    """Wide JAXI CSV (description column, one column per year), ISO-8859-15 encoded."""
+    rng = np.random.default_rng(seed)
+    years = [str(first_year + i) for i in range(n_periods)]
+    lines = [';'.join(['Comunidades y Ciudades Autónomas'] + years[::-1])]
+    for s in range(n_series):
+        for region in region_names(n_regions):
+            values = rng.uniform(100, 20000, n_periods)
+            cells = [spanish_number(v) if rng.random() > 0.02 else '..' for v in values]
+            lines.append(';'.join([f"{region} (línea {s})"] + cells))
+    return ('\r\n'.join(lines) + '\r\n').encode('ISO-8859-15')
+
+def jaxi_long_csv(n_regions, n_series, n_periods, seed=0, first_year=2000):
+    """Long JAXI CSV (csv_bdsc: one row per region, breakdown and year), ISO-8859-15 encoded."""
+    rng = np.random.default_rng(seed)
+    lines = ['Comunidades y Ciudades Autónomas;Desglose;Periodo;Total']
+    for region in region_names(n_regions):
+        for s in range(n_series):
+            for year in range(first_year + n_periods - 1, first_year - 1, -1):
+                lines.append(f"{region};Desglose {s};{year};{spanish_number(rng.uniform(0, 100))}")
+    return ('\r\n'.join(lines) + '\r\n').encode('ISO-8859-15')
+
+CRIME_QUARTERS = {1: 'Enero-marzo', 2: 'Enero-junio', 3: 'Enero-septiembre', 4: 'Enero-diciembre'}
+
+def crime_csv(year, quarter, n_regions, seed=0):
+    """MIR crime balance CSV: values accumulated within the year, plus the previous year and a variation row."""
+    rng = np.random.default_rng([seed, year, quarter])
+    labels = [f"{i + 1}.-{prefixes[0].capitalize()}" for i, prefixes in enumerate(CRIME_CATEGORIES.values())]
+    lines = ['Comunidades y Ciudades Autónomas;Tipología penal;Periodo;Total']
+    for region in region_names(n_regions):
+        for label in labels:
+            current = rng.integers(10, 50_000) * quarter
+            lines.append(f"{region};{label};{CRIME_QUARTERS[quarter]} {year};{current:,}".replace(',', '.'))
+            lines.append(f"{region};{label};{CRIME_QUARTERS[quarter]} {year - 1};{int(current * 0.95):,}".replace(',', '.'))
+            lines.append(f"{region};{label};Variación % {year}/{year - 1};5,3")
+    return ('\n'.join(lines) + '\n').encode('utf-8-sig')
+
+def ree_payload(year, seed=0, months=12):
+    """REData evolucion-renovable-no-renovable JSON: monthly Renovable / No renovable values and shares."""
+    rng = np.random.default_rng([seed, year])
+    share = np.clip(rng.normal(0.45, 0.1, months), 0.05, 0.95)
+    total = rng.uniform(1e6, 5e6, months)
+    stamps = [f"{year}-{m:02d}-01T00:00:00.000+01:00" for m in range(1, months + 1)]
+
+    def item(title, fraction):
+        return {'type': title, 'id': title, 'attributes': {
+            'title': title, 'type': title, 'values': [
+                {'value': float(v), 'percentage': float(p), 'datetime': d}
+                for v, p, d in zip(total * fraction, fraction, stamps)]}}
+    return json.dumps({'data': {'type': 'Generación renovable/no renovable'},
+                       'included': [item('Renovable', share), item('No renovable', 1 - share)]}).encode('utf-8')
+
+def ieca_quarters(n_periods, first_year=2015):
+    return [f"{first_year + i // 4}{i % 4 + 1}" for i in range(n_periods)]
+
+def ieca_payload(n_periods, seed=0):
+    """IECA consulta JSON: rows of [component, period, territory, measure, value] cells."""
+    rng = np.random.default_rng(seed)
+    values = 100 + np.cumsum(rng.normal(0.4, 1, n_periods))
+    rows = [[{'cod': ['69634'], 'des': 'PIB a precios de mercado'},
+             {'cod': [q], 'des': f"{q[:4]} {q[4]}º trimestre"},
+             {'cod': ['01'], 'des': 'Andalucía'},
+             {'cod': ['IV'], 'des': 'Índice de volumen encadenado'},
+             {'val': f"{v:.3f}", 'format': '#,##0.000'}]
+            for q, v in zip(ieca_quarters(n_periods), values)]
+    return json.dumps({'id': 27669, 'title': 'Contabilidad Trimestral de Andalucía', 'data': rows}).encode('utf-8')
+
+def gdp_esp_payload(n_periods, seed=0):
+    """DATOS_SERIE JSON of the INE quarterly GDP series."""
+    rng = np.random.default_rng(seed + 1)
+    values = 100 + np.cumsum(rng.normal(0.4, 1, n_periods))
+    fechas = madrid_midnight_ms(quarter_starts(n_periods))
+    return json.dumps({'COD': 'CNTR6652', 'Nombre': 'Total Nacional. PIB. Índice de volumen encadenado. ',
+                       'Data': [{'Fecha': f, 'Valor': round(float(v), 3)} for f, v in zip(fechas, values)]}).encode('utf-8')
+
+def cis_microdata(n_studies, respondents, seed=0):
+    """CIS barometer-like respondents: ESTU, CCAA, PESO, salience/anchoring scores and PROBVOTO."""
+    rng = np.random.default_rng(seed)
+    n = n_studies * respondents
+    salience = rng.normal(5, 2, n)
+    anchoring = salience * 0.6 + rng.normal(2, 1.5, n)
+    anchoring[rng.random(n) < 0.15] = np.nan
+    probvoto = np.clip(np.round(10 - 0.5 * salience - 0.3 * np.nan_to_num(anchoring, nan=5) + rng.normal(0, 2, n)), 0, 10)
+    probvoto[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        'ESTU': np.repeat(3000 + np.arange(n_studies), respondents),
+        'CCAA': pd.Categorical(rng.choice(list(CCAA_CODES), n)),
+        'PESO': rng.lognormal(0, 0.3, n),
+        'SCORE_POLITICO_BRUTO': salience,
+        'INDICE_ANCLAJE': anchoring,
+        'PROBVOTO': probvoto
+    })
+
+def seed_cache(root, payloads):
+    """
+    Stores {url: body bytes} in a ResponseCache at root and returns an offline HttpClient over it,
+    so every request is served from the synthetic bodies and nothing reaches the network.
+    """
+    cache = ResponseCache(root, offline=True)
+    for url, body in payloads.items():
+        r = requests.Response()
+        r.status_code = 200
+        r.url = url
+        csv = url.endswith('.csv')
+        r.headers = CaseInsensitiveDict({'Content-Type': 'text/csv; charset=ISO-8859-15' if csv else 'application/json'})
+        r._content = body
+        cache.store(url, r)
+    return HttpClient(cache=cache)
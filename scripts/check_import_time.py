@@ -0,0 +1,73 @@
+"""
+Import-time regression check for the src package, based on `python -X importtime`.
+
+Each entry point is imported in a fresh interpreter (best of --repeat runs); the check fails if
+its cumulative import time exceeds its budget, if it loads a module it must not load (e.g.
+pandas for `import src`), or if importing it creates directories (os.makedirs at import).
+
+Usage (from the project root):
+    python scripts/check_import_time.py [--repeat 5] [--scale 1.0]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> (budget in ms, modules it must not import)
+ENTRY_POINTS = {
+    'src': (50, ['pandas', 'numpy', 'requests', 'urllib3', 'src.connectors', 'src.extractors']),
+    'src.config': (20, ['pandas', 'numpy', 'requests']),
+    # Modules whose functions run in ProcessPoolExecutor workers
+    'src.robustness': (200, ['pandas', 'requests']),
+    'src.sensitivity': (200, ['pandas', 'requests']),
+}
+
+# Any os.makedirs call during the import is an error
+NO_MKDIR = ("import os\n"
+            "def _fail(*a, **k): raise RuntimeError('os.makedirs called at import: %r' % (a,))\n"
+            "os.makedirs = _fail\n"
+            "import {module}\n")
+
+def import_profile(module):
+    """{module name: cumulative microseconds} of one fresh `import module`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', NO_MKDIR.format(module=module)],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')  # 'import time: self [us] | cumulative | module'
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+def check(module, budget_ms, forbidden, repeat):
+    try:
+        profiles = [import_profile(module) for _ in range(repeat)]
+    except RuntimeError as e:
+        return False, f"❌ {module}: {e}"
+    best = min(p.get(module, 0) for p in profiles) / 1000
+    loaded = [m for m in forbidden if m in profiles[0]]
+    ok = best <= budget_ms and not loaded
+    msg = f"{'✅' if ok else '❌'} {module}: {best:.1f} ms (budget {budget_ms:.0f} ms)"
+    if loaded:
+        msg += f", loads {', '.join(loaded)}"
+    return ok, msg
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='fresh imports per entry point (best is kept)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for every budget (slow machines)')
+    args = parser.parse_args()
+
+    results = [check(module, budget * args.scale, forbidden, args.repeat)
+               for module, (budget, forbidden) in ENTRY_POINTS.items()]
+    for _, msg in results:
+        print(msg)
+    sys.exit(0 if all(ok for ok, _ in results) else 1)
+
+if __name__ == '__main__':
+    main()
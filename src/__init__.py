@@ -1,4 +1,49 @@
+import importlib
 from .config import *
-from .connectors import IneConnector
-from .extractors import *
-from .consolidator import IPA27Consolidator
+
+# Everything but config (plain constants) is imported on first access, so `import src` and the
+# worker processes of parallel stages do not pay for pandas, requests or the connectors up front.
+# Directories are created by config.ensure_dirs() (and by the writers), not at import.
+
+_LAZY = {
+    'IneConnector': 'connectors',
+    'ReeConnector': 'connectors',
+    'CrimeConnector': 'connectors',
+    'IPA27Consolidator': 'consolidator',
+    'ine': 'extractors',
+    'extract_ipc': 'extractors',
+    'extract_societies': 'extractors',
+    'extract_pib': 'extractors',
+    'extract_life_expectancy': 'extractors',
+    'extract_abandono_escolar': 'extractors',
+    'extract_id_expenditure': 'extractors',
+    'extract_tech_employment': 'extractors',
+    'extract_ict_access': 'extractors',
+    'extract_broadband': 'extractors',
+    'extract_crime': 'extractors',
+    'extract_renewables': 'extractors',
+    'extract_all': 'extractors',
+    'resolve_regions': 'regions',
+    'ict_internet_access': 'microdata',
+    'save_indicator': 'storage',
+}
+
+_SUBMODULES = (
+    'cache', 'cis', 'config', 'connectors', 'consolidator', 'disaggregation', 'export', 'extractors',
+    'http_client', 'instrumentation', 'microdata', 'modeling', 'pipeline', 'regions', 'registry', 'robustness',
+    'scoring', 'sensitivity', 'storage', 'survey', 'vintages'
+)
+
+__all__ = [name for name in dir(config) if name.isupper()] + ['ensure_dirs'] + list(_LAZY)
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import requests
+from requests.structures import CaseInsensitiveDict
+from .config import HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_AGE
+
+class OfflineCacheMiss(requests.ConnectionError):
+    """Raised in offline mode when a URL has never been cached."""
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of HTTP responses.
+    entries/<key>.json holds the metadata of a URL (+params); the body lives in
+    objects/<sha256 of body>, so identical payloads are stored once.
+    """
+
+    def __init__(self, root=HTTP_CACHE_DIR, ttl=HTTP_CACHE_TTL, offline=False):
+        self.root = root
+        self.ttl = ttl
+        self.offline = offline
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url, params=None):
+        raw = url if not params else url + "?" + json.dumps(sorted(params.items()), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, "entries", f"{key}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def lookup(self, url, params=None):
+        """Returns the stored metadata for url, or None."""
+        path = self._entry_path(self.key(url, params))
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if not os.path.exists(self._object_path(meta["body"])):
+            return None
+        return meta
+
+    def is_fresh(self, meta):
+        return time.time() - meta["fetched_at"] < self.ttl
+
+    def body_path(self, meta):
+        return self._object_path(meta["body"])
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, url, response, params=None):
+        """Saves a 200 response and returns its metadata."""
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        if not os.path.exists(self._object_path(digest)):
+            _atomic_write(self._object_path(digest), content)
+        return self._store_meta(url, params, response, digest, len(content))
+
+    def store_stream(self, url, response, params=None, chunk_size=1 << 16):
+        """Like store(), but copies a stream=True response to disk chunk by chunk."""
+        objects_dir = os.path.join(self.root, "objects")
+        os.makedirs(objects_dir, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=objects_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(chunk_size):
+                sha.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        digest = sha.hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            os.remove(tmp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+        return self._store_meta(url, params, response, digest, size)
+
+    def _store_meta(self, url, params, response, digest, size):
+        headers = {k: v for k, v in response.headers.items() if k.lower() in ("content-type", "etag", "last-modified")}
+        meta = {
+            "url": url,
+            "params": params,
+            "body": digest,
+            "size": size,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "headers": headers,
+            "fetched_at": time.time()
+        }
+        self._write_meta(url, params, meta)
+        return meta
+
+    def touch(self, url, meta, params=None):
+        """Marks a cached entry as revalidated now (after a 304)."""
+        meta["fetched_at"] = time.time()
+        self._write_meta(url, params, meta)
+
+    def _write_meta(self, url, params, meta):
+        _atomic_write(self._entry_path(self.key(url, params)), json.dumps(meta).encode("utf-8"))
+
+    def to_response(self, meta):
+        """Rebuilds a requests.Response from a cached entry."""
+        r = requests.Response()
+        r.status_code = 200
+        r.url = meta["url"]
+        r.headers = CaseInsensitiveDict(meta.get("headers", {}))
+        with open(self.body_path(meta), "rb") as f:
+            r._content = f.read()
+        r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+        r.from_cache = True
+        return r
+
+    def evict(self, max_age=HTTP_CACHE_MAX_AGE):
+        """Deletes entries older than max_age seconds and bodies no entry refers to."""
+        entries_dir = os.path.join(self.root, "entries")
+        objects_dir = os.path.join(self.root, "objects")
+        if not os.path.isdir(entries_dir):
+            return 0
+        now = time.time()
+        removed = 0
+        alive = set()
+        for fname in os.listdir(entries_dir):
+            path = os.path.join(entries_dir, fname)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if now - meta["fetched_at"] > max_age:
+                os.remove(path)
+                removed += 1
+            else:
+                alive.add(meta["body"])
+        for sub in os.listdir(objects_dir) if os.path.isdir(objects_dir) else []:
+            if not os.path.isdir(os.path.join(objects_dir, sub)):
+                continue
+            for digest in os.listdir(os.path.join(objects_dir, sub)):
+                if digest not in alive and not digest.endswith(".tmp"):
+                    os.remove(os.path.join(objects_dir, sub, digest))
+        return removed
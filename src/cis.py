@@ -0,0 +1,150 @@
+import os
+import re
+import glob
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from .config import CIS_RAW, CIS_CACHE
+from .instrumentation import instrumented
+
+# Standardized columns used by the notebooks
+DESAFECCION_COLUMNS = ['ESTU', 'CUES', 'CCAA', 'PROV', 'MUN',
+                       'PESPANNA1', 'PESPANNA2', 'PESPANNA3',
+                       'PREFPTE', 'PROBVOTO', 'CERCANIA', 'SIMPATIA', 'ESCIDEOL', 'PESO']
+PARTICIPACION_COLUMNS = ['ESTU', 'CUES', 'CCAA', 'INTENCION_VOTO', 'PROBVOTO', 'PARTICIP_4CAT', 'PESO']
+
+EXCLUDED_STUDIES = [3468]
+
+_SPEC_KEY = b'ipa27_cis_spec'
+
+def study_number(path):
+    """Study number (ESTU) from a file name such as '3124.sav' or 'MD3124.SAV'."""
+    return int(re.sub(r'[^0-9]', '', os.path.splitext(os.path.basename(path))[0]))
+
+def list_studies(folder=CIS_RAW):
+    """{ESTU: path} of every .sav file under folder."""
+    files = sorted(set(glob.glob(os.path.join(folder, '**/*.sav'), recursive=True) +
+                       glob.glob(os.path.join(folder, '**/*.SAV'), recursive=True)))
+    return {study_number(f): f for f in files}
+
+def mapping_from_csv(path):
+    """{ESTU: {original: standard}} from the _mapeo_variables_v5.csv table."""
+    df = pd.read_csv(path)
+    targets = {f'VAR_ESPANNA{i}': f'PESPANNA{i}' for i in (1, 2, 3)}
+    targets.update({'VAR_PREFPTE': 'PREFPTE', 'VAR_PROBVOTO': 'PROBVOTO', 'VAR_CERCANIA': 'CERCANIA',
+                    'VAR_SIMPATIA': 'SIMPATIA', 'VAR_ESCIDEOL': 'ESCIDEOL'})
+    targets = {c: t for c, t in targets.items() if c in df.columns}
+    mapping = {}
+    for row in df[['Estudio'] + list(targets)].itertuples(index=False):
+        estu, values = int(row[0]), row[1:]
+        mapping[estu] = {v: t for v, t in zip(values, targets.values()) if pd.notna(v) and v != t}
+    return mapping
+
+def _source_columns(available, columns, rename):
+    """
+    {original: standard} to read. As with rename + drop of duplicated columns, when several
+    originals end up with the same standard name the first one in file order wins.
+    """
+    chosen = {}
+    for col in available:
+        target = rename.get(col, col)
+        if target in columns and target not in chosen.values():
+            chosen[col] = target
+    return chosen
+
+def _spec_hash(columns, rename):
+    raw = json.dumps([list(columns), sorted(rename.items())], default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+def read_study(path, columns, rename=None, estu=None):
+    """Reads only the columns of one .sav file that map to the standardized columns."""
+    import pyreadstat
+    rename = rename or {}
+    estu = estu if estu is not None else study_number(path)
+    _, meta = pyreadstat.read_sav(path, metadataonly=True)
+    chosen = _source_columns(meta.column_names, columns, rename)
+    df, _ = pyreadstat.read_sav(path, usecols=list(chosen))
+    df = df.rename(columns=chosen)
+    if 'ESTU' not in df.columns:
+        df['ESTU'] = estu
+    return df[[c for c in columns if c in df.columns]]
+
+def _partition_path(cache_dir, estu):
+    return os.path.join(cache_dir, f"ESTU={estu}.parquet")
+
+def _write_partition(df, path, spec):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SPEC_KEY] = spec.encode()
+    tmp = path + '.tmp'
+    pq.write_table(table.replace_schema_metadata(metadata), tmp, compression='zstd')
+    os.replace(tmp, path)
+
+def _partition_spec(path):
+    import pyarrow.parquet as pq
+    try:
+        raw = (pq.read_schema(path).metadata or {}).get(_SPEC_KEY)
+    except (OSError, ValueError):
+        return None
+    return raw.decode() if raw else None
+
+def _is_current(path, source, spec):
+    """A partition is reused while its .sav file is older and it was built with the same spec."""
+    return (os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source)
+            and _partition_spec(path) == spec)
+
+def _build_partition(args):
+    """Worker: parses one study and writes its partition. Returns (ESTU, rows or error message)."""
+    estu, source, columns, rename, path, spec = args
+    try:
+        df = read_study(source, columns, rename, estu)
+        _write_partition(df, path, spec)
+        return estu, len(df)
+    except Exception as e:
+        return estu, f"{type(e).__name__}: {e}"
+
+@instrumented()
+def load_microdata(columns, name, rename=None, folder=CIS_RAW, cache_dir=CIS_CACHE,
+                   exclude=EXCLUDED_STUDIES, studies=None, max_workers=None):
+    """
+    Microdata of all CIS studies in folder with the standardized columns, cached as one Parquet
+    partition per study under <cache_dir>/<name>/. Only studies without a current partition
+    (new, modified or read with a different column mapping) are parsed, in a process pool;
+    the rest of the cache is never rewritten. Missing PESO is filled with 1.
+    """
+    rename = rename or {}
+    available = {e: p for e, p in list_studies(folder).items() if e not in set(exclude or [])}
+    if studies is not None:
+        available = {e: p for e, p in available.items() if e in set(studies)}
+    dataset = os.path.join(cache_dir, name)
+    os.makedirs(dataset, exist_ok=True)
+
+    jobs = []
+    for estu, source in available.items():
+        spec = _spec_hash(columns, rename.get(estu, {}))
+        path = _partition_path(dataset, estu)
+        if not _is_current(path, source, spec):
+            jobs.append((estu, source, list(columns), rename.get(estu, {}), path, spec))
+    print(f"📂 CIS {name}: {len(available)} studies, {len(jobs)} to parse")
+
+    errors = {}
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for estu, result in pool.map(_build_partition, jobs):
+                if isinstance(result, str):
+                    errors[estu] = result
+    if errors:
+        print(f"⚠️  Errors: {len(errors)}")
+        for estu, msg in list(errors.items())[:5]:
+            print(f"   - Study {estu}: {msg}")
+
+    paths = [_partition_path(dataset, e) for e in sorted(available) if e not in errors]
+    paths = [p for p in paths if os.path.exists(p)]
+    if not paths:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True, sort=False)
+    df['PESO'] = df['PESO'].fillna(1) if 'PESO' in df.columns else 1
+    return df
@@ -6,11 +6,36 @@ DATA_RAW = os.path.join(BASE_PATH, 'data', 'raw')
 DATA_PROCESSED = os.path.join(BASE_PATH, 'data', 'processed')
 GRAFICOS = os.path.join(BASE_PATH, 'graficos')
 
-# Create directories
-for d in [DATA_RAW, DATA_PROCESSED, GRAFICOS]:
-    os.makedirs(d, exist_ok=True)
+# HTTP response cache (see cache.py). Set IPA27_OFFLINE=1 to serve only from cache.
+HTTP_CACHE_DIR = os.path.join(DATA_RAW, 'http_cache')
+HTTP_CACHE_TTL = 6 * 3600            # Seconds before a cached response is revalidated
+HTTP_CACHE_MAX_AGE = 90 * 24 * 3600  # Seconds before an unused entry is evicted
+OFFLINE = os.environ.get('IPA27_OFFLINE', '0') == '1'
+# Base URL of a local stand-in for every source (see benchmarks/standin_server.py); the shared
+# client then sends all requests there, without the response cache
+STANDIN_URL = os.environ.get('IPA27_STANDIN_URL')
+
+# Indicator storage (see storage.py): 'parquet' (typed, compact) or 'csv'
+STORAGE_FORMAT = os.environ.get('IPA27_STORAGE_FORMAT', 'parquet')
+CSV_EXPORT = os.environ.get('IPA27_CSV_EXPORT', '0') == '1'  # Also write a CSV copy of each indicator
+
+# Vintage history (see vintages.py): one Parquet partition of changed cells per vintage date
+VINTAGES_DIR = os.path.join(BASE_PATH, 'results', 'data', 'vintages')
+
+# CIS barometer microdata (see cis.py): raw .sav files and one Parquet partition per study (ESTU)
+CIS_RAW = os.path.join(DATA_RAW, 'cis', 'barómetro')
+CIS_CACHE = os.path.join(CIS_RAW, 'microdatoscompleto')
+
+# REE renewables (see connectors.ReeConnector): one checkpoint per (geo_id, year) so reruns resume
+REE_CHECKPOINT_DIR = os.path.join(DATA_RAW, 'renovables', 'checkpoints')
+
+def ensure_dirs():
+    """Creates the data and figure directories (not done at import, so importing stays side-effect free)."""
+    for d in [DATA_RAW, DATA_PROCESSED, GRAFICOS]:
+        os.makedirs(d, exist_ok=True)
 
 # Common Constants
+# Canonical region codes (shared with the notebooks and data/processed/indicadores)
 REGIONS = {
     'ESP': 'España',
     'AND': 'Andalucía',
@@ -19,8 +44,8 @@ REGIONS = {
     'BAL': 'Illes Balears',
     'CAN': 'Canarias',
     'CANT': 'Cantabria',
-    'CASTL': 'Castilla y León',
-    'CASTM': 'Castilla-La Mancha',
+    'CYL': 'Castilla y León',
+    'CLM': 'Castilla-La Mancha',
     'CAT': 'Cataluña',
     'VAL': 'Comunitat Valenciana',
     'EXT': 'Extremadura',
@@ -28,12 +53,133 @@ REGIONS = {
     'MAD': 'Comunidad de Madrid',
     'MUR': 'Región de Murcia',
     'NAV': 'Comunidad Foral de Navarra',
-    'PVA': 'País Vasco',
+    'PV': 'País Vasco',
     'RIO': 'La Rioja',
     'CEU': 'Ceuta',
     'MEL': 'Melilla'
 }
 
+# Lower-case, accent-free fragments that identify each region in series names (see regions.py)
+REGION_ALIASES = {
+    'ESP': ['total nacional', 'espana', 'todas las comunidades'],
+    'AND': ['andaluc'],
+    'ARA': ['aragon'],
+    'AST': ['asturias'],
+    'BAL': ['balears', 'baleares'],
+    'CAN': ['canarias'],
+    'CANT': ['cantabria'],
+    'CYL': ['castilla y leon', 'castilla-leon', 'castilla leon'],
+    'CLM': ['castilla - la mancha', 'castilla-la mancha', 'castilla la mancha', 'la mancha'],
+    'CAT': ['catalu'],
+    'VAL': ['valencia'],
+    'EXT': ['extremadura'],
+    'GAL': ['galicia'],
+    'MAD': ['madrid'],
+    'MUR': ['murcia'],
+    'NAV': ['navarra'],
+    'PV': ['pais vasco', 'euskadi', 'vasco'],
+    'RIO': ['rioja'],
+    'CEU': ['ceuta'],
+    'MEL': ['melilla']
+}
+
+# Fragments that must not resolve to any single region
+REGION_EXCLUDE = ['ceuta y melilla']
+
+# INE numeric CCAA codes, as used in microdata and "01 Andalucía"-style labels
+CCAA_CODES = {
+    '01': 'AND', '02': 'ARA', '03': 'AST', '04': 'BAL', '05': 'CAN',
+    '06': 'CANT', '07': 'CYL', '08': 'CLM', '09': 'CAT', '10': 'VAL',
+    '11': 'EXT', '12': 'GAL', '13': 'MAD', '14': 'MUR', '15': 'NAV',
+    '16': 'PV', '17': 'RIO', '18': 'CEU', '19': 'MEL'
+}
+
+# REE REData geo_ids: the three electric systems plus the peninsular CCAA (ESP = peninsular system)
+REE_GEO_IDS = {
+    8741: 'ESP', 8742: 'CAN', 8743: 'BAL',
+    4: 'AND', 5: 'ARA', 6: 'CANT', 7: 'CLM', 8: 'CYL', 9: 'CAT', 10: 'PV', 11: 'AST',
+    13: 'MAD', 14: 'NAV', 15: 'VAL', 16: 'EXT', 17: 'GAL', 20: 'RIO', 21: 'MUR'
+}
+REE_SYSTEMS = {8741: 'peninsular', 8742: 'canarias', 8743: 'baleares'}
+
+# Ministry of Interior crime balance: normalized category -> label prefixes (lower-case, no accents,
+# leading numbering such as '5.2.-' or 'III.' removed)
+CRIME_CATEGORIES = {
+    'TOTAL': ['total infracciones penales'],
+    'HOMICIDIOS': ['homicidios dolosos y asesinatos consumados'],
+    'LESIONES': ['delitos graves y menos graves de lesiones'],
+    'LIBERTAD_SEXUAL': ['delitos contra la libertad'],
+    'LIBERTAD_SEXUAL_RESTO': ['resto de delitos contra la libertad'],
+    'ROBOS_VIOLENCIA': ['robos con violencia'],
+    'ROBOS_FUERZA': ['robos con fuerza'],
+    'HURTOS': ['hurtos'],
+    'SUSTRACCION_VEHICULOS': ['sustracciones de vehiculos'],
+    'TRAFICO_DROGAS': ['trafico de drogas']
+}
+
+# Chow-Lin pairs (low-frequency indicator -> high-frequency regressor) from the methodology;
+# indicators without a usable regressor are disaggregated with Denton (see disaggregation.py)
+DISAGGREGATION_REGRESSORS = {
+    'CON_IDI': 'ECO_PIT',
+    'EDU_ABA': 'EDU_SUP',
+    'EDU_SUP': 'VID_PAR',
+    'EMP_NAT': 'INF_TRA',
+    'SAL_ESP': 'SAL_SAT',
+    'VID_ARO': 'VID_PAR',
+    'GOB_CON': 'GOB_TRA',
+    'SOC_ASO': 'SOC_PAR'
+}
+
+# STL seasonal adjustment and ARIMA nowcasting (see modeling.py), as in the methodology
+STL_INDICATORS = ['SEG_BAL', 'SEG_CRI', 'INV_HIP', 'EMP_SOC', 'VID_PAR', 'CON_OCI']
+NOWCAST_INDICATORS = ['GOB_CON', 'GOB_TRA', 'SAL_SAT', 'SOC_PAR', 'EDU_SUP', 'CON_IDI', 'VID_ARO']
+STL_PARAMS = {'seasonal': 13, 'trend': 7, 'robust': True}
+# Fitted orders, parameters and outputs per series, keyed by content hash, so reruns skip unchanged series
+MODEL_CACHE_PATH = os.path.join(DATA_PROCESSED, 'model_cache.json')
+
+# Index structure: domain -> pillar -> indicators (see scoring.py)
+IPA27_STRUCTURE = {
+    'Sociedades Inclusivas': {
+        '1. Seguridad': ['SEG_BAL', 'SEG_CRI'],
+        '2. Libertad': ['LIB_ODI', 'LIB_SEX'],
+        '3. Gobernanza': ['GOB_DES', 'GOB_EFF'],
+        '4. Capital Social': ['SOC_ASO', 'SOC_PAR_enlazado']
+    },
+    'Economías Abiertas': {
+        '5. Inversión': ['INV_HIP', 'INV_IED'],
+        '6. Empresas': ['EMP_NAT', 'EMP_SOC'],
+        '7. Infraestructura': ['INF_BAN', 'INF_TRA'],
+        '8. Calidad Económica': ['ECO_RBHpc', 'ECO_COL_sal']
+    },
+    'Personas Empoderadas': {
+        '9. Vida': ['VID_ARO', 'VID_PAR'],
+        '10. Salud': ['SAL_ESP', 'SAL_SAT_enlazado'],
+        '11. Educación': ['EDU_ABA', 'EDU_SUP'],
+        '12. Conocimiento': ['CON_IDI', 'CON_OCI']
+    }
+}
+# Fixed ceilings per indicator (Indicador, Dirección NOR/INV, Techo, ...)
+CEILINGS_PATH = os.path.join(BASE_PATH, 'results', 'data', 'techos_fijos_ipa27.csv')
+SCORE_CAP = 120          # Scores are clamped to [0, SCORE_CAP]
+GEOMETRIC_FLOOR = 1.0    # Lowest score entering a geometric mean, so one zero does not zero the pillar
+
+# Indicator registry (acronym -> source type and parameters, see registry.py) and the pipeline
+# node store (see pipeline.py): one output per node plus a manifest of input hashes
+INDICATOR_REGISTRY_PATH = os.path.join(BASE_PATH, 'src', 'indicadores.json')
+INDICATORS_DIR = os.path.join(DATA_PROCESSED, 'indicadores')  # Indicators stored by the notebooks
+PIPELINE_DIR = os.path.join(DATA_PROCESSED, 'pipeline')
+
+# Run instrumentation (see instrumentation.py): wall/CPU time, bytes, rows, cache hits and peak RSS
+# per stage in a JSON run report. IPA27_PROFILE_STAGE=<stage name> also dumps a profile of that stage.
+INSTRUMENTATION = os.environ.get('IPA27_INSTRUMENTATION', '1') == '1'
+RUN_REPORT_DIR = os.path.join(DATA_PROCESSED, 'run_reports')
+PROFILE_STAGE = os.environ.get('IPA27_PROFILE_STAGE')
+PROFILER = os.environ.get('IPA27_PROFILER', 'cprofile')  # 'cprofile' or 'pyinstrument'
+REPORT_MAX_STAGES = 10000  # Stage records kept in the run report (older ones only count in its summary)
+
+# Codes used by earlier versions of src/ and their canonical replacement
+LEGACY_REGION_CODES = {'CASTL': 'CYL', 'CASTM': 'CLM', 'PVA': 'PV'}
+
 FREQUENCIES = {
     'M': 'Mensual',
     'Q': 'Trimestral',
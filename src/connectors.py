@@ -1,245 +1,644 @@
-import requests
 import pandas as pd
-from datetime import datetime
+import numpy as np
 import os
 import io
-from .config import DATA_PROCESSED
+import re
+import json
+import time
+import requests
 import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .config import REE_GEO_IDS, REE_SYSTEMS, REE_CHECKPOINT_DIR, CRIME_CATEGORIES
+from .http_client import get_client, TokenBucket
+from .cache import OfflineCacheMiss
+from .regions import resolve_regions, normalize_text
+from .storage import save_indicator
+from .instrumentation import instrumented, bind, count, count_rows_in
+
+def _spanish_number(values):
+    """'1.234,5' -> 1234.5 for a whole Series; unparseable cells become NaN."""
+    s = values.astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False).str.strip()
+    return pd.to_numeric(s, errors='coerce')
 
 class IneConnector:
     """Robust connector for INE (Spain) API (TEMPUS) and JAXI system."""
     
-    def __init__(self):
+    def __init__(self, client=None):
+        self._client = client
         self.base_url = "https://servicios.ine.es/wstempus/js/ES/"
         self.jaxi_base_urls = [
             "https://www.ine.es/jaxiT3/files/t/es/csv_bdsc/",
             "https://www.ine.es/jaxiT3/files/t/csv_bdsc/",
             "https://www.ine.es/jaxiT3/files/t/es/csv/"
         ]
+        self.jaxi_chunksize = 50_000  # Rows per parsed JAXI block (bounds peak memory)
+
+    @property
+    def http(self):
+        """HttpClient in use: the one passed in, else the process-wide client."""
+        return self._client or get_client()
 
-    def _detect_frequency(self, serie_data):
-        if not serie_data or len(serie_data) < 2:
+    def _detect_frequency(self, fechas_ms):
+        """Frequency from the mean spacing (days) of the first 20 sorted timestamps."""
+        if len(fechas_ms) < 2:
             return "Anual"
         
-        # Parse timestamps and check intervals
-        dates = sorted([datetime.fromtimestamp(d['Fecha'] / 1000) for d in serie_data])
-        diffs = [(dates[i+1] - dates[i]).days for i in range(min(len(dates)-1, 20))]
-        avg_days = sum(diffs) / len(diffs) if diffs else 365
+        diffs = np.diff(np.sort(fechas_ms))[:20] // 86_400_000
+        avg_days = diffs.mean()
         
         if avg_days <= 35: return "Mensual"
         if avg_days <= 100: return "Trimestral"
         return "Anual"
 
-    def download_tempus(self, table_id, name, start_date="20150101"):
-        """Downloads data from INE TEMPUS API."""
+    def _tempus_to_frame(self, series, name):
+        """
+        Columnar parse of TEMPUS series: [(serie_json, region_code), ...] -> standard long DataFrame.
+        All points are flattened into NumPy arrays in one pass instead of one dict per point.
+        """
+        lengths = np.array([len(s['Data']) for s, _ in series], dtype=np.int64)
+        points = [d for s, _ in series for d in s['Data']]
+        fecha_ms = np.fromiter((d['Fecha'] for d in points), dtype=np.int64, count=len(points))
+        valor = np.array([d['Valor'] for d in points], dtype=float)
+        
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        freqs = np.array([self._detect_frequency(fecha_ms[a:b]) for a, b in zip(bounds[:-1], bounds[1:])], dtype=object)
+        
+        # INE stamps each period at Madrid midnight (22:00/23:00 UTC the day before);
+        # rounding to the day yields the local calendar date regardless of the machine's timezone.
+        fechas = pd.to_datetime(fecha_ms, unit='ms').round('D')
+        year = fechas.year.to_numpy()
+        month = fechas.month.to_numpy()
+        freq_pt = np.repeat(freqs, lengths)
+        
+        # Period keys as integers, formatted once per distinct key
+        key = np.where(freq_pt == "Mensual", year * 100 + month,
+              np.where(freq_pt == "Trimestral", year * 100 + 20 + (month - 1) // 3 + 1, year * 100))
+        uniq, inv = np.unique(key, return_inverse=True)
+        labels = np.array([
+            f"{k // 100}-M{k % 100:02d}" if 0 < k % 100 <= 12 else
+            f"{k // 100}-Q{k % 100 - 20}" if k % 100 > 20 else
+            f"{k // 100}-ANUAL"
+            for k in uniq
+        ], dtype=object)
+        
+        return pd.DataFrame({
+            'Fecha': fechas,
+            'Periodo': labels[inv.ravel()],
+            'Region': np.repeat(np.array([r for _, r in series], dtype=object), lengths),
+            'Indicador': name,
+            'Valor': valor,
+            'Frecuencia': freq_pt,
+            'Serie_Original': np.repeat(np.array([s['Nombre'] for s, _ in series], dtype=object), lengths)
+        })
+
+    @instrumented(key='name')
+    def download_tempus(self, table_id, name, start_date="20150101", save=True):
+        """Downloads data from INE TEMPUS API (and stores it as indicator name unless save=False)."""
         url = f"{self.base_url}DATOS_TABLA/{table_id}?date={start_date}:"
         print(f"⬇️ Downloading INE Table {table_id} ({name})...")
         
         try:
-            resp = requests.get(url, timeout=30, verify=False)
+            resp = self.http.get(url, timeout=30)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
             print(f"❌ Error downloading {table_id}: {e}")
             return None
+        count_rows_in(sum(len(serie['Data']) for serie in data))
 
-        from .config import REGIONS
-        
-        records = []
-        for serie in data:
-            # Determine region dynamically from config.REGIONS
-            region = None
-            serie_name_upper = serie['Nombre'].upper()
-            
-            for code, name in REGIONS.items():
-                # Special cases for names that might vary in JAXI/Tempus
-                if name.upper() in serie_name_upper:
-                    region = code
-                    break
-                # Fallback for short names if long name in config doesn't match exactly
-                short_name = name.split(' de ')[-1].split(' Foral ')[-1].upper()
-                if short_name in serie_name_upper:
-                    region = code
-                    break
-            
-            if not region: continue
-            
-            freq = self._detect_frequency(serie['Data'])
-            for d in serie['Data']:
-                dt = datetime.fromtimestamp(d['Fecha'] / 1000)
-                
-                if freq == "Mensual":
-                    period = f"{dt.year}-M{dt.month:02d}"
-                elif freq == "Trimestral":
-                    period = f"{dt.year}-Q{(dt.month-1)//3 + 1}"
-                else:
-                    period = f"{dt.year}-ANUAL"
-                
-                records.append({
-                    'Fecha': dt,
-                    'Periodo': period,
-                    'Region': region,
-                    'Indicador': name,
-                    'Valor': d['Valor'],
-                    'Frecuencia': freq,
-                    'Serie_Original': serie['Nombre']
-                })
+        codes = resolve_regions([serie['Nombre'] for serie in data])
+        series = [(serie, region) for serie, region in zip(data, codes) if region and serie['Data']]
         
-        if not records:
+        if not series:
             print(f"⚠️ No valid series found for {table_id}")
             return None
             
-        df = pd.DataFrame(records)
+        df = self._tempus_to_frame(series, name)
         if 'Region' in df.columns:
             df = df.drop_duplicates(subset=['Periodo', 'Region', 'Indicador']).sort_values('Fecha')
-        
-        path = os.path.join(DATA_PROCESSED, f"{name}.csv")
-        df.to_csv(path, index=False)
-        print(f"   ✅ Saved: {name}.csv ({len(df)} records)")
+        if not save:
+            return df
+
+        path = save_indicator(df, name)
+        print(f"   ✅ Saved: {os.path.basename(path)} ({len(df)} records)")
         return df
 
-    def download_jaxi(self, table_id, name, filter_keyword=None):
-        """Downloads data from INE JAXI system (static CSV files)."""
-        print(f"⬇️ Downloading JAXI Table {table_id} ({name})... ")
-        df_raw = None
+    def _read_jaxi(self, table_id, process_chunk):
+        """
+        Streams a JAXI CSV through an incremental ISO-8859-15 decoder and hands it to
+        process_chunk() in blocks of self.jaxi_chunksize rows (all columns as str).
+        Tries each base URL in turn on network errors; returns the list of processed chunks, or
+        None (a table that downloads but cannot be parsed is reported, not retried elsewhere).
+        """
         for base in self.jaxi_base_urls:
+            url = f"{base}{table_id}.csv"
             try:
-                url = f"{base}{table_id}.csv"
-                r = requests.get(url, timeout=30, verify=False)
-                if r.status_code == 200:
-                    # JAXI often uses latin-1 or ISO-8859-15 encoding
-                    content = r.content.decode('ISO-8859-15')
-                    df_raw = pd.read_csv(io.StringIO(content), sep=';', decimal=',', encoding='utf-8')
-                    break
-            except: continue
-            
-        if df_raw is None:
+                with self.http.stream(url, timeout=30) as raw:
+                    text = io.TextIOWrapper(raw, encoding='ISO-8859-15', newline='')
+                    reader = pd.read_csv(text, sep=';', dtype=str, chunksize=self.jaxi_chunksize)
+                    rows, parts = 0, []
+                    for chunk in reader:
+                        rows += len(chunk)
+                        parts.append(process_chunk(chunk))
+                count_rows_in(rows)
+                return parts
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError):
+                continue
+            except (ValueError, KeyError, IndexError) as e:
+                print(f"❌ Could not parse JAXI {table_id} ({url}): {type(e).__name__}: {e}")
+                return None
+        return None
+
+    @instrumented(key='name')
+    def download_jaxi(self, table_id, name, filter_keyword=None, save=True):
+        """Downloads data from INE JAXI system (static CSV files), stored as indicator name unless save=False."""
+        print(f"⬇️ Downloading JAXI Table {table_id} ({name})... ")
+        
+        def keep_rows(chunk):
+            # Process JAXI matrix format: Years are usually the columns, first col is description
+            desc_col = chunk.columns[0]
+            year_cols = [c for c in chunk.columns if str(c).strip().isdigit() and len(str(c).strip()) == 4]
+            desc = chunk[desc_col].astype(str)
+            if filter_keyword:
+                chunk = chunk[desc.str.contains(filter_keyword, case=False, regex=False)]
+                desc = desc[chunk.index]
+            region = resolve_regions(desc).values
+            chunk = chunk.assign(_desc=desc.str.strip(), _region=region)[lambda d: d['_region'].notna()]
+            return chunk.melt(id_vars=['_desc', '_region'], value_vars=year_cols,
+                              var_name='_year', value_name='_valor', ignore_index=False)
+        
+        parts = self._read_jaxi(table_id, keep_rows)
+        if parts is None:
             print(f"❌ Failed to download JAXI {table_id}")
             return None
-            
-        # Process JAXI matrix format: Years are usually the columns, first col is description
-        year_cols = [c for c in df_raw.columns if str(c).strip().isdigit() and len(str(c).strip()) == 4]
-        desc_col = df_raw.columns[0]
         
-        records = []
-        for _, row in df_raw.iterrows():
-            desc = str(row[desc_col])
-            if filter_keyword and filter_keyword.lower() not in desc.lower(): continue
-            
-            from .config import REGIONS
-            row_desc_upper = desc.upper()
-            region = None
-            for code, name in REGIONS.items():
-                if name.upper() in row_desc_upper:
-                    region = code
-                    break
-                short_name = name.split(' de ')[-1].split(' Foral ')[-1].upper()
-                if short_name in row_desc_upper:
-                    region = code
-                    break
-            
-            if not region: continue
-            
-            for y in year_cols:
-                val_raw = str(row[y]).replace('.', '').replace(',', '.').strip()
-                try:
-                    val = float(val_raw)
-                    records.append({
-                        'Fecha': pd.to_datetime(f"{y}-01-01"),
-                        'Periodo': f"{y}-ANUAL",
-                        'Region': region,
-                        'Indicador': name,
-                        'Valor': val,
-                        'Frecuencia': 'Anual',
-                        'Serie_Original': desc.strip()
-                    })
-                except: continue
-                
-        if not records:
+        long = pd.concat(parts) if parts else pd.DataFrame(columns=['_desc', '_region', '_year', '_valor'])
+        long['Valor'] = _spanish_number(long['_valor'])
+        long = long[long['Valor'].notna()]
+        if long.empty:
             print(f"⚠️ No records extracted from JAXI {table_id}")
             return None
-            
-        df = pd.DataFrame(records)
-        if 'Region' in df.columns:
-             df = df.drop_duplicates(subset=['Periodo', 'Region', 'Indicador']).sort_values('Fecha')
         
-        path = os.path.join(DATA_PROCESSED, f"{name}.csv")
-        df.to_csv(path, index=False)
-        print(f"   ✅ Saved: {name}.csv ({len(df)} records)")
+        # Row-major order (file row, then year column), as the records were built before
+        long = long.sort_index(kind='stable')
+        year = long['_year'].astype(str).str.strip()
+        df = pd.DataFrame({
+            'Fecha': pd.to_datetime(year + "-01-01").values,
+            'Periodo': (year + "-ANUAL").values,
+            'Region': long['_region'].values,
+            'Indicador': name,
+            'Valor': long['Valor'].values,
+            'Frecuencia': 'Anual',
+            'Serie_Original': long['_desc'].values
+        })
+        df = df.drop_duplicates(subset=['Periodo', 'Region', 'Indicador']).sort_values('Fecha')
+        if not save:
+            return df
+        
+        path = save_indicator(df, name)
+        print(f"   ✅ Saved: {os.path.basename(path)} ({len(df)} records)")
         return df
 
-    def download_jaxi_long(self, table_ids, name, filters=None):
+    @instrumented(key='name')
+    def download_jaxi_long(self, table_ids, name, filters=None, save=True):
         """
         Downloads data from INE JAXI where years/periods are in a column (long format).
         table_ids: dict like {'ESP': '27153', 'AND': '27154'} OR single ID string for shared tables.
+        The result is stored as indicator name unless save=False.
         """
         if isinstance(table_ids, str):
             table_ids = {'ESP': table_ids, 'AND': table_ids}
             
         print(f"⬇️ Downloading JAXI Multi-Table ({name})...")
-        records = []
         
-        for region, tid in table_ids.items():
-            print(f"   🔄 [{region}] Downloading Table {tid}...")
-            df_raw = None
-            for base in self.jaxi_base_urls:
-                try:
-                    url = f"{base}{tid}.csv"
-                    r = requests.get(url, timeout=30, verify=False)
-                    if r.status_code == 200:
-                        content = r.content.decode('ISO-8859-15')
-                        df_raw = pd.read_csv(io.StringIO(content), sep=';', encoding='utf-8')
-                        break
-                except: continue
-            
-            if df_raw is None:
-                print(f"   ❌ Failed to download {region} table {tid}")
-                continue
-                
+        def keep_rows(chunk):
             # Apply filters
-            df_filt = df_raw.copy()
             if filters:
                 for col_key, val in filters.items():
-                    col_actual = next((c for c in df_filt.columns if col_key.lower() in c.lower()), None)
+                    col_actual = next((c for c in chunk.columns if col_key.lower() in c.lower()), None)
                     if col_actual:
-                        df_filt = df_filt[df_filt[col_actual].astype(str).str.contains(val, case=False, na=False)]
+                        chunk = chunk[chunk[col_actual].astype(str).str.contains(val, case=False, na=False)]
             
             # Find Period and Value columns
-            col_period = next((c for c in df_filt.columns if 'periodo' in c.lower()), None)
-            col_value = next((c for c in df_filt.columns if 'total' in c.lower()), None)
-            
+            col_period = next((c for c in chunk.columns if 'periodo' in c.lower()), None)
+            col_value = next((c for c in chunk.columns if 'total' in c.lower()), None)
             if not col_period or not col_value:
+                return None
+            period = chunk[col_period].astype(str).str.strip()
+            return pd.DataFrame({'_year': period, '_valor': chunk[col_value]})[period.str.isdigit()]
+        
+        frames = []
+        for region, tid in table_ids.items():
+            print(f"   🔄 [{region}] Downloading Table {tid}...")
+            parts = self._read_jaxi(tid, keep_rows)
+            
+            if parts is None:
+                print(f"   ❌ Failed to download {region} table {tid}")
+                continue
+            if not parts or any(p is None for p in parts):
                 print(f"   ⚠️ Row-based columns not found for {region}")
                 continue
+            
+            rows = pd.concat(parts)
+            rows['Valor'] = _spanish_number(rows['_valor'])
+            rows = rows[rows['Valor'].notna()]
+            frames.append(pd.DataFrame({
+                'Fecha': pd.to_datetime(rows['_year'] + "-01-01").values,
+                'Periodo': (rows['_year'] + "-ANUAL").values,
+                'Region': region,
+                'Indicador': name,
+                'Valor': rows['Valor'].values,
+                'Frecuencia': 'Anual',
+                'Serie_Original': f"{name}_{region}"
+            }))
                 
-            for _, row in df_filt.iterrows():
-                try:
-                    p_str = str(row[col_period]).strip()
-                    if not p_str.isdigit(): continue
-                    year = int(p_str)
-                    val = float(str(row[col_value]).replace(',', '.').strip())
-                    
-                    records.append({
-                        'Fecha': pd.to_datetime(f"{year}-01-01"),
-                        'Periodo': f"{year}-ANUAL",
-                        'Region': region,
-                        'Indicador': name,
-                        'Valor': val,
-                        'Frecuencia': 'Anual',
-                        'Serie_Original': f"{name}_{region}"
-                    })
-                except: continue
-                
-        if not records:
+        df = pd.concat(frames, ignore_index=True) if frames else None
+        if df is None or df.empty:
             print(f"   ⚠️ No records extracted for {name}")
             return None
             
-        df = pd.DataFrame(records)
-        if 'Region' in df.columns:
-            df = df.drop_duplicates(subset=['Periodo', 'Region', 'Indicador']).sort_values('Fecha')
-        
-        path = os.path.join(DATA_PROCESSED, f"{name}.csv")
-        df.to_csv(path, index=False)
-        print(f"   ✅ Saved: {name}.csv ({len(df)} records)")
+        df = df.drop_duplicates(subset=['Periodo', 'Region', 'Indicador']).sort_values('Fecha')
+        if not save:
+            return df
+
+        path = save_indicator(df, name)
+        print(f"   ✅ Saved: {os.path.basename(path)} ({len(df)} records)")
+        return df
+
+    def download_many(self, jobs, max_workers=8):
+        """
+        Runs several downloads concurrently over the shared session.
+        jobs: list of (kind, kwargs) with kind in 'tempus', 'jaxi', 'jaxi_long', e.g.
+              [('tempus', {'table_id': '50913', 'name': 'IPC_General'}), ...]
+        Returns the DataFrames (or None on failure) in the same order as jobs.
+        """
+        methods = {
+            'tempus': self.download_tempus,
+            'jaxi': self.download_jaxi,
+            'jaxi_long': self.download_jaxi_long
+        }
+        for kind, _ in jobs:
+            if kind not in methods:
+                raise ValueError(f"Unknown download kind: {kind}")
+        if not jobs:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+            futures = [pool.submit(bind(methods[kind]), **kwargs) for kind, kwargs in jobs]
+            return [f.result() for f in futures]
+
+class ReeConnector:
+    """
+    Connector for the REE REData API (monthly renewable / non-renewable generation by region).
+    Requests run concurrently under a token-bucket rate limit; every (geo_id, year) cell is
+    checkpointed to disk as soon as it arrives, so an interrupted run resumes where it stopped.
+    """
+    retry_statuses = (429, 500, 502, 503)
+    max_retry_after = 60  # Seconds; longer Retry-After values are capped
+
+    def __init__(self, client=None, rate=3.0, burst=3, checkpoint_dir=REE_CHECKPOINT_DIR, max_retries=3):
+        if max_retries < 1:
+            raise ValueError(f"max_retries must be at least 1, not {max_retries}")
+        self._client = client
+        self.base_url = "https://apidatos.ree.es"
+        self.widget = "/es/datos/generacion/evolucion-renovable-no-renovable"
+        self.headers = {
+            "Accept": "application/json",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+            "Referer": "https://www.ree.es/",
+            "Origin": "https://www.ree.es"
+        }
+        self.limiter = TokenBucket(rate, burst)
+        self.checkpoint_dir = checkpoint_dir
+        self.max_retries = max_retries
+        self.failures = {}
+
+    @property
+    def http(self):
+        return self._client or get_client()
+
+    def _params(self, geo_id, year):
+        """Electric systems (8741-8743) only take geo_limit; CCAA also need geo_trunc + geo_ids."""
+        params = {"start_date": f"{year}-01-01T00:00", "end_date": f"{year}-12-31T23:59", "time_trunc": "month"}
+        if geo_id in REE_SYSTEMS:
+            params["geo_limit"] = REE_SYSTEMS[geo_id]
+        else:
+            params.update({"geo_trunc": "electric_system", "geo_limit": "ccaa", "geo_ids": geo_id})
+        return params
+
+    def _checkpoint_path(self, geo_id, year):
+        return os.path.join(self.checkpoint_dir, f"{geo_id}_{year}.json")
+
+    def _load_checkpoint(self, geo_id, year):
+        """Stored records of a cell, or None if it has to be (re)fetched."""
+        path = self._checkpoint_path(geo_id, year)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cell = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # The running year keeps growing: its cells are only reused on the day they were fetched
+        today = pd.Timestamp.now()
+        if year >= today.year and cell.get('fetched') != today.strftime('%Y-%m-%d'):
+            return None
+        return cell['records']
+
+    def _save_checkpoint(self, geo_id, year, records):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = self._checkpoint_path(geo_id, year)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'fetched': pd.Timestamp.now().strftime('%Y-%m-%d'), 'records': records}, f)
+        os.replace(path + '.tmp', path)
+
+    def _retry_after(self, r):
+        """Seconds asked for by a Retry-After header (delta or HTTP date), capped, or None."""
+        value = r.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - pd.Timestamp.now(tz='UTC')).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.max_retry_after)
+
+    def _fetch(self, geo_id, year):
+        """
+        Downloads one cell with retries on 429 / 5xx / network errors, waiting Retry-After when
+        the server sends it and an exponential backoff otherwise; returns its records or raises.
+        Offline cache misses are raised at once: retrying cannot fill the cache.
+        """
+        url = f"{self.base_url}{self.widget}"
+        # Offline, nothing reaches the API, so no rate-limit tokens are spent
+        offline = getattr(getattr(self.http, 'cache', None), 'offline', False)
+        error, wait = None, None
+        for attempt in range(self.max_retries):
+            if attempt:
+                time.sleep(2 ** (attempt - 1) if wait is None else wait)
+            if not offline:
+                self.limiter.acquire()
+            wait = None
+            try:
+                r = self.http.get(url, params=self._params(geo_id, year), headers=self.headers, timeout=60)
+            except OfflineCacheMiss:
+                raise
+            except requests.RequestException as e:
+                error = e
+                continue
+            if r.status_code in self.retry_statuses:
+                error = requests.HTTPError(f"HTTP {r.status_code}", response=r)
+                wait = self._retry_after(r)
+                continue
+            r.raise_for_status()
+            return [
+                {'tipo': item.get('attributes', {}).get('title', ''), 'fecha': v.get('datetime', ''),
+                 'valor_MWh': v.get('value'), 'porcentaje': v.get('percentage')}
+                for item in r.json().get('included', [])
+                for v in item.get('attributes', {}).get('values', [])
+            ]
+        raise error
+
+    def _cell(self, geo_id, year):
+        records = self._load_checkpoint(geo_id, year)
+        if records is not None:
+            count(cache_hits=1)
+            return records, True
+        records = self._fetch(geo_id, year)
+        if records:
+            self._save_checkpoint(geo_id, year, records)
+        return records, False
+
+    def fetch_generation(self, years=None, geo_ids=None, max_workers=8):
+        """
+        Long DataFrame (geo_id, Region, tipo, fecha, valor_MWh, porcentaje) for every
+        (geo_id, year) cell. Failed cells are listed in self.failures and retried next run.
+        """
+        years = years or list(range(2016, pd.Timestamp.now().year + 1))
+        geo_ids = geo_ids or list(REE_GEO_IDS)
+        cells = [(g, y) for g in geo_ids for y in years]
+        self.failures = {}
+        frames = []
+        resumed = 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(bind(self._cell), g, y): (g, y) for g, y in cells}
+            for future in as_completed(futures):
+                geo_id, year = futures[future]
+                try:
+                    records, from_checkpoint = future.result()
+                except Exception as e:
+                    self.failures[(geo_id, year)] = str(e)
+                    continue
+                if not records:
+                    self.failures[(geo_id, year)] = "empty response"
+                    continue
+                resumed += from_checkpoint
+                frames.append(pd.DataFrame(records).assign(geo_id=geo_id, Region=REE_GEO_IDS[geo_id]))
+
+        print(f"   ✅ REE: {len(frames)}/{len(cells)} cells ({resumed} from checkpoints)")
+        if self.failures:
+            print(f"   ⚠️ {len(self.failures)} cells failed: {sorted(self.failures)[:5]}")
+        if not frames:
+            return None
+        cols = ['geo_id', 'Region', 'tipo', 'fecha', 'valor_MWh', 'porcentaje']
+        return pd.concat(frames, ignore_index=True)[cols]
+
+    @instrumented(key='name')
+    def download_renewables(self, name="ENE_REN", years=None, max_workers=8, save=True):
+        """Monthly renewable share of generation (%) per region as a standard long indicator."""
+        print(f"⬇️ Downloading REE renewable generation ({name})...")
+        raw = self.fetch_generation(years=years, max_workers=max_workers)
+        if raw is None:
+            return None
+        count_rows_in(len(raw))
+
+        ren = raw[raw['tipo'] == 'Renovable']
+        # Dates come with the Madrid offset; the calendar month is the first 10 characters
+        fechas = pd.to_datetime(ren['fecha'].str[:10])
+        df = pd.DataFrame({
+            'Fecha': fechas.values,
+            'Periodo': fechas.dt.strftime('%Y-M%m').values,
+            'Region': ren['Region'].values,
+            'Indicador': name,
+            'Valor': (pd.to_numeric(ren['porcentaje'], errors='coerce') * 100).round(2).values,
+            'Frecuencia': 'Mensual',
+            'Serie_Original': 'REE_generacion_renovable'
+        })
+        df = df.dropna(subset=['Valor']).drop_duplicates(subset=['Periodo', 'Region', 'Indicador'])
+        df = df.sort_values(['Region', 'Fecha'])
+        if not save:
+            return df
+
+        path = save_indicator(df, name)
+        print(f"   ✅ Saved: {os.path.basename(path)} ({len(df)} records)")
+        return df
+
+def _crime_categories(labels):
+    """Series of crime category labels -> normalized category codes (None when unmatched)."""
+    prefixes = sorted(((p, code) for code, ps in CRIME_CATEGORIES.items() for p in ps), key=lambda x: -len(x[0]))
+    numbering = re.compile(r"^(?:[0-9]+(?:\.[0-9]+)*|[ivx]+)\s*[.\-]+\s*")
+    def code_of(label):
+        text = numbering.sub("", normalize_text(label))
+        return next((code for p, code in prefixes if text.startswith(p)), None)
+    # One lookup per distinct label
+    uniques = pd.unique(labels)
+    return labels.map(dict(zip(uniques, [code_of(u) for u in uniques])))
+
+class CrimeConnector:
+    """
+    Connector for the Ministry of Interior crime balance (Portal Estadístico de Criminalidad).
+    Files hold values accumulated within each year: one per quarter, in DatosBalanceAnt for
+    closed years and DatosBalanceAct for the running one.
+    """
+
+    def __init__(self, client=None, timeout=15):
+        self._client = client
+        self.base_url = "https://estadisticasdecriminalidad.ses.mir.es/sec/jaxiPx/files/_px/es/csv_bdsc"
+        self.timeout = timeout
+        self.q_codes = {1: '001', 2: '004', 3: '007', 4: '010'}
+        self.report = None
+
+    @property
+    def http(self):
+        return self._client or get_client()
+
+    def _candidates(self, start_year, end_year=None):
+        """(source, year, quarter, url) of every file that may exist up to the current quarter."""
+        today = pd.Timestamp.now()
+        end_year = min(end_year or today.year, today.year)
+        ext = "csv_bdsc?nocab=1"
+        files = []
+        for year in range(start_year, end_year + 1):
+            for q, suffix in self.q_codes.items():
+                if (year, q) > (today.year, today.quarter):
+                    continue
+                # File codes as in the notebooks' ConectorCriminalidad._generar_url, which fetched the
+                # stored series from 2016-Q1: years since 2010, then '9' (one-digit offset, before
+                # 2020) or '09', then the quarter suffix; e.g. 2016-Q1 -> 69001, 2023-Q4 -> 1309010
+                code = f"{year - 2010}9{suffix}" if year < 2020 else f"{year - 2010}09{suffix}"
+                files.append(('Ant', year, q, f"{self.base_url}/DatosBalanceAnt/l0/{code}.{ext}"))
+        # The running year: its year is read from the file itself
+        for q, suffix in self.q_codes.items():
+            files.append(('Act', None, q, f"{self.base_url}/DatosBalanceAct/l0/09{suffix}.{ext}"))
+        return files
+
+    def _parse(self, content, year):
+        """
+        Cumulative values (Año, Region, Categoria, Valor_Acumulado) of one file, filtered to
+        year (or, if None, to the latest year it contains). Returns (year, DataFrame).
+        """
+        try:
+            text = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            text = content.decode('latin-1')
+        df = pd.read_csv(io.StringIO(text), sep=';', dtype=str, on_bad_lines='skip')
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        cols = {key: next((c for c in df.columns if key in c), None) for key in ('comunid', 'tipolog', 'periodo', 'total')}
+        missing = [k for k, c in cols.items() if c is None]
+        if missing:
+            raise ValueError(f"missing columns: {missing}")
+
+        periodo = df[cols['periodo']].astype(str)
+        if year is None:
+            years = periodo.str.extract(r"((?:19|20)\d{2})", expand=False).dropna()
+            if years.empty:
+                raise ValueError("no year in the period column")
+            year = int(years.astype(int).max())
+        keep = periodo.str.contains(str(year), regex=False) & ~periodo.str.contains(r"variaci|%", case=False, regex=True)
+        df = df[keep]
+        categoria = df[cols['tipolog']].astype(str).str.strip()
+        out = pd.DataFrame({
+            'Año': year,
+            'Region': resolve_regions(df[cols['comunid']].astype(str)).values,
+            'Categoria': categoria.values,
+            'Categoria_Norm': _crime_categories(categoria).values,
+            'Valor_Acumulado': _spanish_number(df[cols['total']]).values
+        })
+        return year, out[out['Region'].notna() & out['Valor_Acumulado'].notna()]
+
+    def _fetch(self, source, year, q, url):
+        """Downloads and parses one file; returns (status row, DataFrame or None)."""
+        status = {'Fuente': source, 'Año': year, 'Trimestre': q, 'URL': url, 'Estado': 'ok', 'Filas': 0}
+        try:
+            r = self.http.get(url, timeout=self.timeout)
+            if r.status_code != 200:
+                status['Estado'] = f"HTTP {r.status_code}"
+                return status, None
+            year, df = self._parse(r.content, year)
+        except Exception as e:
+            status['Estado'] = f"{type(e).__name__}: {e}"
+            return status, None
+        status['Año'], status['Filas'] = year, len(df)
+        return status, df.assign(Trimestre=q, _fuente=source)
+
+    @staticmethod
+    def _category_key(df):
+        """Normalized category, falling back to the accent-free label for unmapped ones."""
+        return df['Categoria_Norm'].astype(object).fillna(df['Categoria'].map(normalize_text))
+
+    @classmethod
+    def deaccumulate(cls, df):
+        """
+        Quarterly values from within-year cumulative ones, in one grouped shift over all
+        regions and categories. Q1 is the cumulative value itself; other quarters subtract
+        the previous quarter only when it is present (NaN otherwise, never a two-quarter gap).
+        """
+        df = df.assign(_key=cls._category_key(df)).sort_values(['Region', '_key', 'Año', 'Trimestre'])
+        grouped = df.groupby(['Region', '_key', 'Año'], sort=False)
+        prev_value = grouped['Valor_Acumulado'].shift(1)
+        prev_q = grouped['Trimestre'].shift(1)
+        df['Valor_Trimestral'] = np.where(
+            df['Trimestre'] == 1, df['Valor_Acumulado'],
+            np.where(prev_q == df['Trimestre'] - 1, df['Valor_Acumulado'] - prev_value, np.nan))
+        return df.drop(columns='_key')
+
+    @instrumented(key='name')
+    def download_crime(self, name="Criminalidad_Full", start_year=2016, end_year=None, max_workers=8, save=True):
+        """
+        Fetches every available quarter concurrently, de-accumulates and saves the indicator (unless save=False).
+        Per-file outcomes are kept in self.report; closed-year files win over the running-year ones.
+        """
+        print(f"⬇️ Downloading crime balance {start_year}-{end_year or 'now'} ({name})...")
+        candidates = self._candidates(start_year, end_year)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(bind(lambda c: self._fetch(*c)), candidates))
+
+        self.report = pd.DataFrame([status for status, _ in results])
+        frames = [df for _, df in results if df is not None and not df.empty]
+        # Quarters of the running year are expected to be missing from DatosBalanceAnt
+        act = self.report[(self.report['Fuente'] == 'Act') & (self.report['Estado'] == 'ok')]
+        covered = self.report[['Año', 'Trimestre']].apply(tuple, axis=1).isin(set(act[['Año', 'Trimestre']].apply(tuple, axis=1)))
+        self.report.loc[covered & (self.report['Fuente'] == 'Ant') & (self.report['Estado'] != 'ok'), 'Estado'] = 'in DatosBalanceAct'
+        failed = self.report[~self.report['Estado'].isin(['ok', 'in DatosBalanceAct'])]
+        if len(failed):
+            print(f"   ⚠️ {len(failed)} of {len(candidates)} files unavailable or unreadable (see .report)")
+        # A closed year without any file usually means its file codes changed on the portal
+        ant = self.report[self.report['Fuente'] == 'Ant']
+        missing_years = sorted(set(ant['Año']) - set(ant.loc[ant['Estado'].isin(['ok', 'in DatosBalanceAct']), 'Año']))
+        if missing_years:
+            print(f"   ⚠️ No DatosBalanceAnt file for {', '.join(map(str, missing_years))}: check the codes in _candidates")
+        if not frames:
+            print("   ❌ No crime data downloaded")
+            return None
+
+        df = pd.concat(frames, ignore_index=True)
+        count_rows_in(len(df))
+        df = df[(df['Año'] >= start_year) & (df['Año'] <= (end_year or df['Año'].max()))]
+        # Ant before Act, so a quarter present in both keeps the closed-year file
+        df = df.assign(_key=self._category_key(df), _priority=df['_fuente'].map({'Ant': 0, 'Act': 1}))
+        df = df.sort_values('_priority', kind='stable').drop(columns='_priority')
+        df = df.drop_duplicates(subset=['Año', 'Trimestre', 'Region', '_key'], keep='first').drop(columns=['_fuente', '_key'])
+        df['Periodo'] = df['Año'].astype(str) + "-Q" + df['Trimestre'].astype(str)
+        df = self.deaccumulate(df)
+        df = df[['Año', 'Trimestre', 'Region', 'Categoria', 'Categoria_Norm', 'Valor_Acumulado', 'Periodo', 'Valor_Trimestral']]
+
+        quarters = df[['Año', 'Trimestre']].drop_duplicates()
+        print(f"   📥 {len(quarters)} quarters, {df['Region'].nunique()} regions, {df['Categoria'].nunique()} categories")
+        if not save:
+            return df
+        path = save_indicator(df, name)
+        print(f"   ✅ Saved: {os.path.basename(path)} ({len(df)} records)")
         return df
@@ -1,67 +1,183 @@
 import pandas as pd
 import os
-import glob
-from .config import DATA_PROCESSED
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from .config import DATA_PROCESSED, ensure_dirs
+from .regions import canonical_codes
+from .storage import list_indicators, load_indicator, get_backend
+from .export import write_results_workbook, submit_export
+from .instrumentation import instrumented, bind
+
+KEY = ['Periodo', 'Region', 'Indicador']
+
+# Outputs, plus the state of the last run: input fingerprints and the long rows they produced
+MASTER_FILE = "IPA27_Master_Table.csv"
+EXCEL_FILE = "IPA27_Results.xlsx"
+MANIFEST_FILE = "IPA27_Long_Store.manifest.json"
+LONG_STORE_NAME = "IPA27_Long_Store"
 
 class IPA27Consolidator:
-    """Engine to merge multiple indicator CSVs into a Master Table."""
-    
-    def __init__(self):
+    """Engine to merge multiple indicator files into a Master Table."""
+
+    def __init__(self, max_workers=8, on_conflict='first', background_export=False, directory=DATA_PROCESSED):
         self.master_df = None
+        self.directory = directory  # Where the indicators are read and the outputs and manifest written
+        # With background_export the workbook is written on a separate thread;
+        # wait on self.export_future (a concurrent.futures.Future) before reading it.
+        self.background_export = background_export
+        self.export_future = None
+        self.conflicts = None
+        self.max_workers = max_workers
+        # Rows giving different values for the same (Periodo, Region, Indicador) are always reported
+        # (see self.conflicts). 'first' keeps the first one in listing order, 'raise' aborts.
+        self.on_conflict = on_conflict
+
+    def _load_long(self, name, file):
+        """Reads one indicator as long rows (Periodo, Region, Indicador, Valor, Fuente)."""
+        df = load_indicator(file, columns=['Periodo', 'Region', 'Indicador', 'Valor'])
+
+        # Ensure standard columns
+        if not all(col in df.columns for col in ['Periodo', 'Region', 'Valor']):
+            print(f"   ⚠️ Skipping {name}: Missing standard columns.")
+            return None
+
+        # Use 'Indicador' if present, else filename
+        indicator_name = df['Indicador'].iloc[0] if 'Indicador' in df.columns else name
+
+        # Older files may still carry legacy region codes
+        return pd.DataFrame({
+            'Periodo': df['Periodo'].astype(str).values,
+            'Region': canonical_codes(df['Region'].astype(str)).values,
+            'Indicador': indicator_name,
+            'Valor': df['Valor'].astype(float).values,
+            'Fuente': name
+        })
+
+    def _resolve_conflicts(self, long_df):
+        """Collapses repeated keys; raises (or keeps the first value) when their values disagree."""
+        long_df = long_df.drop_duplicates(subset=KEY + ['Valor'])
+        dup = long_df.duplicated(subset=KEY, keep=False)
+        if not dup.any():
+            self.conflicts = long_df.iloc[0:0]
+            return long_df
+
+        self.conflicts = long_df[dup].sort_values(KEY)
+        keys = self.conflicts[KEY].drop_duplicates()
+        sample = ", ".join("/".join(k) for k in keys.head(5).itertuples(index=False))
+        msg = (f"{len(keys)} conflicting (Periodo, Region, Indicador) keys in "
+               f"{self.conflicts['Fuente'].nunique()} file(s), e.g. {sample}")
+        if self.on_conflict == 'raise':
+            raise ValueError(f"❌ {msg}. See consolidator.conflicts or use on_conflict='first'.")
+        print(f"   ⚠️ {msg}; keeping the first value.")
+        return long_df.drop_duplicates(subset=KEY, keep='first')
+
+    def build_master(self, long_df):
+        """Long rows -> wide master table (one column per indicator) with a single pivot."""
+        long_df = self._resolve_conflicts(long_df)
+        indicators = list(pd.unique(long_df['Indicador']))
+        merged_df = long_df.pivot(index=['Periodo', 'Region'], columns='Indicador', values='Valor')
+        merged_df = merged_df[indicators].reset_index()
+        merged_df.columns.name = None
+        # Sort by Period
+        return merged_df.sort_values(['Periodo', 'Region'], ascending=[False, True])
+
+    def _file_entry(self, path, previous=None):
+        """Manifest entry for path; the content hash is reused when mtime and size are unchanged."""
+        st = os.stat(path)
+        if previous and previous['path'] == path and previous['mtime'] == st.st_mtime and previous['size'] == st.st_size:
+            return previous
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        return {'path': path, 'mtime': st.st_mtime, 'size': st.st_size, 'sha256': sha.hexdigest()}
+
+    def _load_state(self):
+        """Previous manifest and long-form store, or ({}, None) if missing or unreadable."""
+        backend = get_backend()
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            store = backend.read(os.path.join(self.directory, LONG_STORE_NAME + backend.ext))
+        except (OSError, ValueError):
+            return {}, None
+        return manifest, store
 
-    def consolidate(self):
-        """Finds all CSVs in data/processed and merges them."""
-        csv_files = glob.glob(os.path.join(DATA_PROCESSED, "*.csv"))
-        # Exclude existing master table if present
-        csv_files = [f for f in csv_files if "Master_Table" not in f and "Results" not in f]
-        
-        if not csv_files:
-            print("❌ No processed CSV files found to consolidate.")
+    def _save_state(self, manifest, long_df):
+        backend = get_backend()
+        backend.write(long_df, os.path.join(self.directory, LONG_STORE_NAME + backend.ext))
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+    def _write_outputs(self, merged_df, excel_path, manifest, long_df):
+        """Writes the workbook, then the state: a failed export leaves the previous state, so it is redone."""
+        write_results_workbook(merged_df, excel_path)
+        self._save_state(manifest, long_df)
+        return excel_path
+
+    @instrumented()
+    def consolidate(self, incremental=True):
+        """
+        Finds all stored indicators in self.directory (data/processed) and merges them.
+        With incremental=True only files whose content changed since the last run
+        (per the manifest) are re-read; an unchanged set of inputs is a no-op.
+        """
+        ensure_dirs()
+        # Master table / results are excluded by list_indicators
+        files = list_indicators(self.directory)
+
+        if not files:
+            print("❌ No processed indicator files found to consolidate.")
             return None
-            
-        print(f"🔄 Consolidating {len(csv_files)} indicators...")
-        
-        merged_df = None
-        
-        for file in csv_files:
-            name = os.path.basename(file).replace(".csv", "")
-            df = pd.read_csv(file)
-            
-            # Ensure standard columns
-            if not all(col in df.columns for col in ['Periodo', 'Region', 'Valor']):
-                print(f"   ⚠️ Skipping {name}: Missing standard columns.")
-                continue
-                
-            # Use 'Indicador' if present, else filename
-            indicator_name = df['Indicador'].iloc[0] if 'Indicador' in df.columns else name
-            
-            # Prepare for join
-            temp_df = df[['Periodo', 'Region', 'Valor']].copy()
-            temp_df.columns = ['Periodo', 'Region', indicator_name]
-            
-            if merged_df is None:
-                merged_df = temp_df
-            else:
-                merged_df = pd.merge(merged_df, temp_df, on=['Periodo', 'Region'], how='outer')
-        
-        if merged_df is not None:
-            # Sort by Period
-            merged_df = merged_df.sort_values(['Periodo', 'Region'], ascending=[False, True])
-            
-            # Export Master Table
-            master_path = os.path.join(DATA_PROCESSED, "IPA27_Master_Table.csv")
-            merged_df.to_csv(master_path, index=False)
-            print(f"✅ Master Table generated: {master_path} ({len(merged_df)} rows)")
-            
-            # Export to Excel with multiple sheets
-            excel_path = os.path.join(DATA_PROCESSED, "IPA27_Results.xlsx")
-            with pd.ExcelWriter(excel_path) as writer:
-                merged_df.to_excel(writer, sheet_name='Master_Table', index=False)
-                # Regional sheets
-                for reg in merged_df['Region'].unique():
-                    merged_df[merged_df['Region'] == reg].to_excel(writer, sheet_name=f'Data_{reg}', index=False)
-            
+
+        manifest, store = self._load_state() if incremental else ({}, None)
+        previous = manifest.get('files', {}) if store is not None else {}
+        entries = {name: self._file_entry(path, previous.get(name)) for name, path in files.items()}
+        changed = [name for name, e in entries.items()
+                   if name not in previous or previous[name]['sha256'] != e['sha256'] or previous[name]['path'] != e['path']]
+        removed = [name for name in previous if name not in entries]
+        master_path = os.path.join(self.directory, MASTER_FILE)
+        excel_path = os.path.join(self.directory, EXCEL_FILE)
+        outputs_exist = os.path.exists(master_path) and os.path.exists(excel_path)
+
+        if store is not None and not changed and not removed and outputs_exist:
+            print(f"✅ No indicator changes since last consolidation ({len(files)} indicators)")
+            if entries != previous:
+                self._save_state({'files': entries}, store)
+            self.master_df = self.build_master(store)
+            return self.master_df
+
+        print(f"🔄 Consolidating {len(changed)} of {len(files)} indicators...")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            parts = list(pool.map(bind(lambda name: self._load_long(name, files[name])), changed))
+        parts = [p for p in parts if p is not None]
+        if store is not None:
+            parts.insert(0, store[~store['Fuente'].isin(changed + removed)])
+        if not parts:
+            return None
+
+        # Same row order as a full rebuild: files in listing order
+        long_df = pd.concat(parts, ignore_index=True)
+        rank = {name: i for i, name in enumerate(files)}
+        long_df = long_df.iloc[long_df['Fuente'].map(rank).argsort(kind='stable')].reset_index(drop=True)
+
+        merged_df = self.build_master(long_df)
+
+        # Export Master Table
+        merged_df.to_csv(master_path, index=False)
+        print(f"✅ Master Table generated: {master_path} ({len(merged_df)} rows)")
+
+        # Export to Excel: master sheet plus one sheet per region, streamed
+        if self.background_export:
+            self.export_future = submit_export(self._write_outputs, merged_df, excel_path, {'files': entries}, long_df)
+            print(f"⏳ Excel Results being written in background: {excel_path}")
+        else:
+            self._write_outputs(merged_df, excel_path, {'files': entries}, long_df)
             print(f"✅ Excel Results generated: {excel_path}")
-            self.master_df = merged_df
-            
+        self.master_df = merged_df
+
         return merged_df
@@ -0,0 +1,292 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular, lu_factor, lu_solve
+from .config import DISAGGREGATION_REGRESSORS
+from .storage import STANDARD_COLUMNS
+from .instrumentation import instrumented
+
+# Temporal disaggregation (annual -> quarterly, or any lower -> higher frequency) of a long panel.
+# Series sharing the same shape (frequency pair, length, observed low periods) are solved together:
+# the aggregation matrix, AR(1) covariance and their Cholesky / LU factors are built once per shape
+# and every region's series is a column of one stacked right-hand side.
+
+PERIODS_PER_YEAR = {'Anual': 1, 'Trimestral': 4, 'Mensual': 12}
+CONVERSIONS = ('sum', 'mean', 'first', 'last')
+RHO_GRID = np.round(np.arange(0, 1, 0.01), 2)  # 0.00 ... 0.99
+MIN_CHOW_LIN_PERIODS = 3  # Low-frequency observations needed to estimate constant + slope
+# Denton as in the methodology: proportional (relative changes) with second-order differences.
+# Series with a non-positive benchmark use the additive form, where relative changes are undefined.
+DENTON_ORDER = 2
+DENTON_PROPORTIONAL = True
+
+def parse_periods(periods):
+    """Periodo labels ('2020-ANUAL', '2020-Q3', '2020-M07', '2020') -> (frequency, year, position)."""
+    labels = pd.Series(periods).astype(str)
+    uniq, inv = np.unique(labels.to_numpy(), return_inverse=True)
+    parts = pd.Series(uniq).str.extract(r'^(\d{4})(?:-(ANUAL|Q[1-4]|M\d{2}))?$')
+    tag = parts[1].fillna('ANUAL')
+    freq = np.where(tag.str.startswith('Q'), 'Trimestral',
+                    np.where(tag.str.startswith('M'), 'Mensual', 'Anual')).astype(object)
+    freq[parts[0].isna().to_numpy()] = None
+    year = pd.to_numeric(parts[0], errors='coerce').fillna(-1).to_numpy(np.int64)
+    pos = pd.to_numeric(tag.str[1:], errors='coerce').fillna(1).to_numpy(np.int64) - 1
+    inv = inv.ravel()
+    return freq[inv], year[inv], pos[inv]
+
+def period_frame(index, freq):
+    """Fecha (period start) and Periodo labels for high-frequency indices year * ppy + position."""
+    ppy = PERIODS_PER_YEAR[freq]
+    uniq, inv = np.unique(index, return_inverse=True)
+    year, pos = uniq // ppy, uniq % ppy
+    if freq == 'Trimestral':
+        labels = np.array([f"{y}-Q{p + 1}" for y, p in zip(year, pos)], dtype=object)
+    elif freq == 'Mensual':
+        labels = np.array([f"{y}-M{p + 1:02d}" for y, p in zip(year, pos)], dtype=object)
+    else:
+        labels = np.array([f"{y}-ANUAL" for y in year], dtype=object)
+    month = pos * (12 // ppy) + 1
+    fechas = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': 1}))
+    return fechas.to_numpy()[inv.ravel()], labels[inv.ravel()]
+
+@lru_cache(maxsize=None)
+def aggregation_matrix(n_high, ratio, conversion='sum', observed=None):
+    """
+    C (n_low x n_high) mapping high-frequency values to low-frequency ones. Row t aggregates
+    high periods t * ratio ... t * ratio + ratio - 1; observed (positions of the available low
+    periods) drops the rows of missing ones, and high periods past the last low one (extrapolation)
+    get zero columns.
+    """
+    if conversion not in CONVERSIONS:
+        raise ValueError(f"conversion must be one of {CONVERSIONS}, not {conversion!r}")
+    weights = {'sum': np.ones(ratio), 'mean': np.full(ratio, 1 / ratio),
+               'first': np.eye(ratio)[0], 'last': np.eye(ratio)[-1]}[conversion]
+    observed = tuple(range(n_high // ratio)) if observed is None else observed
+    C = np.zeros((len(observed), n_high))
+    for row, t in enumerate(observed):
+        C[row, t * ratio:(t + 1) * ratio] = weights
+    C.flags.writeable = False
+    return C
+
+@lru_cache(maxsize=None)
+def ar1_covariance(n, rho):
+    """Covariance of a unit-innovation stationary AR(1): rho^|i-j| / (1 - rho^2)."""
+    lags = np.abs(np.subtract.outer(np.arange(n), np.arange(n)))
+    omega = rho ** lags / (1 - rho ** 2)
+    omega.flags.writeable = False
+    return omega
+
+@lru_cache(maxsize=4096)
+def _chow_lin_factors(n_high, ratio, conversion, observed, rho):
+    """Omega C', the Cholesky factor L of V = C Omega C' and log|V| for one shape and rho."""
+    C = aggregation_matrix(n_high, ratio, conversion, observed)
+    oc = ar1_covariance(n_high, rho) @ C.T
+    L = np.linalg.cholesky(C @ oc)
+    return oc, L, 2 * np.log(np.diag(L)).sum()
+
+@lru_cache(maxsize=None)
+def _denton_kkt(n_high, ratio, conversion, observed, order):
+    """
+    KKT matrix (read-only) of additive Denton without indicator:
+    min ||D^order x||^2 subject to C x = y.
+    """
+    C = aggregation_matrix(n_high, ratio, conversion, observed)
+    D = np.diff(np.eye(n_high), n=order, axis=0)
+    n_low = C.shape[0]
+    kkt = np.zeros((n_high + n_low, n_high + n_low))
+    kkt[:n_high, :n_high] = D.T @ D
+    kkt[:n_high, n_high:] = C.T
+    kkt[n_high:, :n_high] = C
+    kkt.flags.writeable = False
+    return kkt
+
+@lru_cache(maxsize=None)
+def _denton_factor(n_high, ratio, conversion, observed, order):
+    """LU factor of the additive Denton KKT system, shared by every series of one shape."""
+    return lu_factor(_denton_kkt(n_high, ratio, conversion, observed, order))
+
+def _benchmark_levels(Y, shape):
+    """
+    Level of every high period implied by the benchmarks (R x n_high): the low value of its
+    period (divided by ratio for 'sum'), linearly interpolated over missing low periods and held
+    flat past the first and last ones.
+    """
+    n_high, ratio, conversion, observed = shape
+    blocks = np.arange(-(-n_high // ratio))
+    levels = np.vstack([np.interp(blocks, observed, y) for y in Y.T])
+    if conversion == 'sum':
+        levels = levels / ratio
+    return np.repeat(levels, ratio, axis=1)[:, :n_high]
+
+def _chow_lin_fit(Y, X, shape, rho):
+    """
+    GLS fit of every column of Y (n_low x R) on its regressors X (R x n_high x k) for one rho.
+    Returns (beta, whitened residuals, concentrated log-likelihood) per series.
+    """
+    n_high, ratio, conversion, observed = shape
+    C = aggregation_matrix(*shape)
+    oc, L, logdet = _chow_lin_factors(n_high, ratio, conversion, observed, rho)
+    n_low, R = Y.shape
+    k = X.shape[2]
+    Xl = C @ X  # R x n_low x k
+    # One triangular solve for all series: [Xl_1 | ... | Xl_R | Y] whitened by L^-1
+    rhs = np.concatenate([Xl.transpose(1, 0, 2).reshape(n_low, R * k), Y], axis=1)
+    white = solve_triangular(L, rhs, lower=True, check_finite=False)
+    zx = white[:, :R * k].reshape(n_low, R, k).transpose(1, 0, 2)
+    zy = white[:, R * k:].T  # R x n_low
+    beta = np.linalg.solve(zx.transpose(0, 2, 1) @ zx, (zx.transpose(0, 2, 1) @ zy[..., None]))[..., 0]
+    resid = zy - (zx @ beta[..., None])[..., 0]
+    ssr = (resid ** 2).sum(axis=1)
+    loglik = -0.5 * n_low * (np.log(2 * np.pi * ssr / n_low) + 1) - 0.5 * logdet
+    return beta, resid, loglik
+
+def chow_lin(Y, X, shape, rho=None, rho_grid=RHO_GRID):
+    """
+    Chow-Lin with AR(1) residuals for a stack of series sharing one shape
+    (n_high, ratio, conversion, observed): Y is n_low x R, X is R x n_high x k.
+    rho=None picks, per series, the grid value with the highest likelihood.
+    Returns (high-frequency values R x n_high, rho per series).
+    """
+    n_high, ratio, conversion, observed = shape
+    if rho is None:
+        logliks = np.vstack([_chow_lin_fit(Y, X, shape, float(r))[2] for r in rho_grid])
+        rhos = np.asarray(rho_grid, dtype=float)[np.nanargmax(np.where(np.isnan(logliks), -np.inf, logliks), axis=0)]
+    else:
+        rhos = np.full(Y.shape[1], float(rho))
+
+    out = np.empty((Y.shape[1], n_high))
+    for r in np.unique(rhos):
+        cols = np.flatnonzero(rhos == r)
+        beta, resid, _ = _chow_lin_fit(Y[:, cols], X[cols], shape, float(r))
+        oc, L, _ = _chow_lin_factors(n_high, ratio, conversion, observed, float(r))
+        # Distribute the low-frequency residual u = y - C X beta with Omega C' V^-1 u = Omega C' L^-T e
+        smooth = oc @ solve_triangular(L.T, resid.T, lower=False, check_finite=False)
+        out[cols] = (X[cols] @ beta[..., None])[..., 0] + smooth.T
+    return out, rhos
+
+def denton(Y, shape, order=DENTON_ORDER, proportional=DENTON_PROPORTIONAL):
+    """
+    Denton without indicator for a stack of series sharing one shape: Y is n_low x R.
+
+    Additive: min ||D^order x||^2 subject to C x = y. Proportional (as in the methodology):
+    min ||W D^order x||^2, W dividing each difference by the benchmark level of its first period,
+    so changes are penalised relative to the level (order=1: sum ((x_q - x_q-1) / p_q-1)^2).
+    Series with a non-positive benchmark fall back to additive. order is capped at the number of
+    observed low periods, below which the problem has no unique solution.
+    Returns (high-frequency values R x n_high, per-series True where proportional, order used).
+    """
+    n_high, ratio, conversion, observed = shape
+    order = max(1, min(order, len(observed)))
+    out = np.empty((Y.shape[1], n_high))
+    prop = np.full(Y.shape[1], False)
+    if proportional:
+        prop = (Y > 0).all(axis=0)
+    if (~prop).any():
+        rhs = np.vstack([np.zeros((n_high, int((~prop).sum()))), Y[:, ~prop]])
+        out[~prop] = lu_solve(_denton_factor(*shape, order), rhs, check_finite=False)[:n_high].T
+    if prop.any():
+        # Squared weights 1 / level^2 per difference, scaled to mean 1 per series (same minimiser,
+        # better conditioned system); D' W^2 D replaces D' D in the KKT matrix
+        w2 = _benchmark_levels(Y[:, prop], shape)[:, :n_high - order] ** -2.0
+        w2 = w2 / w2.mean(axis=1, keepdims=True)
+        D = np.diff(np.eye(n_high), n=order, axis=0)
+        kkt = np.broadcast_to(_denton_kkt(*shape, order), (len(w2),) + (n_high + Y.shape[0],) * 2).copy()
+        kkt[:, :n_high, :n_high] = np.einsum('qi,rq,qj->rij', D, w2, D)
+        rhs = np.concatenate([np.zeros((len(w2), n_high)), Y[:, prop].T], axis=1)
+        out[prop] = np.linalg.solve(kkt, rhs[..., None])[:, :n_high, 0]
+    return out, prop, order
+
+def _series_jobs(panel_long, to, method, regressors, conversion):
+    """One job per low-frequency (Indicador, Region) series, with its regressor when Chow-Lin applies."""
+    freq, year, pos = parse_periods(panel_long['Periodo'])
+    ppy = PERIODS_PER_YEAR[to]
+    lppy = pd.Series(freq).map(PERIODS_PER_YEAR).to_numpy(float)
+    data = pd.DataFrame({
+        'Indicador': panel_long['Indicador'].astype(str).to_numpy(),
+        'Region': panel_long['Region'].astype(str).to_numpy(),
+        'Frecuencia': freq,
+        't': year * np.nan_to_num(lppy, nan=1).astype(np.int64) + pos,
+        'Valor': pd.to_numeric(panel_long['Valor'], errors='coerce').to_numpy(float),
+    })
+    data = data[data['Valor'].notna() & (lppy > 0)]
+    high = data[data['Frecuencia'] == to]
+    high_series = {key: g.set_index('t')['Valor'].sort_index()
+                   for key, g in high.groupby(['Indicador', 'Region'], sort=False)}
+    low = data[data['Frecuencia'].map(PERIODS_PER_YEAR) < ppy]
+
+    jobs = []
+    for (ind, reg, f), g in low.groupby(['Indicador', 'Region', 'Frecuencia'], sort=True):
+        g = g.drop_duplicates('t', keep='last').sort_values('t')
+        ratio = ppy // PERIODS_PER_YEAR[f]
+        t = g['t'].to_numpy()
+        conv = conversion.get(ind, 'mean') if isinstance(conversion, dict) else conversion
+        job = {'Indicador': ind, 'Region': reg, 'ratio': ratio, 'conversion': conv,
+               'start': t[0] * ratio, 'observed': tuple(t - t[0]), 'y': g['Valor'].to_numpy(),
+               'n_high': (t[-1] - t[0] + 1) * ratio, 'x': None, 'regressor': None}
+        reg_name = (regressors or {}).get(ind)
+        x = high_series.get((reg_name, reg)) if method == 'chow-lin' else None
+        if x is not None and len(t) >= MIN_CHOW_LIN_PERIODS:
+            # The regressor must cover the whole span; past the last low period it extends the series
+            last = max(job['start'] + job['n_high'] - 1, int(x.index.max()))
+            x = x.reindex(range(job['start'], last + 1))
+            if x.notna().all():
+                job.update(x=x.to_numpy(), n_high=len(x), regressor=reg_name)
+        jobs.append(job)
+    return jobs
+
+@instrumented()
+def disaggregate(panel_long, method='chow-lin', regressors=None, to='Trimestral', conversion='mean',
+                 rho=None, rho_grid=RHO_GRID, order=DENTON_ORDER, proportional=DENTON_PROPORTIONAL):
+    """
+    Disaggregates every lower-frequency series of a long panel (standard columns) to frequency to.
+
+    method='chow-lin' regresses each series on its regressor (regressors: {indicator: regressor
+    indicator}, both in panel_long; DISAGGREGATION_REGRESSORS by default) with AR(1) residuals,
+    choosing rho by maximum likelihood over rho_grid unless rho is given; the result is extended
+    to the regressor's last period. Series without a regressor covering their span, or with fewer
+    than MIN_CHOW_LIN_PERIODS observations, and method='denton' use Denton of the given difference
+    order, proportional unless proportional=False (see denton). conversion ('mean', 'sum', 'first', 'last', or {indicator: conversion}) is
+    how high-frequency values add up to the low-frequency one; the result always reproduces it.
+    Returns the standard long schema with the method (and rho) in Serie_Original.
+    """
+    if method not in ('chow-lin', 'denton'):
+        raise ValueError(f"method must be 'chow-lin' or 'denton', not {method!r}")
+    regressors = DISAGGREGATION_REGRESSORS if regressors is None else regressors
+    jobs = _series_jobs(panel_long, to, method, regressors, conversion)
+    if not jobs:
+        return pd.DataFrame(columns=STANDARD_COLUMNS)
+
+    groups = {}
+    for job in jobs:
+        kind = 'chow-lin' if job['x'] is not None else 'denton'
+        shape = (job['n_high'], job['ratio'], job['conversion'], job['observed'])
+        groups.setdefault((kind, shape), []).append(job)
+
+    for (kind, shape), members in groups.items():
+        Y = np.column_stack([j['y'] for j in members])
+        if kind == 'chow-lin':
+            X = np.stack([np.column_stack([np.ones(shape[0]), j['x']]) for j in members])
+            values, rhos = chow_lin(Y, X, shape, rho, rho_grid)
+            for j, v, r in zip(members, values, rhos):
+                j.update(values=v, source=f"Chow-Lin({j['regressor']}, rho={r:.2f})")
+        else:
+            values, prop, d = denton(Y, shape, order, proportional)
+            for j, v, p in zip(members, values, prop):
+                j.update(values=v, source=f"Denton({'proportional' if p else 'additive'}, d={d})")
+
+    n_chow_lin = sum(len(m) for (kind, _), m in groups.items() if kind == 'chow-lin')
+    print(f"📐 Disaggregated {len(jobs)} series ({n_chow_lin} Chow-Lin, {len(jobs) - n_chow_lin} Denton) "
+          f"in {len(groups)} stacked problems")
+
+    lengths = np.array([len(j['values']) for j in jobs])
+    index = np.concatenate([j['start'] + np.arange(len(j['values'])) for j in jobs])
+    fechas, periodos = period_frame(index, to)
+    return pd.DataFrame({
+        'Fecha': fechas,
+        'Periodo': periodos,
+        'Region': np.repeat([j['Region'] for j in jobs], lengths),
+        'Indicador': np.repeat([j['Indicador'] for j in jobs], lengths),
+        'Valor': np.concatenate([j['values'] for j in jobs]),
+        'Frecuencia': to,
+        'Serie_Original': np.repeat([j['source'] for j in jobs], lengths)
+    })
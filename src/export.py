@@ -0,0 +1,110 @@
+import os
+import math
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from .instrumentation import stage
+
+# Excel sheet names are limited to 31 characters
+MAX_SHEET_NAME = 31
+
+_executor = None
+
+def _rows(df):
+    """Header + body rows as plain Python lists; NaN/NaT become None (empty cells)."""
+    yield [str(c) for c in df.columns]
+    body = df.astype(object).where(df.notna(), None)
+    for row in body.itertuples(index=False, name=None):
+        yield [v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row]
+
+def _write_xlsxwriter(sheets, path):
+    import xlsxwriter
+    # constant_memory flushes each row to disk as soon as the next one starts
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True, 'default_date_format': 'yyyy-mm-dd',
+        'strings_to_urls': False, 'strings_to_formulas': False
+    })
+    try:
+        for name, df in sheets:
+            ws = workbook.add_worksheet(name[:MAX_SHEET_NAME])
+            for r, row in enumerate(_rows(df)):
+                ws.write_row(r, 0, [None if isinstance(v, float) and math.isinf(v) else v for v in row])
+    finally:
+        workbook.close()
+
+def _write_openpyxl(sheets, path):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for name, df in sheets:
+        ws = workbook.create_sheet(name[:MAX_SHEET_NAME])
+        for row in _rows(df):
+            ws.append(row)
+    workbook.save(path)
+
+def write_workbook(sheets, path, engine=None):
+    """
+    Streams sheets (dict or iterable of (sheet_name, DataFrame)) to an .xlsx file row by row.
+    Uses xlsxwriter in constant_memory mode when installed, else openpyxl's write-only mode.
+    """
+    if isinstance(sheets, dict):
+        sheets = sheets.items()
+    if engine is None:
+        try:
+            import xlsxwriter  # noqa: F401
+            engine = 'xlsxwriter'
+        except ImportError:
+            engine = 'openpyxl'
+    writer = {'xlsxwriter': _write_xlsxwriter, 'openpyxl': _write_openpyxl}[engine]
+    with stage('export.write_workbook', engine=engine, path=os.path.basename(path)) as record:
+        record.rows_in = 0
+
+        def counted():
+            for name, df in sheets:
+                record.rows_in += len(df)
+                yield name, df
+        # Written beside the target and renamed into place, so a failed write never leaves a partial workbook
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.xlsx.tmp')
+        os.close(fd)
+        try:
+            writer(counted(), tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        record.rows_out = record.rows_in
+    return path
+
+def results_sheets(merged_df, by='Region', prefix='Data_'):
+    """Master_Table sheet followed by one sheet per group, splitting the frame in a single groupby."""
+    yield 'Master_Table', merged_df
+    for key, group in merged_df.groupby(by, sort=False):
+        yield f"{prefix}{key}", group
+
+def write_results_workbook(merged_df, path, by='Region', engine=None):
+    """IPA27_Results.xlsx layout: the master table plus one Data_<region> sheet per region."""
+    return write_workbook(results_sheets(merged_df, by=by), path, engine=engine)
+
+def indicator_pivots(indicators, first=('ESP', 'AND')):
+    """{acronym: long DataFrame} -> {acronym: Periodo x Region pivot}, ESP and AND first."""
+    pivots = {}
+    for acr in sorted(indicators):
+        df = indicators[acr]
+        if df.empty: continue
+        pivot = df.drop_duplicates(['Periodo', 'Region']).pivot(index='Periodo', columns='Region', values='Valor')
+        cols = [c for c in first if c in pivot.columns] + sorted(c for c in pivot.columns if c not in first)
+        pivots[acr] = pivot[cols].reset_index()
+    return pivots
+
+def write_vintage_workbook(indicators, path, names=None, engine=None):
+    """ipa27_raw_YYYYMMDD.xlsx layout: a LEER index sheet plus one pivot sheet per indicator."""
+    names = names or {}
+    pivots = indicator_pivots(indicators)
+    index = pd.DataFrame([{'Acrónimo': a, 'Nombre': names.get(a, a)} for a in sorted(indicators)])
+    return write_workbook([('LEER', index)] + list(pivots.items()), path, engine=engine)
+
+def submit_export(fn, *args, **kwargs):
+    """Runs an export function on a background writer thread; returns its Future."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ipa27-export')
+    return _executor.submit(fn, *args, **kwargs)
@@ -1,28 +1,45 @@
 import pandas as pd
-import requests
 import os
-import io
-import re
-from .config import DATA_RAW, DATA_PROCESSED
-from .connectors import IneConnector
-
-ine = IneConnector()
+from concurrent.futures import ThreadPoolExecutor
+from .config import DATA_RAW, ensure_dirs
+from .connectors import IneConnector, ReeConnector, CrimeConnector
+from .regions import resolve_regions
+from .microdata import ict_internet_access
+from .storage import save_indicator
+from .instrumentation import stage, bind
+
+_ine = None
+
+# Quarterly GDP: INE series CNTR6652 (Spain) and IECA query 27669 (Andalucía, chained volume index)
+GDP_ESP_URL = "https://servicios.ine.es/wstempus/js/ES/DATOS_SERIE/CNTR6652?nult=500"
+GDP_AND_URL = "https://www.juntadeandalucia.es/institutodeestadisticaycartografia/intranet/admin/rest/v1.0/consulta/27669?D_CRTA_COMPONPIB2008_0=69634&D_TEMPORAL_0=1809,1813,1818,1822,1828,1832,1837,1841,1847,1851,1856,1860,1866,1870,1875,1879,1885,1889,1894,1898,1904,1908,1913,1917,1923,1927,1932,1936,1942,1946,1951,1955,1961,1965,1970,1974,1980,1984,1989,1993,1999,2003,2008,2012,2018,2022,2027,2031,2037,2041,2046,2050,2056,2060,2065,2069,2075,2079,2084,2088,2094,2098,2103,2107,2113,2117,2122,2126,2132,2136,2141,2145,2151,2155,2160,2164,2170,2174,2179,2183,2189,2193,2198,2202,2224,2228,2233,2237,55483,55487,55492,55496,55502,55506,55511,55515,55521,55525,55530,55534,180141,180145,180150,180154,180160,180164,180169,180173,180179,180183,180188,180192,180198,180202,180207,180211,180217,180221"
+
+def __getattr__(name):
+    # The shared IneConnector is built on first use, not when the module is imported
+    if name == 'ine':
+        return _connector()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _connector():
+    global _ine
+    if _ine is None:
+        _ine = IneConnector()
+    return _ine
 
 def extract_ipc():
     """Extracts Monthly General CPI for Spain and Andalucía."""
-    return ine.download_tempus("50913", "IPC_General")
+    return _connector().download_tempus("50913", "IPC_General")
 
 def extract_societies():
     """Extracts Monthly Company Creation figures."""
-    return ine.download_tempus("13912", "Creacion_Empresas")
+    return _connector().download_tempus("13912", "Creacion_Empresas")
 
-def extract_pib():
-    """Extracts Quarterly GDP combining IECA (Andalucía) and INE (Spain)."""
+def extract_pib(save=True):
+    """Extracts Quarterly GDP combining IECA (Andalucía) and INE (Spain); stored unless save=False."""
     # Spain from INE (Series CNTR6652)
-    url_esp = "https://servicios.ine.es/wstempus/js/ES/DATOS_SERIE/CNTR6652?nult=500"
     print("⬇️ Downloading Quarterly GDP Spain (INE)...")
     try:
-        r = requests.get(url_esp, timeout=30, verify=False)
+        r = _connector().http.get(GDP_ESP_URL, timeout=30)
         data_esp = r.json()
         regs_esp = []
         for item in data_esp['Data']:
@@ -42,10 +59,9 @@ def extract_pib():
         df_esp = pd.DataFrame()
 
     # Andalucía from IECA
-    url_and = "https://www.juntadeandalucia.es/institutodeestadisticaycartografia/intranet/admin/rest/v1.0/consulta/27669?D_CRTA_COMPONPIB2008_0=69634&D_TEMPORAL_0=1809,1813,1818,1822,1828,1832,1837,1841,1847,1851,1856,1860,1866,1870,1875,1879,1885,1889,1894,1898,1904,1908,1913,1917,1923,1927,1932,1936,1942,1946,1951,1955,1961,1965,1970,1974,1980,1984,1989,1993,1999,2003,2008,2012,2018,2022,2027,2031,2037,2041,2046,2050,2056,2060,2065,2069,2075,2079,2084,2088,2094,2098,2103,2107,2113,2117,2122,2126,2132,2136,2141,2145,2151,2155,2160,2164,2170,2174,2179,2183,2189,2193,2198,2202,2224,2228,2233,2237,55483,55487,55492,55496,55502,55506,55511,55515,55521,55525,55530,55534,180141,180145,180150,180154,180160,180164,180169,180173,180179,180183,180188,180192,180198,180202,180207,180211,180217,180221"
     print("Downloading Quarterly GDP Andalucía (IECA)...")
     try:
-        r = requests.get(url_and, timeout=30, verify=False)
+        r = _connector().http.get(GDP_AND_URL, timeout=30)
         data_and = r.json()
         regs_and = []
         for item in data_and['data']:
@@ -68,14 +84,15 @@ def extract_pib():
         df_and = pd.DataFrame()
 
     df = pd.concat([df_and, df_esp], ignore_index=True).sort_values(['Region', 'Fecha'])
-    path = os.path.join(DATA_PROCESSED, "PIB_Trimestral.csv")
-    df.to_csv(path, index=False)
-    print(f"   ✅ Saved: PIB_Trimestral.csv ({len(df)} records)")
+    if not save:
+        return df
+    path = save_indicator(df, "PIB_Trimestral")
+    print(f"   ✅ Saved: {os.path.basename(path)} ({len(df)} records)")
     return df
 
 def extract_life_expectancy():
     """Extracts Life Expectancy data using multi-table JAXI logic."""
-    return ine.download_jaxi_long(
+    return _connector().download_jaxi_long(
         table_ids={'ESP': '27153', 'AND': '27154'},
         name="Esperanza_Vida",
         filters={
@@ -87,14 +104,14 @@ def extract_life_expectancy():
 
 def extract_abandono_escolar():
     """Extracts School Dropout Rate."""
-    return ine.download_jaxi_long(
+    return _connector().download_jaxi_long(
         table_ids="69786",
         name="Abandono_Escolar"
     )
 
 def extract_id_expenditure():
     """Extracts R&D Expenditure as % of GDP."""
-    return ine.download_jaxi_long(
+    return _connector().download_jaxi_long(
         table_ids={'ESP': '76751', 'AND': '76795'},
         name="Gasto_ID_PIB"
     )
@@ -131,69 +148,21 @@ def extract_tech_employment():
             })
     
     df_res = pd.DataFrame(records)
-    df_res.to_csv(os.path.join(DATA_PROCESSED, "Ocupados_Tech.csv"), index=False)
+    save_indicator(df_res, "Ocupados_Tech")
     return df_res
 
 def extract_ict_access():
-    """Processes ICT microdata for 2016-2025 (Fixed-width and TAB formats)."""
+    """Processes ICT microdata for 2016-2025 (Fixed-width and TAB formats) for all regions."""
     base_path = os.path.join(DATA_RAW, "acceso TIC")
     if not os.path.exists(base_path):
         print(f"⚠️ Microdata path {base_path} not found.")
         return None
-        
-    archivos = {
-        2016: ("Fichero Cuestionario 2016.txt", 1, 2, 150, 1, 49, 13),
-        2017: ("Fichero Cuestionario 2017.txt", 1, 2, 151, 1, 49, 13),
-        2018: ("Fichero Cuestionario 2018.txt", 1, 2, 154, 1, 52, 13),
-    }
-    
-    resultados = []
-    
-    # Process Fixed Width (2016-2018)
-    for anio, (fname, p_ccaa, t_ccaa, p_viv, t_viv, p_fac, t_fac) in archivos.items():
-        path = os.path.join(base_path, fname)
-        if os.path.exists(path):
-            with open(path, 'r', encoding='latin-1') as f:
-                lines = f.readlines()
-            regs = []
-            for line in lines:
-                ccaa = line[p_ccaa-1:p_ccaa-1+t_ccaa].strip()
-                viv = line[p_viv-1:p_viv-1+t_viv].strip()
-                fac = line[p_fac-1:p_fac-1+t_fac].strip().replace(',', '.')
-                try: regs.append({'CCAA': ccaa, 'VIV_INTER': viv, 'FACTOR_H': float(fac)})
-                except: continue
-            
-            df_y = pd.DataFrame(regs)
-            df_valid = df_y[df_y['VIV_INTER'].isin(['1', '6'])].copy()
-            df_valid['TIENE_INTERNET'] = (df_valid['VIV_INTER'] == '1').astype(int)
-            
-            for reg_code, reg_name in [('01', 'AND'), (None, 'ESP')]:
-                sub = df_valid[df_valid['CCAA'] == reg_code] if reg_code else df_valid
-                # Ensure we have data
-                if sub.empty: continue
-                pct = (sub['TIENE_INTERNET'] * sub['FACTOR_H']).sum() / sub['FACTOR_H'].sum() * 100
-                resultados.append({'Fecha': pd.to_datetime(f"{anio}-01-01"), 'Periodo': f"{anio}-ANUAL", 'Region': reg_name, 'Indicador': 'Acceso_Internet_Hogares', 'Valor': pct, 'Frecuencia': 'Anual', 'Serie_Original': fname})
-
-    # Process TAB formats (2019-2025)
-    for anio in range(2019, 2026):
-        path = os.path.join(base_path, f"TICHcuestionario_{anio}.tab")
-        if os.path.exists(path):
-            df_y = pd.read_csv(path, sep='\t', dtype=str)
-            df_y['FACTOR_H'] = pd.to_numeric(df_y['FACTOR_H'], errors='coerce')
-            df_valid = df_y[df_y['VIV_INTER'].isin(['1', '6'])].copy()
-            df_valid['TIENE_INTERNET'] = (df_valid['VIV_INTER'] == '1').astype(int)
-            
-            for reg_code, reg_name in [('01', 'AND'), (None, 'ESP')]:
-                sub = df_valid[df_valid['CCAA'] == reg_code] if reg_code else df_valid
-                if sub.empty: continue
-                pct = (sub['TIENE_INTERNET'] * sub['FACTOR_H']).sum() / sub['FACTOR_H'].sum() * 100
-                resultados.append({'Fecha': pd.to_datetime(f"{anio}-01-01"), 'Periodo': f"{anio}-ANUAL", 'Region': reg_name, 'Indicador': 'Acceso_Internet_Hogares', 'Valor': pct, 'Frecuencia': 'Anual', 'Serie_Original': f"TICHcuestionario_{anio}.tab"})
 
-    if not resultados: return None
-    df = pd.DataFrame(resultados).sort_values(['Region', 'Fecha'])
-    path = os.path.join(DATA_PROCESSED, "Acceso_Internet_Hogares.csv")
-    df.to_csv(path, index=False)
-    print(f"   ✅ Saved: Acceso_Internet_Hogares.csv ({len(df)} records)")
+    df = ict_internet_access(base_path)
+    if df is None: return None
+    df = df.sort_values(['Region', 'Fecha'])
+    path = save_indicator(df, "Acceso_Internet_Hogares")
+    print(f"   ✅ Saved: {os.path.basename(path)} ({len(df)} records)")
     return df
 
 def extract_broadband():
@@ -208,21 +177,10 @@ def extract_broadband():
             data = json.load(f)
             # Use IneConnector's logic but with provided data
             records = []
-            from .config import REGIONS
-            for serie in data:
+            series = [serie for serie in data if 'Banda Ancha' in serie['Nombre']]
+            codes = resolve_regions([serie['Nombre'] for serie in series])
+            for serie, region in zip(series, codes):
                 serie_name = serie['Nombre']
-                if 'Banda Ancha' not in serie_name: continue
-                
-                region = None
-                serie_name_upper = serie_name.upper()
-                for code, name in REGIONS.items():
-                    if name.upper() in serie_name_upper:
-                        region = code
-                        break
-                    short_name = name.split(' de ')[-1].split(' Foral ')[-1].upper()
-                    if short_name in serie_name_upper:
-                        region = code
-                        break
                 if not region: continue
                 
                 for d in serie['Data']:
@@ -248,72 +206,31 @@ def extract_broadband():
                 df = None
     else:
         # Normal fallback to API if possible
-        df = ine.download_tempus("76594", "Banda_Ancha")
+        df = _connector().download_tempus("76594", "Banda_Ancha")
         if df is not None:
             df = df[df['Serie_Original'].str.contains("Banda Ancha", case=False)]
             
     if df is not None:
-        path = os.path.join(DATA_PROCESSED, "Banda_Ancha.csv")
-        df.to_csv(path, index=False)
-        print(f"   ✅ Saved: Banda_Ancha.csv ({len(df)} records)")
+        path = save_indicator(df, "Banda_Ancha")
+        print(f"   ✅ Saved: {os.path.basename(path)} ({len(df)} records)")
     return df
 
-def extract_crime():
-    """Downloads and processes quarterly crime data from the Ministry of Interior."""
-    base_url = "https://estadisticasdecriminalidad.ses.mir.es/sec/jaxiPx/files/_px/es/csv_bdsc"
-    q_map = {1: '001', 2: '004', 3: '007', 4: '010'}
-    
-    all_regs = []
-    for year in range(2022, 2026):
-        for q in [1, 2, 3, 4]:
-            if year == 2025 and q > 2: continue
-            
-            suffix = q_map[q]
-            if year == 2025: url = f"{base_url}/DatosBalanceAct/l0/09{suffix}.csv_bdsc?nocab=1"
-            else: 
-                y_code = year - 2010
-                url = f"{base_url}/DatosBalanceAnt/l0/{y_code}09{suffix}.csv_bdsc?nocab=1"
-            
-            try:
-                r = requests.get(url, timeout=15, verify=False)
-                if r.status_code == 200:
-                    df = pd.read_csv(io.BytesIO(r.content), sep=';', encoding='latin1', on_bad_lines='skip')
-                    df.columns = [str(c).strip().lower() for c in df.columns]
-                    
-                    col_region = next((c for c in df.columns if 'comunid' in c), None)
-                    col_total = next((c for c in df.columns if 'total' in c), None)
-                    col_tipo = next((c for c in df.columns if 'tipolog' in c), None)
-                    col_periodo = next((c for c in df.columns if 'periodo' in c), None)
-                    
-                    if all([col_region, col_total, col_tipo, col_periodo]):
-                        sub = df[df[col_periodo].str.contains(str(year), na=False)]
-                        from .config import REGIONS
-                        for _, row in sub.iterrows():
-                            reg_raw = str(row[col_region]).upper()
-                            region = None
-                            for code, name in REGIONS.items():
-                                if name.upper() in reg_raw:
-                                    region = code
-                                    break
-                            
-                            if not region: continue
-                            
-                            val = str(row[col_total]).replace('.', '').replace(',', '.')
-                            all_regs.append({
-                                'Año': year, 'Trimestre': q, 'Region': region,
-                                'Categoria': str(row[col_tipo]).strip(),
-                                'Valor_Acumulado': float(val),
-                                'Periodo': f"{year}-Q{q}"
-                            })
-            except: continue
-
-    if not all_regs: return None
-    df_acum = pd.DataFrame(all_regs)
-    
-    df_acum = df_acum.sort_values(['Region', 'Categoria', 'Año', 'Trimestre'])
-    df_acum['Valor_Trimestral'] = df_acum.groupby(['Region', 'Categoria', 'Año'])['Valor_Acumulado'].diff().fillna(df_acum['Valor_Acumulado'])
-    
-    path = os.path.join(DATA_PROCESSED, "Criminalidad_Full.csv")
-    df_acum.to_csv(path, index=False)
-    print(f"   ✅ Saved: Criminalidad_Full.csv ({len(df_acum)} records)")
-    return df_acum
+def extract_crime(start_year=2016):
+    """Downloads and de-accumulates quarterly crime data from the Ministry of Interior (all CCAA)."""
+    return CrimeConnector().download_crime("Criminalidad_Full", start_year=start_year)
+
+def extract_renewables():
+    """Extracts the monthly renewable share of electricity generation (ENE_REN) from REE."""
+    return ReeConnector().download_renewables("ENE_REN")
+
+def extract_all(max_workers=8):
+    """Runs every network extractor concurrently. Returns {extractor name: DataFrame or None}."""
+    extractors = [
+        extract_ipc, extract_societies, extract_pib, extract_life_expectancy,
+        extract_abandono_escolar, extract_id_expenditure, extract_broadband, extract_crime,
+        extract_renewables
+    ]
+    ensure_dirs()
+    with stage('extractors.extract_all'), ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [(f.__name__, pool.submit(bind(f))) for f in extractors]
+        return {name: fut.result() for name, fut in futures}
@@ -0,0 +1,182 @@
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+from .cache import ResponseCache, OfflineCacheMiss
+from .config import OFFLINE, STANDIN_URL
+from .instrumentation import count
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+class TokenBucket:
+    """Thread-safe token bucket: on average `rate` acquisitions per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Takes a token and returns 0.0, or returns the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Takes a token if one is available now; never blocks."""
+        return self._take() == 0.0
+
+class HttpClient:
+    """
+    Shared keep-alive HTTP session with a per-host cap on concurrent requests.
+    When a ResponseCache is attached, GETs are served from disk while fresh and
+    revalidated with ETag / Last-Modified once the TTL has expired.
+    With standin (a base URL such as http://127.0.0.1:8765) every request goes to that server
+    with the same path and query; per-host limits and cache keys still use the original URL.
+    """
+
+    def __init__(self, max_per_host=4, pool_size=16, verify=False, cache=None, standin=None):
+        self.max_per_host = max_per_host
+        self.standin = standin.rstrip("/") if standin else None
+        self.verify = verify
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _target(self, url):
+        """url, or the stand-in server's equivalent of it."""
+        if not self.standin:
+            return url
+        parts = urlsplit(url)
+        return self.standin + url[len(f"{parts.scheme}://{parts.netloc}"):]
+
+    def _request(self, url, timeout, headers=None, **kwargs):
+        kwargs.setdefault("verify", self.verify)
+        with self._slot(url):
+            r = self.session.get(self._target(url), timeout=timeout, headers=headers, **kwargs)
+        count(requests=1, bytes=len(r.content))
+        return r
+
+    def get(self, url, timeout=30, params=None, use_cache=True, headers=None, **kwargs):
+        """GET through the pooled session (and the response cache, if any)."""
+        cache = self.cache if use_cache else None
+        if cache is None:
+            return self._request(url, timeout, headers=headers, params=params, **kwargs)
+
+        meta = cache.lookup(url, params)
+        if cache.offline:
+            if meta is None:
+                raise OfflineCacheMiss(f"Offline mode: {url} is not cached")
+            cache.hits += 1
+            count(cache_hits=1)
+            return cache.to_response(meta)
+        if meta is not None and cache.is_fresh(meta):
+            cache.hits += 1
+            count(cache_hits=1)
+            return cache.to_response(meta)
+
+        if meta:
+            headers = {**(headers or {}), **cache.conditional_headers(meta)}
+        r = self._request(url, timeout, headers=headers, params=params, **kwargs)
+        if r.status_code == 304 and meta is not None:
+            cache.revalidated += 1
+            count(cache_hits=1)
+            cache.touch(url, meta, params)
+            return cache.to_response(meta)
+        cache.misses += 1
+        if r.status_code == 200:
+            cache.store(url, r, params)
+        return r
+
+    @contextmanager
+    def stream(self, url, timeout=30, params=None, use_cache=True):
+        """
+        Yields a binary file-like object over the response body, read incrementally.
+        With a cache the body is spooled to disk in chunks first. Raises requests.HTTPError on 4xx/5xx.
+        """
+        cache = self.cache if use_cache else None
+        if cache is None:
+            with self._slot(url):
+                r = self.session.get(self._target(url), timeout=timeout, params=params, stream=True, verify=self.verify)
+                count(requests=1)  # body size unknown: it is consumed by the caller
+                with r:
+                    r.raise_for_status()
+                    r.raw.decode_content = True
+                    r.raw.auto_close = False  # let TextIOWrapper see EOF instead of a closed file
+                    yield r.raw
+            return
+
+        meta = cache.lookup(url, params)
+        if cache.offline and meta is None:
+            raise OfflineCacheMiss(f"Offline mode: {url} is not cached")
+        if cache.offline or (meta is not None and cache.is_fresh(meta)):
+            cache.hits += 1
+            count(cache_hits=1)
+        else:
+            headers = cache.conditional_headers(meta) if meta else None
+            with self._slot(url):
+                r = self.session.get(self._target(url), timeout=timeout, headers=headers, params=params, stream=True, verify=self.verify)
+                with r:
+                    if r.status_code == 304 and meta is not None:
+                        cache.revalidated += 1
+                        count(requests=1, cache_hits=1)
+                        cache.touch(url, meta, params)
+                    else:
+                        r.raise_for_status()
+                        cache.misses += 1
+                        meta = cache.store_stream(url, r, params)
+                        count(requests=1, bytes=meta['size'])
+        with open(cache.body_path(meta), "rb") as f:
+            yield f
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Returns the process-wide HttpClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if STANDIN_URL:
+                # Stand-in responses must never reach the real response cache
+                _client = HttpClient(standin=STANDIN_URL)
+            else:
+                cache = ResponseCache(offline=OFFLINE)
+                if not OFFLINE:
+                    cache.evict()
+                _client = HttpClient(cache=cache)
+        return _client
+
+def set_client(client):
+    """Replaces the process-wide HttpClient (e.g. to replay a fixture store offline)."""
+    global _client
+    with _client_lock:
+        _client = client
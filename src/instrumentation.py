@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import inspect
+import time
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from .config import INSTRUMENTATION, RUN_REPORT_DIR, PROFILE_STAGE, PROFILER, REPORT_MAX_STAGES
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS / child CPU
+    resource = None
+
+# Per-stage run telemetry. stage() (or the @instrumented decorator) records wall and CPU time, the
+# growth of the process peak RSS, rows in/out and the HTTP bytes, requests and cache hits counted while
+# the stage is active, including work it hands to thread pools through bind(). Records go to REPORT,
+# saved as JSON. A stage costs a few microseconds; HTTP traffic is counted, never stored per request.
+
+COUNTERS = ('requests', 'bytes', 'cache_hits')
+
+_active = ContextVar('ipa27_stages', default=())
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)  # bytes on macOS, KiB elsewhere
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def _rows(obj):
+    """Rows of a DataFrame result (or of the first element of a tuple result), else None."""
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    return len(obj) if hasattr(obj, 'columns') else None
+
+class Stage:
+    """One timed stage. Callers may set rows_in / rows_out; counters are added by count()."""
+
+    def __init__(self, name, rows_in=None, meta=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.meta = meta or {}
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.worker_cpu = 0.0  # CPU seconds of the pool threads run through bind()
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.counts[key] = self.counts.get(key, 0) + value
+
+    def add_rows_in(self, n):
+        with self._lock:
+            self.rows_in = (self.rows_in or 0) + n
+
+    def add_cpu(self, seconds):
+        with self._lock:
+            self.worker_cpu += seconds
+
+class RunReport:
+    """
+    Stage records and run totals of the current run (see start_run / save_report).
+    Only the last REPORT_MAX_STAGES records are kept; the per-stage summary covers all of them.
+    """
+
+    def __init__(self, name='ipa27'):
+        self._lock = threading.Lock()
+        self.reset(name)
+
+    def reset(self, name='ipa27'):
+        with self._lock:
+            self.name = name
+            self.started = time.time()
+            self._t0 = time.perf_counter()
+            self.stages = deque(maxlen=REPORT_MAX_STAGES)
+            self.dropped = 0
+            self.totals = dict.fromkeys(COUNTERS, 0)
+            self._summary = {}
+
+    def add(self, record):
+        with self._lock:
+            if len(self.stages) == self.stages.maxlen:
+                self.dropped += 1
+            self.stages.append(record)
+            agg = self._summary.setdefault(record['stage'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rows_out': 0,
+                                                             **dict.fromkeys(COUNTERS, 0)})
+            agg['calls'] += 1
+            agg['wall_s'] = round(agg['wall_s'] + record['wall_s'], 6)
+            agg['cpu_s'] = round(agg['cpu_s'] + record['cpu_s'], 6)
+            agg['rows_out'] += record['rows_out'] or 0
+            for key in COUNTERS:
+                agg[key] += record[key]
+
+    def count(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.totals[key] = self.totals.get(key, 0) + value
+
+    def summary(self):
+        """{stage name: {calls, wall_s, cpu_s, bytes, requests, cache_hits, rows_out}} summed over calls."""
+        return {name: dict(agg) for name, agg in self._summary.items()}
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'run': self.name,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'wall_s': round(time.perf_counter() - self._t0, 6),
+                'process_peak_rss_mb': _peak_rss_mb(),
+                'totals': dict(self.totals),
+                'summary': self.summary(),
+                'dropped_stages': self.dropped,
+                'stages': list(self.stages)
+            }
+
+    def save(self, path=None):
+        """Writes the report as JSON (RUN_REPORT_DIR/<run>_<timestamp>.json by default). Returns the path."""
+        if path is None:
+            stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started))
+            path = os.path.join(RUN_REPORT_DIR, f"{self.name}_{stamp}.json")
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1, ensure_ascii=False, default=str)
+        os.replace(path + '.tmp', path)
+        return path
+
+REPORT = RunReport()
+
+def start_run(name='ipa27'):
+    """Clears REPORT for a new run (long sessions should call it per run; see REPORT_MAX_STAGES)."""
+    REPORT.reset(name)
+    return REPORT
+
+def save_report(path=None):
+    """Saves REPORT as JSON and prints where; returns the path."""
+    path = REPORT.save(path)
+    totals = REPORT.totals
+    print(f"📊 Run report: {len(REPORT.stages) + REPORT.dropped} stages, {totals['requests']} requests, "
+          f"{totals['bytes'] / 2 ** 20:.1f} MB, {totals['cache_hits']} cache hits -> {path}")
+    return path
+
+def count(**counts):
+    """Adds counters (requests, bytes, cache_hits) to every active stage and to the run totals."""
+    if not INSTRUMENTATION:
+        return
+    for record in _active.get():
+        record.add(**counts)
+    REPORT.count(**counts)
+
+def count_rows_in(n):
+    """Adds n input rows (e.g. the raw rows a connector parsed) to the innermost active stage."""
+    stages = _active.get()
+    if INSTRUMENTATION and stages:
+        stages[-1].add_rows_in(n)
+
+def bind(fn):
+    """
+    fn run inside the caller's active stages, for work submitted to thread pools.
+    The worker's CPU time is added to those stages.
+    """
+    stages = _active.get()
+    if not stages:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        token = _active.set(stages)
+        cpu = time.thread_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            cpu = time.thread_time() - cpu
+            for record in stages:
+                record.add_cpu(cpu)
+            _active.reset(token)
+    return run
+
+def _start_profiler(name):
+    if PROFILE_STAGE != name:
+        return None
+    if PROFILER == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠️ pyinstrument not installed, profiling with cProfile instead")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def _stop_profiler(profiler, name):
+    """Dumps the profile next to the run reports (.prof for cProfile / snakeviz, .html for pyinstrument)."""
+    os.makedirs(RUN_REPORT_DIR, exist_ok=True)
+    base = os.path.join(RUN_REPORT_DIR, f"{name.replace(':', '_').replace('/', '_')}_{time.strftime('%Y%m%d_%H%M%S')}")
+    if hasattr(profiler, 'dump_stats'):
+        profiler.disable()
+        profiler.dump_stats(base + '.prof')
+        path = base + '.prof'
+    else:
+        profiler.stop()
+        path = base + '.html'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+    print(f"🔬 Profile of {name}: {path}")
+
+@contextmanager
+def stage(name, /, rows_in=None, **meta):
+    """
+    Records one stage: with stage('export.xlsx', rows_in=len(df)) as s: ...; s.rows_out = n.
+    Stages nest; an inner stage's traffic is also counted in the outer ones. cpu_s is the CPU time of
+    the calling thread plus that of the pool threads run through bind(); rss_growth_mb is how much the
+    stage raised the peak RSS of the process (process_peak_rss_mb is that peak when the stage ended).
+    """
+    if not INSTRUMENTATION:
+        yield Stage(name, rows_in, meta)
+        return
+    record = Stage(name, rows_in, meta)
+    token = _active.set(_active.get() + (record,))
+    profiler = _start_profiler(name)
+    start = time.perf_counter() - REPORT._t0
+    wall, cpu, children, rss = time.perf_counter(), time.thread_time(), _children_cpu(), _peak_rss_mb()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu + record.worker_cpu
+        children = _children_cpu() - children
+        peak = _peak_rss_mb()
+        _active.reset(token)
+        if profiler is not None:
+            _stop_profiler(profiler, name)
+        REPORT.add({
+            'stage': name, 'start_s': round(start, 6), 'wall_s': round(wall, 6), 'cpu_s': round(cpu, 6),
+            'cpu_children_s': round(children, 6),
+            'rss_growth_mb': None if peak is None else round(peak - rss, 1), 'process_peak_rss_mb': peak,
+            'rows_in': record.rows_in, 'rows_out': record.rows_out, **record.counts,
+            'thread': threading.current_thread().name, 'error': record.error, **record.meta
+        })
+
+def instrumented(name=None, key=None):
+    """
+    Decorator running the function inside stage(name); a DataFrame result sets rows_out.
+    key names an argument (e.g. the indicator name) recorded with each call.
+    """
+    def decorate(fn):
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+        signature = inspect.signature(fn) if key else None
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            meta = {}
+            if key:
+                bound = signature.bind_partial(*args, **kwargs)
+                meta[key] = bound.arguments.get(key, signature.parameters[key].default)
+            with stage(label, **meta) as record:
+                result = fn(*args, **kwargs)
+                record.rows_out = _rows(result)
+                return result
+        return run
+    return decorate
@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from .config import CCAA_CODES
+from .survey import weighted_stats
+
+# Column specs per survey year. Fixed-width files: {column: (1-based offset, width, dtype)};
+# TAB files: {column: dtype}. Only these columns are ever decoded.
+_ICT_TAB = {'CCAA': 'category', 'VIV_INTER': 'category', 'FACTOR_H': 'float'}
+ICT_SURVEY = {
+    2016: {'file': "Fichero Cuestionario 2016.txt",
+           'fwf': {'CCAA': (1, 2, 'category'), 'VIV_INTER': (150, 1, 'category'), 'FACTOR_H': (49, 13, 'float')}},
+    2017: {'file': "Fichero Cuestionario 2017.txt",
+           'fwf': {'CCAA': (1, 2, 'category'), 'VIV_INTER': (151, 1, 'category'), 'FACTOR_H': (49, 13, 'float')}},
+    2018: {'file': "Fichero Cuestionario 2018.txt",
+           'fwf': {'CCAA': (1, 2, 'category'), 'VIV_INTER': (154, 1, 'category'), 'FACTOR_H': (52, 13, 'float')}},
+    **{anio: {'file': f"TICHcuestionario_{anio}.tab", 'tab': _ICT_TAB} for anio in range(2019, 2026)}
+}
+
+def _decode_labels(raw, encoding):
+    """Categorical of stripped labels, decoding each distinct byte string once."""
+    uniques, codes = np.unique(raw, return_inverse=True)
+    labels = np.array([u.decode(encoding).strip() for u in uniques], dtype=object)
+    # Stripping can make distinct raw values equal ('1 ' and ' 1')
+    categories, remap = np.unique(labels, return_inverse=True)
+    return pd.Categorical.from_codes(remap[codes.ravel()], categories)
+
+def _decode_floats(field):
+    """Floats from a (records x width) byte matrix; decimal commas allowed, blanks/garbage become NaN."""
+    field = np.where(field == ord(','), ord('.'), field).astype(np.uint8)
+    raw = np.ascontiguousarray(field).view(f'S{field.shape[1]}').ravel()
+    blank = (field == ord(' ')).all(axis=1)
+    values = np.full(len(raw), np.nan)
+    try:
+        values[~blank] = raw[~blank].astype(float)
+    except ValueError:
+        values[~blank] = pd.to_numeric(pd.Series(raw[~blank]).str.decode('latin-1').str.strip(), errors='coerce')
+    return values
+
+def read_fixed_width(path, columns, encoding='latin-1'):
+    """
+    Decodes only the requested fields of a fixed-width file ({column: (1-based offset, width, dtype)}).
+    The file is memory-mapped and each field is gathered for all records at once as a byte matrix.
+    """
+    buf = np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) else np.zeros(0, np.uint8)
+    ends = np.flatnonzero(buf == ord('\n'))
+    starts = np.r_[0, ends + 1]
+    ends = np.r_[ends, len(buf)]
+    if starts[-1] == len(buf):  # Trailing newline
+        starts, ends = starts[:-1], ends[:-1]
+    if len(ends):
+        # The '\r' of CRLF files is not part of any field
+        ends = ends - ((ends > starts) & (buf[np.maximum(ends - 1, 0)] == ord('\r')))
+
+    out = {}
+    for col, (offset, width, dtype) in columns.items():
+        pos = starts[:, None] + (offset - 1) + np.arange(width)
+        # Records shorter than the field get blanks, as slicing a short line would
+        inside = pos < ends[:, None]
+        field = np.where(inside, buf[np.where(inside, pos, 0)], ord(' ')).astype(np.uint8)
+        if dtype == 'float':
+            out[col] = _decode_floats(field)
+        else:
+            out[col] = _decode_labels(np.ascontiguousarray(field).view(f'S{width}').ravel(), encoding)
+    return pd.DataFrame(out)
+
+def read_tab(path, columns):
+    """Reads only the requested columns ({column: dtype}) of a TAB file."""
+    try:
+        return pd.read_csv(path, sep='\t', usecols=list(columns), dtype=columns)
+    except ValueError:
+        # Weights with decimal commas or stray text: parse them leniently
+        dtype = {c: (str if t == 'float' else t) for c, t in columns.items()}
+        df = pd.read_csv(path, sep='\t', usecols=list(columns), dtype=dtype)
+        for c, t in columns.items():
+            if t == 'float':
+                df[c] = pd.to_numeric(df[c].str.replace(',', '.', regex=False), errors='coerce')
+        return df
+
+def read_ict_year(anio, base_path, spec=None):
+    """CCAA, VIV_INTER and numeric FACTOR_H for one ICT survey year, or None if the file is missing."""
+    spec = spec or ICT_SURVEY[anio]
+    path = os.path.join(base_path, spec['file'])
+    if not os.path.exists(path):
+        return None
+    df = read_fixed_width(path, spec['fwf']) if 'fwf' in spec else read_tab(path, spec['tab'])
+    df = df.dropna(subset=['FACTOR_H'])
+    # Mapping a categorical only touches its categories
+    df['CCAA'] = df['CCAA'].map(lambda c: str(c).zfill(2))
+    return df
+
+def weighted_shares(df, flag, weight, by='CCAA', total='ESP', codes=CCAA_CODES):
+    """Weighted percentage of rows with flag == True per group (mapped through codes) plus the national total."""
+    data = df.assign(**{flag: df[flag].astype(float)})
+    shares = pd.concat([
+        weighted_stats(data, by, [flag], weight, stats=('mean',))[flag].rename(codes),
+        pd.Series({total: weighted_stats(data, None, [flag], weight, stats=('mean',))[flag].iloc[0]})
+    ]) * 100
+    return shares[shares.index.isin(list(codes.values()) + [total]) & np.isfinite(shares)]
+
+def _ict_internet_year(anio, base_path):
+    df = read_ict_year(anio, base_path)
+    if df is None:
+        return None
+    # 1 = has internet, 6 = no internet; anything else is not a valid answer
+    df = df[df['VIV_INTER'].isin(['1', '6'])]
+    df = df.assign(TIENE_INTERNET=df['VIV_INTER'] == '1')
+    shares = weighted_shares(df, 'TIENE_INTERNET', 'FACTOR_H')
+    return pd.DataFrame({
+        'Fecha': pd.to_datetime(f"{anio}-01-01"),
+        'Periodo': f"{anio}-ANUAL",
+        'Region': shares.index,
+        'Indicador': 'Acceso_Internet_Hogares',
+        'Valor': shares.values,
+        'Frecuencia': 'Anual',
+        'Serie_Original': ICT_SURVEY[anio]['file']
+    })
+
+def ict_internet_access(base_path, years=None, max_workers=4):
+    """Households with internet access (%) per CCAA and Spain, reading all survey years in parallel."""
+    years = sorted(years or ICT_SURVEY)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = [f for f in pool.map(lambda y: _ict_internet_year(y, base_path), years) if f is not None]
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
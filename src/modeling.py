@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import hashlib
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.seasonal import STL
+from statsmodels.tsa.stattools import adfuller
+from statsmodels.tsa.arima.model import ARIMA
+from .config import STL_INDICATORS, NOWCAST_INDICATORS, STL_PARAMS, MODEL_CACHE_PATH
+from .disaggregation import PERIODS_PER_YEAR, parse_periods, period_frame
+from .storage import STANDARD_COLUMNS
+from .instrumentation import instrumented
+
+# Steps 2 and 4 of the pipeline over the whole panel: STL seasonal adjustment and ARIMA nowcasting,
+# one process-pool task per (Indicador, Region) series. Every fit is cached under the series
+# content hash: unchanged series are not refit, and a series whose only change is its last
+# observation (revised or newly published) is refit from the cached order and parameters.
+
+MAX_P, MAX_Q, MAX_D = 2, 2, 2
+ADF_ALPHA = 0.05
+MIN_ARIMA_OBS = 8
+
+def _hash(values, spec):
+    """Content hash of a series' values under one model spec (which includes its first period)."""
+    h = hashlib.sha256(json.dumps(spec, sort_keys=True).encode())
+    h.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return h.hexdigest()[:20]
+
+def _stl(values, period, params):
+    params = dict(params)
+    # STL needs an odd trend window longer than the period; otherwise use its default
+    if params.get('trend') is not None and params['trend'] <= period:
+        params.pop('trend')
+    res = STL(values, period=period, **params).fit()
+    resid_var = np.var(res.resid)
+    strength = max(0.0, 1 - resid_var / np.var(res.seasonal + res.resid)) if resid_var > 0 else 1.0
+    return values - res.seasonal, {'seasonal_strength': round(float(strength), 4)}
+
+def _integration_order(values):
+    """d as in auto_arima: difference while the ADF test does not reject a unit root."""
+    y = values
+    for d in range(MAX_D + 1):
+        if d == MAX_D or len(y) < 6 or np.ptp(y) == 0:
+            return d
+        try:
+            if adfuller(y, autolag='AIC')[1] < ADF_ALPHA:
+                return d
+        except (ValueError, np.linalg.LinAlgError):
+            return d
+        y = np.diff(y)
+    return MAX_D
+
+def _arima_fit(values, order, start_params=None):
+    trend = 'c' if order[1] == 0 else 'n'
+    return ARIMA(values, order=order, trend=trend).fit(start_params=start_params)
+
+def _arima(values, horizon, cached):
+    """
+    Nowcast of the next horizon periods. cached is the previous fit (order, params) when only
+    its last observation differs (warm start from its order and parameters), else None and the
+    order is searched by AIC over p, q <= MAX_P, MAX_Q with d from the ADF test.
+    """
+    if cached is not None:
+        order = tuple(cached['order'])
+        fit = _arima_fit(values, order, np.asarray(cached['params']))
+        mode = 'warm'
+    else:
+        d = _integration_order(values)
+        best = None
+        for p in range(MAX_P + 1):
+            for q in range(MAX_Q + 1):
+                try:
+                    fit = _arima_fit(values, (p, d, q))
+                except (ValueError, np.linalg.LinAlgError):
+                    continue
+                if np.isfinite(fit.aic) and (best is None or fit.aic < best.aic):
+                    best = fit
+        if best is None:
+            raise ValueError("no ARIMA order could be fitted")
+        fit, order, mode = best, tuple(best.model.order), 'fit'
+    forecast = np.asarray(fit.forecast(horizon), dtype=float)
+    info = {'order': list(order), 'params': [float(v) for v in fit.params], 'aic': float(fit.aic)}
+    return forecast, info, mode
+
+def _model_series(job):
+    """
+    Worker: STL and/or ARIMA for one series. Returns (key, adjusted values, forecast,
+    diagnostics, cache entries). Failures are reported in the diagnostics: STL leaves the
+    series as is and the nowcast falls back to the last observation (LOCF).
+    """
+    key, values, start, period, steps, horizon, cache = job
+    diag = {'n_obs': len(values)}
+    entries = {}
+    adjusted, forecast = values, None
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if 'stl' in steps:
+            t0 = time.perf_counter()
+            h = _hash(values, ['stl', start, period, STL_PARAMS])
+            hit = cache.get('stl')
+            try:
+                if hit and hit['hash'] == h:
+                    adjusted, info, diag['stl'] = np.asarray(hit['values']), hit['info'], 'cache'
+                else:
+                    adjusted, info = _stl(values, period, STL_PARAMS)
+                    diag['stl'] = 'fit'
+                entries['stl'] = {'hash': h, 'info': info, 'values': [float(v) for v in adjusted]}
+                diag.update(info)
+            except Exception as e:
+                diag['stl'], diag['error'] = 'error', f"STL {type(e).__name__}: {e}"
+            diag['stl_seconds'] = round(time.perf_counter() - t0, 4)
+
+        if 'arima' in steps and horizon > 0:
+            t0 = time.perf_counter()
+            # Keyed on the raw series, so adjusting it first does not defeat the warm start
+            spec = ['arima', start, period, 'stl' in steps and diag.get('stl') != 'error']
+            h, prefix = _hash(values, spec), _hash(values[:-1], spec)
+            hit = cache.get('arima')
+            try:
+                if len(adjusted) < MIN_ARIMA_OBS:
+                    raise ValueError(f"{len(adjusted)} observations (< {MIN_ARIMA_OBS})")
+                if hit and hit['hash'] == h and len(hit['forecast']) == horizon:
+                    forecast, info, diag['arima'] = np.asarray(hit['forecast']), hit['info'], 'cache'
+                else:
+                    # Same series with a new horizon, or all but the last value: revised (same prefix)
+                    # or newly appended (prefix = old series)
+                    warm = hit['info'] if hit and (h == hit['hash'] or prefix in (hit['prefix'], hit['hash'])) else None
+                    forecast, info, diag['arima'] = _arima(adjusted, horizon, warm)
+                entries['arima'] = {'hash': h, 'prefix': prefix, 'info': info,
+                                    'forecast': [float(v) for v in forecast]}
+                diag.update(order=tuple(info['order']), aic=round(info['aic'], 3))
+            except Exception as e:
+                forecast = np.repeat(adjusted[-1], horizon)
+                diag['arima'] = 'LOCF'
+                diag['error'] = f"ARIMA {type(e).__name__}: {e}"
+            diag['arima_seconds'] = round(time.perf_counter() - t0, 4)
+    return key, adjusted, forecast, diag, entries
+
+def load_cache(path=MODEL_CACHE_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache, path=MODEL_CACHE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+def _month_end(year, pos, ppy):
+    """Month index (year * 12 + month - 1) of the last month of each period."""
+    return year * 12 + (pos + 1) * (12 // ppy) - 1
+
+@instrumented()
+def model_panel(panel_long, stl=STL_INDICATORS, nowcast=NOWCAST_INDICATORS, target=None,
+                max_workers=None, cache_path=MODEL_CACHE_PATH):
+    """
+    Seasonally adjusts (STL) the stl indicators and extends the nowcast indicators with ARIMA up to
+    target (a Periodo such as '2025-Q3'; by default the latest period in the panel), for every
+    region. Monthly and quarterly series are adjusted; interior gaps are interpolated before
+    fitting. Series are fitted in a process pool (max_workers) and only when their content changed
+    since the cached fit.
+
+    Returns (long, diagnostics): the panel in the standard long schema, with adjusted values and
+    nowcast rows ('ARIMA(p,d,q)' / 'LOCF' in Serie_Original) in place, and one row per modelled series.
+    """
+    stl, nowcast = set(stl or []), set(nowcast or [])
+    df = panel_long.reset_index(drop=True)
+    freq, year, pos = parse_periods(df['Periodo'])
+    ppy = pd.Series(freq).map(PERIODS_PER_YEAR).to_numpy(float)
+    df['_freq'] = freq
+    df['_t'] = year * np.nan_to_num(ppy, nan=1).astype(np.int64) + pos
+    if target is not None:
+        f, y, p = (v[0] for v in parse_periods([target]))
+        target_month = _month_end(y, p, PERIODS_PER_YEAR[f])
+    else:
+        valid = ~np.isnan(ppy)
+        target_month = int(_month_end(year[valid], pos[valid], ppy[valid].astype(int)).max()) if valid.any() else 0
+    cache = load_cache(cache_path)
+
+    jobs, frames = [], {}
+    df['_ind'], df['_reg'] = df['Indicador'].astype(str), df['Region'].astype(str)
+    todo = df[df['_ind'].isin(stl | nowcast) & df['_freq'].notna() & df['Valor'].notna()]
+    for (ind, reg, f), g in todo.groupby(['_ind', '_reg', '_freq'], sort=True):
+        g = g.drop_duplicates('_t', keep='last').sort_values('_t')
+        series = g.set_index('_t')['Valor'].astype(float)
+        series = series.reindex(range(int(series.index[0]), int(series.index[-1]) + 1)).interpolate()
+        steps = []
+        if ind in stl and f != 'Anual' and len(series) >= 2 * PERIODS_PER_YEAR[f] + 1:
+            steps.append('stl')
+        horizon = 0
+        if ind in nowcast:
+            horizon = int(target_month // (12 // PERIODS_PER_YEAR[f]) - series.index[-1])
+            if horizon > 0:
+                steps.append('arima')
+        if not steps:
+            continue
+        key = f"{ind}|{reg}|{f}"
+        frames[key] = (ind, reg, f, series, g)
+        jobs.append((key, series.to_numpy(), int(series.index[0]), PERIODS_PER_YEAR[f], steps, horizon,
+                     cache.get(key, {})))
+
+    print(f"🧮 Modelling {len(jobs)} series (STL: {sum('stl' in j[4] for j in jobs)}, "
+          f"ARIMA: {sum('arima' in j[4] for j in jobs)})")
+    if max_workers == 1 or len(jobs) < 2:
+        results = [_model_series(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_model_series, jobs, chunksize=max(1, len(jobs) // 32)))
+
+    replaced, new_rows, diagnostics = [], [], []
+    for key, adjusted, forecast, diag, entries in results:
+        ind, reg, f, series, g = frames[key]
+        if entries:
+            cache[key] = {**cache.get(key, {}), **entries}
+        diagnostics.append({'Indicador': ind, 'Region': reg, 'Frecuencia': f, **diag})
+        if diag.get('stl') in ('fit', 'cache'):
+            # Adjusted values only for the periods actually observed
+            adj = pd.Series(adjusted, index=series.index).loc[g['_t'].to_numpy()]
+            replaced.append(pd.DataFrame({'_idx': g.index, '_adj': adj.to_numpy()}))
+        if forecast is not None:
+            idx = series.index[-1] + 1 + np.arange(len(forecast))
+            fechas, periodos = period_frame(idx, f)
+            label = (f"ARIMA({','.join(str(o) for o in diag['order'])})" if diag.get('arima') != 'LOCF' else 'LOCF')
+            new_rows.append(pd.DataFrame({
+                'Fecha': fechas, 'Periodo': periodos, 'Region': reg, 'Indicador': ind,
+                'Valor': forecast, 'Frecuencia': f, 'Serie_Original': label}))
+    save_cache(cache, cache_path)
+
+    out = df.drop(columns=['_freq', '_t', '_ind', '_reg'])
+    if replaced:
+        adj = pd.concat(replaced)
+        out.loc[adj['_idx'].to_numpy(), 'Valor'] = adj['_adj'].to_numpy()
+        if 'Serie_Original' in out.columns:
+            out['Serie_Original'] = out['Serie_Original'].astype(object)
+            out.loc[adj['_idx'].to_numpy(), 'Serie_Original'] = (
+                out.loc[adj['_idx'].to_numpy(), 'Serie_Original'].astype(str) + ' (STL)')
+    if new_rows:
+        out = pd.concat([out] + new_rows, ignore_index=True, sort=False)
+    columns = [c for c in STANDARD_COLUMNS if c in out.columns] + [c for c in out.columns if c not in STANDARD_COLUMNS]
+    diagnostics = pd.DataFrame(diagnostics)
+
+    if 'error' in diagnostics.columns and diagnostics['error'].notna().any():
+        print(f"⚠️  {int(diagnostics['error'].notna().sum())} series with errors (see diagnostics)")
+    for step in ('stl', 'arima'):
+        if step in diagnostics.columns:
+            counts = diagnostics[step].value_counts().to_dict()
+            print(f"   {step.upper()}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    return out[columns].reset_index(drop=True), diagnostics
@@ -0,0 +1,430 @@
+import os
+import json
+import time
+import hashlib
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+from .config import ensure_dirs, PIPELINE_DIR, INDICATORS_DIR, IPA27_STRUCTURE, DISAGGREGATION_REGRESSORS, SCORE_CAP
+from .registry import load_registry, extract_indicator, stored_fingerprint
+from .disaggregation import disaggregate, parse_periods, period_frame, PERIODS_PER_YEAR, DENTON_ORDER, DENTON_PROPORTIONAL
+from .scoring import load_ceilings, normalize_long, ScoreKernel
+from .regions import canonical_codes
+from .storage import get_backend
+from .export import write_results_workbook
+from .instrumentation import stage, instrumented, bind
+
+# The indicator pipeline as a DAG: extract -> transform -> disaggregate -> units -> normalize per
+# indicator, then one aggregate and one export node. Every node is memoized on a hash of its parameters and
+# of its inputs' output hashes, so a rerun only recomputes nodes whose inputs changed, and a node
+# that reproduces its previous output stops the recomputation there. Ready nodes run on a thread pool.
+
+# fn(inputs, params) -> DataFrame or None, inputs being the outputs of deps in order.
+# Source nodes have no inputs; they are rerun only when their params change or on refresh.
+# A partial node still runs when some deps failed or were skipped, with None for those inputs.
+# A node that writes files returns them in an 'Archivo' column; it is rerun if they change or disappear.
+Node = namedtuple('Node', ['name', 'fn', 'deps', 'params', 'source', 'partial', 'writes'],
+                  defaults=((), None, False, False, False))
+
+MANIFEST_FILE = 'manifest.json'
+QUARTERLY = 'Trimestral'
+
+class Pipeline:
+    """
+    Memoized DAG runner over a list of Node. Outputs are stored in store_dir with the storage
+    backend, next to a manifest {node: {key, digest, rows}}; a node whose key (parameters and
+    input digests) matches the manifest is not run, and its output is only read when needed.
+    """
+
+    def __init__(self, nodes, store_dir=PIPELINE_DIR, max_workers=8):
+        self.nodes = {n.name: n for n in nodes}
+        unknown = {d for n in nodes for d in n.deps if d not in self.nodes}
+        if unknown:
+            raise ValueError(f"Unknown dependencies: {', '.join(sorted(unknown))}")
+        self.order = self._toposort()
+        self.store_dir = store_dir
+        self.max_workers = max_workers
+        self.backend = get_backend()
+        self.report = None
+        self._outputs = {}
+
+    def _toposort(self):
+        remaining = {name: len(n.deps) for name, n in self.nodes.items()}
+        children = self._children()
+        ready = deque(name for name, k in remaining.items() if k == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for child in children[name]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+        if len(order) < len(self.nodes):
+            raise ValueError(f"Dependency cycle among: {', '.join(sorted(set(self.nodes) - set(order)))}")
+        return order
+
+    def _children(self):
+        children = {name: [] for name in self.nodes}
+        for name, node in self.nodes.items():
+            for dep in node.deps:
+                children[dep].append(name)
+        return children
+
+    def upstream(self, targets):
+        """targets and every node they depend on, in execution order."""
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.nodes[name].deps)
+        return [name for name in self.order if name in needed]
+
+    def downstream(self, names):
+        """names and every node depending on them, in execution order."""
+        children, found, stack = self._children(), set(), list(names)
+        while stack:
+            name = stack.pop()
+            if name not in found:
+                found.add(name)
+                stack.extend(children[name])
+        return [name for name in self.order if name in found]
+
+    @staticmethod
+    def digest(df):
+        """Content hash of a node output ('none' for None)."""
+        if df is None:
+            return 'none'
+        sha = hashlib.sha256(json.dumps([str(c) for c in df.columns]).encode())
+        sha.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return sha.hexdigest()
+
+    def _key(self, node, digests):
+        payload = [node.name, node.params, [digests.get(d, 'missing') for d in node.deps]]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, name):
+        return os.path.join(self.store_dir, name.replace(':', '__') + self.backend.ext)
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.store_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        path = os.path.join(self.store_dir, MANIFEST_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _file_stamps(paths):
+        """{path: [size, mtime_ns]} of written files, None for missing ones."""
+        stamps = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stamps[path] = [st.st_size, st.st_mtime_ns]
+            except OSError:
+                stamps[path] = None
+        return stamps
+
+    def output(self, name):
+        """Output of a node from this run, else from the store (None if it produced nothing)."""
+        if name not in self._outputs:
+            path = self._path(name)
+            self._outputs[name] = self.backend.read(path) if os.path.exists(path) else None
+        return self._outputs[name]
+
+    def _execute(self, node, missing=()):
+        start = time.perf_counter()
+        inputs = [None if d in missing else self.output(d) for d in node.deps]
+        rows_in = sum(len(df) for df in inputs if df is not None) if inputs else None
+        with stage(f"pipeline.{node.name}", rows_in=rows_in) as record:
+            out = node.fn(inputs, node.params)
+            record.rows_out = None if out is None else len(out)
+        return out, time.perf_counter() - start
+
+    @instrumented('pipeline.run')
+    def run(self, targets=None, refresh=False, force=False):
+        """
+        Runs the nodes needed for targets (all by default). Nodes whose key is unchanged are
+        skipped; source nodes are rerun on refresh (True for all of them, or an iterable of
+        node names) and force reruns everything. Returns the report (Nodo, Estado, Segundos,
+        Filas) with Estado 'ran', 'unchanged' (ran, same output), 'cached', 'failed' or 'skipped'.
+        """
+        ensure_dirs()
+        os.makedirs(self.store_dir, exist_ok=True)
+        needed = self.upstream(targets or self.order)
+        refresh = set(self.order) if refresh is True else set(refresh or ())
+        manifest = self._load_manifest()
+        remaining = {name: len(self.nodes[name].deps) for name in needed}
+        children = self._children()
+        digests, rows, ready = {}, {}, deque(name for name in needed if remaining[name] == 0)
+        self._outputs = {}
+
+        def done(name, status, seconds=0.0):
+            rows[name] = {'Nodo': name, 'Estado': status, 'Segundos': round(seconds, 3),
+                          'Filas': manifest.get(name, {}).get('rows') if status in ('ran', 'unchanged', 'cached') else None}
+            for child in children[name]:
+                if child in remaining:
+                    remaining[child] -= 1
+                    if remaining[child] == 0:
+                        ready.append(child)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            while ready or running:
+                while ready:
+                    name = ready.popleft()
+                    node = self.nodes[name]
+                    missing = {d for d in node.deps if rows[d]['Estado'] in ('failed', 'skipped')}
+                    if missing and (not node.partial or len(missing) == len(node.deps)):
+                        done(name, 'skipped')
+                        continue
+                    if missing:
+                        print(f"⚠️  {name}: running without {', '.join(sorted(missing))}")
+                    key = self._key(node, digests)
+                    entry = manifest.get(name)
+                    stale = force or (node.source and name in refresh)
+                    stored = entry and (entry['digest'] == 'none' or os.path.exists(self._path(name)))
+                    if stored and node.writes:
+                        stored = self._file_stamps(entry.get('files', {})) == entry.get('files', {})
+                    if not stale and stored and entry['key'] == key:
+                        digests[name] = entry['digest']
+                        done(name, 'cached')
+                    else:
+                        running[pool.submit(bind(self._execute), node, missing)] = (name, key)
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, key = running.pop(future)
+                    try:
+                        out, seconds = future.result()
+                    except Exception as e:
+                        print(f"❌ {name}: {type(e).__name__}: {e}")
+                        done(name, 'failed')
+                        continue
+                    digest = self.digest(out)
+                    previous = manifest.get(name, {}).get('digest')
+                    if out is not None:
+                        self.backend.write(out, self._path(name))
+                    self._outputs[name] = out
+                    manifest[name] = {'key': key, 'digest': digest, 'rows': None if out is None else len(out)}
+                    if self.nodes[name].writes:
+                        manifest[name]['files'] = self._file_stamps([] if out is None else out['Archivo'])
+                    digests[name] = digest
+                    done(name, 'unchanged' if digest == previous else 'ran', seconds)
+        self._save_manifest(manifest)
+
+        self.report = pd.DataFrame([rows[name] for name in needed if name in rows])
+        counts = self.report['Estado'].value_counts()
+        print(f"🧩 Pipeline: {len(needed)} nodes in {time.perf_counter() - start:.1f}s "
+              f"({', '.join(f'{k} {v}' for k, v in counts.items())})")
+        return self.report
+
+# --- IPA27 nodes ---
+
+def _extract(inputs, params):
+    return extract_indicator(params['acronym'], params['entry'], params['directory'])
+
+def _transform(inputs, params):
+    """Standard long rows with canonical region codes and periods, one value per (Periodo, Region)."""
+    (df,) = inputs
+    if df is None or df.empty:
+        return None
+    freq, year, pos = parse_periods(df['Periodo'])
+    bad = pd.isna(freq)
+    if bad.any() and {'Fecha', 'Frecuencia'} <= set(df.columns):
+        # Non-standard labels (e.g. '2016-01') are rebuilt from Fecha and Frecuencia
+        fecha = pd.to_datetime(df['Fecha'][bad])
+        ppy = df['Frecuencia'][bad].astype(str).map(PERIODS_PER_YEAR)
+        freq[bad] = df['Frecuencia'][bad].astype(str).where(ppy.notna(), None).to_numpy()
+        year[bad] = fecha.dt.year.to_numpy()
+        pos[bad] = ((fecha.dt.month - 1) // (12 // ppy.fillna(1))).to_numpy()
+    data = pd.DataFrame({
+        'Frecuencia': freq,
+        't': year * pd.Series(freq).map(PERIODS_PER_YEAR).fillna(0).to_numpy(np.int64) + pos,
+        'Region': canonical_codes(df['Region'].astype(str)).to_numpy(),
+        'Valor': pd.to_numeric(df['Valor'], errors='coerce').to_numpy(float),
+        'Serie_Original': df['Serie_Original'].astype(str).to_numpy() if 'Serie_Original' in df else params['acronym']
+    })
+    data = data[data['Frecuencia'].notna() & data['Region'].notna()]
+    if data.empty:
+        return None
+    # Mixed frequencies keep the most frequent one
+    data = data[data['Frecuencia'] == data['Frecuencia'].mode().iloc[0]]
+    data = data.drop_duplicates(['Region', 't'], keep='last').sort_values(['Region', 't'])
+    f = data['Frecuencia'].iloc[0]
+    fechas, periodos = period_frame(data['t'].to_numpy(), f)
+    out = pd.DataFrame({
+        'Fecha': fechas, 'Periodo': periodos, 'Region': data['Region'].to_numpy(), 'Indicador': params['acronym'],
+        'Valor': data['Valor'].to_numpy(), 'Frecuencia': f, 'Serie_Original': data['Serie_Original'].to_numpy()
+    })
+
+    # Periods known to be broken at the source are replaced by the mean of their neighbours
+    fixes = params.get('correcciones', {}).get('interpolar', [])
+    if fixes:
+        broken = out['Periodo'].isin(fixes).to_numpy()
+        values = out['Valor'].mask(broken)
+        grouped = values.groupby(out['Region'])
+        filled = (grouped.shift(1) + grouped.shift(-1)) / 2
+        out['Valor'] = np.where(broken, filled, out['Valor'])
+        out.loc[broken, 'Serie_Original'] = out.loc[broken, 'Serie_Original'] + '_Interpolado'
+    return out[out['Valor'].notna()].reset_index(drop=True)
+
+def _to_quarterly(inputs, params):
+    """
+    Quarterly rows of one indicator: monthly series averaged over complete quarters, lower
+    frequencies disaggregated (Chow-Lin on the quarterly regressor when there is one, else Denton).
+    """
+    df, regressor = inputs[0], (inputs[1] if len(inputs) > 1 else None)
+    if df is None or df.empty:
+        return None
+    f = str(df['Frecuencia'].iloc[0])
+    if f == QUARTERLY:
+        return df
+    if f == 'Mensual':
+        _, year, pos = parse_periods(df['Periodo'])
+        q = pd.DataFrame({'Region': df['Region'].astype(str).to_numpy(), 't': year * 4 + pos // 3,
+                          'Valor': df['Valor'].to_numpy(float)})
+        g = q.groupby(['Region', 't'], as_index=False)['Valor'].agg(['mean', 'count'])
+        g = g[g['count'] == 3]
+        fechas, periodos = period_frame(g['t'].to_numpy(), QUARTERLY)
+        return pd.DataFrame({
+            'Fecha': fechas, 'Periodo': periodos, 'Region': g['Region'].to_numpy(), 'Indicador': params['acronym'],
+            'Valor': g['mean'].to_numpy(), 'Frecuencia': QUARTERLY, 'Serie_Original': 'Media_trimestral'
+        })
+    panel = pd.concat([df, regressor], ignore_index=True) if regressor is not None else df
+    regressors = {params['acronym']: params['regressor']} if params.get('regressor') else {}
+    out = disaggregate(panel, regressors=regressors, to=QUARTERLY, conversion=params['conversion'],
+                       order=params['denton']['order'], proportional=params['denton']['proportional'])
+    return out[out['Indicador'] == params['acronym']].reset_index(drop=True)
+
+def _to_units(inputs, params):
+    """
+    Quarterly values of one indicator in the units of its ceiling: divided by the population
+    (the quarterly por_poblacion indicator) of the same region and quarter, times factor.
+    Rows without a population are dropped.
+    """
+    df, population = inputs
+    if df is None or df.empty or population is None or population.empty:
+        return None
+    population = population.assign(Region=population['Region'].astype(str), Periodo=population['Periodo'].astype(str))
+    n = population.drop_duplicates(['Region', 'Periodo'], keep='last').set_index(['Region', 'Periodo'])['Valor']
+    keys = pd.MultiIndex.from_arrays([df['Region'].astype(str), df['Periodo'].astype(str)])
+    values = df['Valor'].to_numpy(float) / n.reindex(keys).to_numpy(float) * params['unidades']['factor']
+    out = df.assign(Valor=values)
+    return out[np.isfinite(values)].reset_index(drop=True)
+
+def _normalize(inputs, params):
+    (df,) = inputs
+    if df is None or df.empty:
+        return None
+    ceiling = pd.DataFrame({'Dirección': params['Dirección'], 'Techo': params['Techo']},
+                           index=pd.Index([params['acronym']], name='Indicador'))
+    scores = normalize_long(df, ceiling)
+    # Almost every score at a bound means the values are not in the units of the ceiling
+    clamped = scores['Score'].isin([0, SCORE_CAP]).mean() if len(scores) else 0
+    if clamped > 0.9:
+        print(f"⚠️  {params['acronym']}: {clamped:.0%} of scores at 0 or {SCORE_CAP} "
+              f"(median {df['Valor'].median():.4g} vs ceiling {params['Techo']:.4g}); check its units")
+    return scores
+
+def _aggregate(inputs, params):
+    scores = [df for df in inputs if df is not None]
+    if not scores:
+        return None
+    kernel = ScoreKernel.from_scores(pd.concat(scores, ignore_index=True), params['structure'])
+    return kernel.to_long(levels=('Pilar', 'Dominio', 'IPA27'))
+
+def _export(inputs, params):
+    """Quarterly master table (CSV and results workbook) and the IPA27 scores."""
+    from .consolidator import IPA27Consolidator
+    *panels, scores = inputs
+    panels = [df for df in panels if df is not None]
+    written = []
+    if panels:
+        long_df = pd.concat(panels, ignore_index=True)
+        long_df = long_df.assign(Periodo=long_df['Periodo'].astype(str), Region=long_df['Region'].astype(str),
+                                 Indicador=long_df['Indicador'].astype(str), Fuente=long_df['Indicador'].astype(str))
+        master = IPA27Consolidator().build_master(long_df)
+        path = os.path.join(params['directory'], 'IPA27_Master_Table.csv')
+        master.to_csv(path, index=False)
+        workbook = write_results_workbook(master, os.path.join(params['directory'], 'IPA27_Results.xlsx'))
+        written += [(path, len(master)), (workbook, len(master))]
+    if scores is not None:
+        path = os.path.join(params['directory'], 'IPA27_Scores.csv')
+        scores.to_csv(path, index=False)
+        written.append((path, len(scores)))
+    return pd.DataFrame(written, columns=['Archivo', 'Filas'])
+
+def build_pipeline(registry=None, indicators=None, ceilings=None, structure=IPA27_STRUCTURE,
+                   regressors=DISAGGREGATION_REGRESSORS, conversion='mean', directory=INDICATORS_DIR,
+                   store_dir=PIPELINE_DIR, max_workers=8):
+    """
+    IPA27 Pipeline for the registry entries (all, or the acronyms in indicators):
+    extract:X -> transform:X -> quarterly:X (-> units:X -> normalize:X when X has a ceiling and
+    is part of structure), then aggregate (pillars, domains, IPA27) and export. quarterly:X also
+    depends on quarterly:R when regressors maps X to a registry indicator R.
+
+    An entry's unidades put its values in the units of its ceiling: {'por_poblacion': P,
+    'factor': F} divides by quarterly:P (added when not selected) and multiplies by F, and
+    {'comparable': False} leaves the indicator unscored. An entry's conversion ('sum' for
+    annual totals) takes precedence over conversion, unless conversion is a dict naming it.
+    """
+    registry = load_registry() if registry is None else registry
+    ceilings = load_ceilings() if ceilings is None else ceilings
+    acronyms = [a for a in registry if indicators is None or a in indicators]
+    scored = {i for pillars in structure.values() for members in pillars.values() for i in members}
+    for acr in list(acronyms):
+        base = registry[acr].get('unidades', {}).get('por_poblacion')
+        if acr in scored and base in registry and base not in acronyms:
+            acronyms.append(base)
+
+    nodes = []
+    for acr in acronyms:
+        entry = registry[acr]
+        source = {'tipo': entry['tipo'], 'parametros': entry.get('parametros', {})}
+        nodes.append(Node(f"extract:{acr}", _extract, (), {
+            'acronym': acr, 'entry': source, 'directory': directory,
+            'stored': stored_fingerprint(acr, directory)}, source=True))
+        nodes.append(Node(f"transform:{acr}", _transform, (f"extract:{acr}",),
+                          {'acronym': acr, 'correcciones': entry.get('correcciones', {})}))
+        regressor = regressors.get(acr) if regressors.get(acr) in acronyms else None
+        deps = (f"transform:{acr}",) + ((f"quarterly:{regressor}",) if regressor else ())
+        if isinstance(conversion, dict):
+            conv = conversion.get(acr, entry.get('conversion', 'mean'))
+        else:
+            conv = entry.get('conversion', conversion)
+        nodes.append(Node(f"quarterly:{acr}", _to_quarterly, deps,
+                          {'acronym': acr, 'regressor': regressor, 'conversion': conv,
+                           'denton': {'order': DENTON_ORDER, 'proportional': DENTON_PROPORTIONAL}}))
+        if acr in scored and acr in ceilings.index:
+            units = entry.get('unidades', {})
+            if units.get('comparable', True) is False:
+                print(f"⚠️  {acr} not scored: its values are not in the units of its ceiling. {units.get('nota', '')}".rstrip())
+                continue
+            scored_input = f"quarterly:{acr}"
+            if units.get('por_poblacion'):
+                scored_input = f"units:{acr}"
+                nodes.append(Node(scored_input, _to_units, (f"quarterly:{acr}", f"quarterly:{units['por_poblacion']}"),
+                                  {'acronym': acr, 'unidades': units}))
+            row = ceilings.loc[acr]
+            nodes.append(Node(f"normalize:{acr}", _normalize, (scored_input,), {
+                'acronym': acr, 'Dirección': str(row['Dirección']), 'Techo': float(row['Techo'])}))
+
+    normalized = tuple(n.name for n in nodes if n.name.startswith('normalize:'))
+    nodes.append(Node('aggregate', _aggregate, normalized, {'structure': structure}))
+    quarterly = tuple(f"quarterly:{acr}" for acr in acronyms)
+    # Export writes whatever succeeded: one failed indicator does not hold back the others
+    nodes.append(Node('export', _export, quarterly + ('aggregate',), {'directory': store_dir},
+                      partial=True, writes=True))
+    return Pipeline(nodes, store_dir=store_dir, max_workers=max_workers)
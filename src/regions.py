@@ -0,0 +1,61 @@
+import re
+import unicodedata
+from functools import lru_cache
+import pandas as pd
+from .config import REGION_ALIASES, REGION_EXCLUDE, CCAA_CODES, LEGACY_REGION_CODES
+
+def normalize_text(text):
+    """Lower-case, trimmed and without accents ('Andalucía' -> 'andalucia')."""
+    s = str(text).lower().strip()
+    return "".join(c for c in unicodedata.normalize('NFKD', s) if unicodedata.category(c) != 'Mn')
+
+class RegionResolver:
+    """
+    Maps free-text series/row labels to canonical region codes.
+    All aliases are compiled into one regex (longest alias first at each position),
+    results are memoized per distinct label, and resolve() works on whole columns.
+    """
+
+    def __init__(self, aliases=REGION_ALIASES, exclude=REGION_EXCLUDE, numeric_codes=CCAA_CODES):
+        self._code_of = {alias: code for code, alias_list in aliases.items() for alias in alias_list}
+        for alias in exclude:
+            self._code_of[alias] = None
+        alternatives = sorted(self._code_of, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(a) for a in alternatives))
+        self._numeric = re.compile(r"^(\d{1,2})[\s\.]")
+        self._numeric_codes = numeric_codes
+        self.resolve_one = lru_cache(maxsize=None)(self._resolve_one)
+
+    def _resolve_one(self, text):
+        match = self._pattern.search(normalize_text(text))
+        if match:
+            return self._code_of[match.group(0)]
+        # Numeric CCAA code at the start (e.g. "01 Andalucía")
+        match = self._numeric.match(str(text).strip())
+        if match:
+            return self._numeric_codes.get(match.group(1).zfill(2))
+        return None
+
+    def resolve(self, values):
+        """Vectorized resolution of a Series of labels -> Series of codes (None when unmatched)."""
+        values = pd.Series(values)
+        uniques = values.dropna().unique()
+        mapping = {u: self.resolve_one(u) for u in uniques}
+        codes = values.map(mapping).astype(object)
+        return codes.where(codes.notna(), None)
+
+resolver = RegionResolver()
+
+def resolve_region(text):
+    """Region code for a single label, or None."""
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return None
+    return resolver.resolve_one(text)
+
+def resolve_regions(values):
+    """Region codes for a whole column of labels."""
+    return resolver.resolve(values)
+
+def canonical_codes(codes):
+    """Replaces legacy region codes (CASTL, CASTM, PVA) by the canonical ones."""
+    return pd.Series(codes).replace(LEGACY_REGION_CODES)
@@ -0,0 +1,98 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from .config import INDICATOR_REGISTRY_PATH, INDICATORS_DIR
+from .connectors import IneConnector, ReeConnector, CrimeConnector
+from .regions import normalize_text
+from .storage import list_indicators, load_indicator
+
+# The indicator registry (src/indicadores.json) is the notebooks' master INDICADORES dictionary
+# as data: acronym -> nombre, pilar, dominio, frecuencia (M/T/A), tipo and parametros, plus
+# optional correcciones, conversion and unidades (see pipeline.build_pipeline). Source types with a connector in src/ are downloaded; the others
+# (manual files, notebook-only processing) are read from the indicators stored in INDICATORS_DIR.
+
+def load_registry(path=INDICATOR_REGISTRY_PATH):
+    """{acronym: entry} in registry order."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _select_series(df, fragments):
+    """Rows whose Serie_Original contains every fragment (case and accent insensitive)."""
+    if df is None or not fragments:
+        return df
+    names = df['Serie_Original'].astype(str).map(normalize_text)
+    keep = pd.Series(True, index=df.index)
+    for fragment in fragments:
+        keep &= names.str.contains(normalize_text(fragment), regex=False)
+    return df[keep]
+
+def _tempus(acronym, params):
+    df = IneConnector().download_tempus(params['tabla_id'], acronym, save=False)
+    return _select_series(df, params.get('filtros_serie'))
+
+def _jaxi(acronym, params):
+    return IneConnector().download_jaxi_long(params['tabla_id'], acronym, filters=params.get('filtros'), save=False)
+
+def _jaxi_multi(acronym, params):
+    return IneConnector().download_jaxi_long(params['tablas_ids'], acronym, save=False)
+
+def _crime(acronym, params):
+    """Quarterly sum of the categorias_filtro categories per region."""
+    raw = CrimeConnector().download_crime(acronym, start_year=params.get('anio_inicio', 2016),
+                                          end_year=params.get('anio_fin'), save=False)
+    if raw is None:
+        return None
+    rows = raw[raw['Categoria_Norm'].astype(str).isin(params['categorias_filtro'])]
+    df = rows.groupby(['Año', 'Trimestre', 'Periodo', 'Region'], as_index=False, observed=True)['Valor_Trimestral'].sum(min_count=1)
+    return pd.DataFrame({
+        'Fecha': pd.to_datetime(pd.DataFrame({'year': df['Año'], 'month': df['Trimestre'] * 3 - 2, 'day': 1})),
+        'Periodo': df['Periodo'],
+        'Region': df['Region'],
+        'Indicador': acronym,
+        'Valor': df['Valor_Trimestral'],
+        'Frecuencia': 'Trimestral',
+        'Serie_Original': 'MIR_' + '+'.join(params['categorias_filtro'])
+    })
+
+def _ree(acronym, params):
+    return ReeConnector().download_renewables(acronym, save=False)
+
+# tipo -> downloader(acronym, parametros); every other tipo is read from INDICATORS_DIR
+DOWNLOADERS = {
+    'tempus': _tempus,
+    'jaxi': _jaxi,
+    'jaxi_multi': _jaxi_multi,
+    'criminalidad': _crime,
+    'ree': _ree
+}
+
+def stored_fingerprint(acronym, directory=INDICATORS_DIR):
+    """sha256 of the stored copy of an indicator, or None if there is none."""
+    path = list_indicators(directory).get(acronym)
+    if path is None:
+        return None
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def extract_indicator(acronym, entry, directory=INDICATORS_DIR):
+    """
+    Long rows of one registry entry: downloaded when its tipo has a connector, else (or when the
+    download fails) the copy stored in directory. None when neither is available.
+    """
+    download = DOWNLOADERS.get(entry['tipo'])
+    df = download(acronym, entry.get('parametros', {})) if download else None
+    if df is not None and not df.empty:
+        return df.assign(Indicador=acronym)
+
+    path = list_indicators(directory).get(acronym)
+    if path is None:
+        hint = entry.get('parametros', {}).get('instrucciones', '')
+        print(f"⚠️  {acronym}: no data ({entry['tipo']}). {hint}".rstrip())
+        return None
+    if download:
+        print(f"   ↩️ {acronym}: download failed, using {os.path.basename(path)}")
+    return load_indicator(path).assign(Indicador=acronym)
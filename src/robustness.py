@@ -0,0 +1,175 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .config import GEOMETRIC_FLOOR, SCORE_CAP
+from .instrumentation import instrumented
+
+# Monte Carlo robustness of the IPA27 ranking. Every draw perturbs the weights (indicators within
+# pillars, pillars within domains, domains within the index), the fixed ceilings and the exponent of
+# the power mean used at every level (0 = geometric, 1 = arithmetic). Draws are evaluated in chunks
+# as (draw x period x region x indicator) arrays; only rank histograms and score moments are kept.
+
+WEIGHT_SPREAD = 0.5        # Weights ~ U(1 - s, 1 + s)
+CEILING_SPREAD = 0.1       # Techo * U(1 - s, 1 + s)
+EXPONENT_RANGE = (0.0, 1.0)
+CHUNK_CELLS = 5_000_000    # Array cells per chunk (draws x periods x regions x indicators)
+
+def _log_power_mean(logx, valid, groups, n_groups, weights, p):
+    """
+    log of the weighted power means over the last axis into n_groups, one exponent and weight
+    vector per draw (logx B x ... x m without NaN, valid 0/1 of the same shape or without the
+    draw axis, weights B x m, p B). Means are taken on the Box-Cox scale (x^p - 1) / p, which
+    tends to log x as p -> 0, so geometric and power means share one path; zero members (log -inf)
+    are only allowed for p > 0. Missing members are left out and the remaining weights
+    renormalized. Returns (log means, valid).
+    """
+    B, m = weights.shape
+    W = np.zeros((B, m, n_groups))
+    W[:, np.arange(m), groups] = weights
+    geometric = np.abs(p) < 1e-12
+    safe = np.where(geometric, 1.0, p).reshape((B,) + (1,) * (logx.ndim - 1))
+
+    y = logx * safe
+    np.expm1(y, out=y)
+    y /= safe
+    y[geometric] = logx[geometric]
+    y *= valid
+
+    lead = logx.shape[:-1]
+    num = (y.reshape(B, -1, m) @ W).reshape(lead + (n_groups,))
+    den = (valid.reshape(B if valid.ndim == logx.ndim else 1, -1, m) @ W).reshape(lead + (n_groups,))
+    ok = den > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ybar = np.where(ok, num / den, 0.0)
+        # x^p >= 0: all-zero groups give log 0 = -inf, also after rounding
+        out = np.log1p(np.maximum(ybar * safe, -1.0)) / safe
+    out[geometric] = ybar[geometric]
+    return np.where(ok, out, 0.0), ok.astype(float)
+
+def _ranks(ipa):
+    """Rank (1 = best) of each region within every (draw, period); NaN scores get rank 0."""
+    filled = np.where(np.isnan(ipa), -np.inf, ipa)
+    ranks = np.argsort(np.argsort(-filled, axis=-1, kind='stable'), axis=-1) + 1
+    return np.where(np.isnan(ipa), 0, ranks)
+
+def _evaluate_chunk(args):
+    """Worker: evaluates n draws and returns (rank counts T x R x R+1, sum, sum of squares, valid draws)."""
+    raw, ceiling, inverse, pillar_of, domain_of, n_draws, spec, seed = args
+    rng = np.random.default_rng(seed)
+    n_ind, n_pil, n_dom = len(ceiling), len(domain_of), int(domain_of.max()) + 1
+    ws, cs, (p_lo, p_hi) = spec['weight_spread'], spec['ceiling_spread'], spec['exponents']
+    T, R = raw.shape[:2]
+    counts = np.zeros(T * R * (R + 1), dtype=np.int64)
+    s1, s2, n = np.zeros((T, R)), np.zeros((T, R)), np.zeros((T, R))
+
+    # Scores as one affine map per draw (100 x / Techo, or 100 - 100 x / Techo for INV), clamped as in
+    # ScoreKernel and, for exponents <= 0, floored as in its geometric means; missing cells are masked, not NaN
+    x = np.nan_to_num(raw)
+    valid = (~np.isnan(raw)).astype(float)
+    offset = np.where(inverse, 100.0, 0.0)
+    slope = np.where(inverse, -100.0, 100.0)
+    top = np.zeros(n_dom, dtype=np.int64)
+
+    block = max(1, CHUNK_CELLS // max(1, raw.size))
+    for start in range(0, n_draws, block):
+        B = min(block, n_draws - start)
+        ceil = ceiling * rng.uniform(1 - cs, 1 + cs, (B, n_ind))
+        w_ind = rng.uniform(1 - ws, 1 + ws, (B, n_ind))
+        w_pil = rng.uniform(1 - ws, 1 + ws, (B, n_pil))
+        w_dom = rng.uniform(1 - ws, 1 + ws, (B, n_dom))
+        p = rng.uniform(p_lo, p_hi, B)
+
+        logs = x[None] * (slope / ceil)[:, None, None, :]
+        logs += offset
+        floor = np.where(p <= 0, GEOMETRIC_FLOOR, 0.0)[:, None, None, None]
+        np.clip(logs, floor, SCORE_CAP, out=logs)
+        with np.errstate(divide='ignore'):
+            np.log(logs, out=logs)
+        pillars, ok = _log_power_mean(logs, valid, pillar_of, n_pil, w_ind, p)
+        domains, ok = _log_power_mean(pillars, ok, domain_of, n_dom, w_pil, p)
+        log_ipa, ok = _log_power_mean(domains, ok, top, 1, w_dom, p)
+        ipa = np.where(ok[..., 0] > 0, np.exp(log_ipa[..., 0]), np.nan)  # B x T x R
+
+        ranks = _ranks(ipa)
+        cell = np.arange(T * R).reshape(T, R)
+        counts += np.bincount((cell[None] * (R + 1) + ranks).ravel(), minlength=counts.size)
+        ok = ~np.isnan(ipa)
+        s1 += np.where(ok, ipa, 0).sum(axis=0)
+        s2 += np.where(ok, ipa ** 2, 0).sum(axis=0)
+        n += ok.sum(axis=0)
+    return counts.reshape(T, R, R + 1), s1, s2, n
+
+@instrumented()
+def rank_stability(kernel, n_draws=10_000, regions=None, periods=None, weight_spread=WEIGHT_SPREAD,
+                   ceiling_spread=CEILING_SPREAD, exponents=EXPONENT_RANGE, seed=0, max_workers=None,
+                   chunk_draws=1000):
+    """
+    Rank stability of regions under n_draws perturbed parameter sets of a ScoreKernel.
+
+    regions are ranked among themselves (default: every region but ESP) in each of periods
+    (default: all). Draws are split in chunks of chunk_draws, each with its own seed derived from
+    seed, so results do not depend on max_workers; max_workers > 1 spreads chunks over processes.
+
+    Returns (summary, distribution): summary has one row per (Periodo, Region) with the base
+    rank and score (unperturbed weights, ceilings and geometric means), rank mean / p05 / median /
+    p95, the share of draws keeping the base rank and the score mean and std; distribution is the
+    long share of draws per (Periodo, Region, Rank).
+    """
+    import pandas as pd  # Not at module level: pool workers only need numpy
+    regions = [r for r in kernel.regions if r != 'ESP'] if regions is None else list(regions)
+    periods = list(kernel.periods) if periods is None else list(periods)
+    r_idx = [kernel.regions.index(r) for r in regions]
+    t_idx = [kernel.periods.index(p) for p in periods]
+    raw = kernel.raw[np.ix_(t_idx, r_idx)]
+    spec = {'weight_spread': weight_spread, 'ceiling_spread': ceiling_spread, 'exponents': exponents}
+
+    sizes = [min(chunk_draws, n_draws - s) for s in range(0, n_draws, chunk_draws)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(raw, kernel.ceiling, kernel.inverse, kernel.pillar_of, kernel.domain_of, size, spec, s)
+            for size, s in zip(sizes, seeds)]
+    print(f"🎲 Robustness: {n_draws} draws x {len(periods)} periods x {len(regions)} regions "
+          f"in {len(jobs)} chunks")
+    if max_workers and max_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_evaluate_chunk, jobs))
+    else:
+        results = [_evaluate_chunk(job) for job in jobs]
+
+    counts = sum(r[0] for r in results)[..., 1:]  # Drop rank 0 (missing score)
+    s1, s2, n = (sum(r[i] for r in results) for i in (1, 2, 3))
+    base = kernel.aggregate()['IPA27'][np.ix_(t_idx, r_idx)]
+    base_rank = _ranks(base[None])[0]
+
+    total = counts.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = counts / total[..., None]
+        cdf = np.cumsum(share, axis=-1)
+        rank_values = np.arange(1, len(regions) + 1)
+        mean_score = s1 / n
+
+        def quantile(q):
+            """Smallest rank whose cumulative share reaches q."""
+            return np.where(total > 0, (cdf < q).sum(axis=-1) + 1, np.nan)
+
+        summary = pd.DataFrame({
+            'Periodo': np.repeat(np.asarray(periods, dtype=object), len(regions)),
+            'Region': np.tile(np.asarray(regions, dtype=object), len(periods)),
+            'Rank_base': np.where(base_rank > 0, base_rank, np.nan).ravel(),
+            'Rank_mean': ((share * rank_values).sum(axis=-1)).ravel(),
+            'Rank_p05': quantile(0.05).ravel(),
+            'Rank_median': quantile(0.5).ravel(),
+            'Rank_p95': quantile(0.95).ravel(),
+            'Prob_base': np.take_along_axis(share, np.maximum(base_rank - 1, 0)[..., None], -1)[..., 0].ravel(),
+            'Score_base': base.ravel(),
+            'Score_mean': mean_score.ravel(),
+            'Score_std': np.sqrt(np.maximum(s2 / n - mean_score ** 2, 0)).ravel()
+        })
+    summary.loc[summary['Rank_base'].isna(), 'Prob_base'] = np.nan
+
+    t, r, k = np.nonzero(counts)
+    distribution = pd.DataFrame({
+        'Periodo': np.asarray(periods, dtype=object)[t],
+        'Region': np.asarray(regions, dtype=object)[r],
+        'Rank': k + 1,
+        'Prob': share[t, r, k]
+    })
+    return summary, distribution
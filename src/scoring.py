@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from .config import IPA27_STRUCTURE, CEILINGS_PATH, SCORE_CAP, GEOMETRIC_FLOOR
+
+# Fixed-ceiling normalization and geometric aggregation of the whole panel at once.
+# Values live in a (period x region x indicator) array; scores are computed with broadcasting
+# against the ceilings, and each level (pillar, domain, IPA27) is a weighted mean of logs taken
+# with one matrix product against a membership matrix built from index arrays.
+
+LEVELS = ('Indicador', 'Pilar', 'Dominio', 'IPA27')
+
+def load_ceilings(path=CEILINGS_PATH):
+    """Ceilings table indexed by Indicador, with Techo and Dirección (NOR: higher is better, INV)."""
+    return pd.read_csv(path).set_index('Indicador')
+
+def _membership(members, groups, n_groups, weights):
+    """(n_members x n_groups) weights matrix: member j belongs to group groups[j] with weight w_j."""
+    W = np.zeros((len(members), n_groups))
+    W[np.arange(len(members)), groups] = [weights.get(m, 1.0) for m in members]
+    return W
+
+def _weighted_mean(x, W, geometric=True, floor=GEOMETRIC_FLOOR):
+    """
+    Weighted (geometric) mean over the last axis of x for every column of W.
+    Missing members are left out and the weights of the rest renormalized.
+    """
+    valid = ~np.isnan(x)
+    if geometric:
+        x = np.log(np.maximum(x, floor))
+    num = np.where(valid, x, 0.0) @ W
+    den = valid.astype(float) @ W
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = num / den
+    mean[den == 0] = np.nan
+    return np.exp(mean) if geometric else mean
+
+def normalize_long(df, ceilings=None):
+    """
+    Indicator scores (Periodo, Region, Indicador, Score) of long rows (Periodo, Region, Indicador,
+    Valor) against the fixed ceilings, as in ScoreKernel; rows of indicators without a ceiling are dropped.
+    """
+    ceilings = load_ceilings() if ceilings is None else ceilings
+    df = df[df['Indicador'].astype(str).isin(ceilings.index)]
+    rows = ceilings.loc[df['Indicador'].astype(str)]
+    inverse = (rows['Dirección'].astype(str).str.upper() == 'INV').to_numpy()
+    values = pd.to_numeric(df['Valor'], errors='coerce').to_numpy(float)
+    return pd.DataFrame({
+        'Periodo': df['Periodo'].astype(str).to_numpy(),
+        'Region': df['Region'].astype(str).to_numpy(),
+        'Indicador': df['Indicador'].astype(str).to_numpy(),
+        'Score': ScoreKernel._normalize(values, rows['Techo'].to_numpy(float), inverse)
+    })
+
+class ScoreKernel:
+    """
+    IPA27 scores of every region and period from a long panel of raw indicator values.
+
+    score = 100 * x / Techo (NOR) or 100 * (1 - x / Techo) (INV), clamped to [0, SCORE_CAP];
+    pillars, domains and the index are geometric means of the level below (floored at
+    GEOMETRIC_FLOOR). Scores are computed once; aggregate() can then be rerun with other weights.
+    """
+
+    def __init__(self, values, periods, regions, indicators, ceilings=None, structure=IPA27_STRUCTURE):
+        self.values = np.asarray(values, dtype=float)
+        self.periods, self.regions = list(periods), list(regions)
+        ceilings = load_ceilings() if ceilings is None else ceilings
+
+        # Only indicators that are part of the structure and have a ceiling are scored
+        self.pillar_names, self.domain_names, pillar_of, domain_of, keep = [], list(structure), [], [], []
+        for d, (domain, pillars) in enumerate(structure.items()):
+            for pillar, members in pillars.items():
+                self.pillar_names.append(pillar)
+                domain_of.append(d)
+                for ind in members:
+                    if ind in indicators and ind in ceilings.index:
+                        keep.append(ind)
+                        pillar_of.append(len(self.pillar_names) - 1)
+        missing = [i for pillars in structure.values() for members in pillars.values() for i in members
+                   if i not in keep]
+        if missing:
+            print(f"⚠️  Not scored (no data or no ceiling): {', '.join(missing)}")
+        self.indicators = keep
+        self.pillar_of, self.domain_of = np.array(pillar_of, dtype=np.int64), np.array(domain_of, dtype=np.int64)
+
+        columns = [list(indicators).index(i) for i in keep]
+        self.raw = self.values[:, :, columns]
+        self.ceiling = ceilings.loc[keep, 'Techo'].to_numpy(float)
+        self.inverse = (ceilings.loc[keep, 'Dirección'].astype(str).str.upper() == 'INV').to_numpy()
+        self.scores = self._normalize(self.raw, self.ceiling, self.inverse)
+
+    @staticmethod
+    def _normalize(x, ceiling, inverse):
+        """Scores of a (... x indicator) array against per-indicator ceilings, broadcast over the rest."""
+        ratio = x / ceiling
+        score = 100 * np.where(inverse, 1 - ratio, ratio)
+        return np.clip(score, 0, SCORE_CAP)
+
+    @classmethod
+    def from_long(cls, df, ceilings=None, structure=IPA27_STRUCTURE):
+        """Kernel from long rows (Periodo, Region, Indicador, Valor); the last value of a cell wins."""
+        periods = pd.Categorical(df['Periodo'].astype(str))
+        regions = pd.Categorical(df['Region'].astype(str))
+        indicators = pd.Categorical(df['Indicador'].astype(str))
+        values = np.full((len(periods.categories), len(regions.categories), len(indicators.categories)), np.nan)
+        values[periods.codes, regions.codes, indicators.codes] = pd.to_numeric(df['Valor'], errors='coerce')
+        return cls(values, periods.categories, regions.categories, list(indicators.categories),
+                   ceilings, structure)
+
+    @classmethod
+    def from_scores(cls, df, structure=IPA27_STRUCTURE):
+        """Kernel from long indicator scores (Periodo, Region, Indicador, Score), e.g. from normalize_long()."""
+        # A ceiling of 100 in the NOR direction maps every score onto itself
+        names = pd.Index(pd.unique(df['Indicador'].astype(str)), name='Indicador')
+        identity = pd.DataFrame({'Dirección': 'NOR', 'Techo': 100.0}, index=names)
+        return cls.from_long(df.rename(columns={'Score': 'Valor'}), identity, structure)
+
+    def aggregate(self, weights=None, geometric=True):
+        """
+        {'Pilar': T x R x P, 'Dominio': T x R x D, 'IPA27': T x R} from the indicator scores.
+        weights maps indicator, pillar or domain names to their weight within the level above
+        (1 by default); geometric=False gives the arithmetic means instead.
+        """
+        weights = weights or {}
+        n_pillars, n_domains = len(self.pillar_names), len(self.domain_names)
+        pillars = _weighted_mean(self.scores, _membership(self.indicators, self.pillar_of, n_pillars, weights), geometric)
+        domains = _weighted_mean(pillars, _membership(self.pillar_names, self.domain_of, n_domains, weights), geometric)
+        top = np.zeros(n_domains, dtype=np.int64)
+        index = _weighted_mean(domains, _membership(self.domain_names, top, 1, weights), geometric)
+        return {'Pilar': pillars, 'Dominio': domains, 'IPA27': index[..., 0]}
+
+    def to_long(self, levels=None, weights=None, geometric=True):
+        """Long frame (Periodo, Region, Nivel, Nombre, Score) of the requested levels (all by default)."""
+        levels = levels or LEVELS
+        agg = self.aggregate(weights, geometric)
+        arrays = {'Indicador': (self.scores, self.indicators), 'Pilar': (agg['Pilar'], self.pillar_names),
+                  'Dominio': (agg['Dominio'], self.domain_names), 'IPA27': (agg['IPA27'][..., None], ['IPA27'])}
+        frames = []
+        for level in levels:
+            arr, names = arrays[level]
+            t, r, k = np.indices(arr.shape).reshape(3, -1)
+            frames.append(pd.DataFrame({
+                'Periodo': np.asarray(self.periods, dtype=object)[t],
+                'Region': np.asarray(self.regions, dtype=object)[r],
+                'Nivel': level,
+                'Nombre': np.asarray(names, dtype=object)[k],
+                'Score': arr.ravel()
+            }))
+        out = pd.concat(frames, ignore_index=True)
+        return out[out['Score'].notna()].reset_index(drop=True)
@@ -0,0 +1,118 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .instrumentation import instrumented
+
+# Index of political disaffection (IDP): alpha * salience + (1 - alpha) * anchoring,
+# falling back to salience where the anchoring index is missing
+SALIENCE = 'SCORE_POLITICO_BRUTO'
+ANCHORING = 'INDICE_ANCLAJE'
+CRITERION = 'PROBVOTO'
+DEFAULT_ALPHA = 0.6
+
+def idp(df, alpha=DEFAULT_ALPHA, salience=SALIENCE, anchoring=ANCHORING):
+    """IDP for one alpha, as in the notebook (alpha * S + (1 - alpha) * A.fillna(S))."""
+    return alpha * df[salience] + (1 - alpha) * df[anchoring].fillna(df[salience])
+
+class AlphaSensitivity:
+    """
+    Correlation between the IDP and a criterion (PROBVOTO) as a function of alpha.
+
+    IDP(alpha) = A + alpha * D with A = anchoring.fillna(salience) and D = salience - A, so
+    corr(P, IDP) only needs the (weighted) second moments of P, A and D. They are computed
+    once; any alpha grid, and the optimal alpha, follow in closed form.
+    """
+
+    def __init__(self, df, salience=SALIENCE, anchoring=ANCHORING, criterion=CRITERION, weight=None):
+        s = df[salience].to_numpy(float)
+        a = df[anchoring].fillna(df[salience]).to_numpy(float)
+        p = df[criterion].to_numpy(float)
+        # Same rows as Series.corr: the criterion and the IDP (defined where salience is) both present
+        mask = ~np.isnan(p) & ~np.isnan(s)
+        w = np.ones(mask.sum()) if weight is None else df[weight].to_numpy(float)[mask]
+        self.n = int(mask.sum())
+        self.moments = self._moments(p[mask], a[mask], s[mask] - a[mask], w)
+
+    @staticmethod
+    def _moments(p, a, d, w):
+        """Weighted covariances of (P, A, D): centred first, then one pass of cross-products."""
+        x = np.vstack([p, a, d])
+        x = x - (x @ w / w.sum())[:, None]
+        cov = (x * w) @ x.T / w.sum()
+        return {'pp': cov[0, 0], 'pa': cov[0, 1], 'pd': cov[0, 2],
+                'aa': cov[1, 1], 'ad': cov[1, 2], 'dd': cov[2, 2]}
+
+    def corr(self, alphas):
+        """corr(criterion, IDP(alpha)) for every alpha (array in, array out)."""
+        m = self.moments
+        alphas = np.asarray(alphas, dtype=float)
+        cov = m['pa'] + alphas * m['pd']
+        var = m['aa'] + 2 * alphas * m['ad'] + alphas ** 2 * m['dd']
+        return cov / np.sqrt(m['pp'] * var)
+
+    def optimal_alpha(self, bounds=(0.0, 1.0)):
+        """
+        Alpha in bounds minimizing corr(criterion, IDP) (the notebook's minimize_scalar objective).
+        The correlation is a ratio with a single stationary point, so the minimum is either
+        that point or a bound.
+        """
+        m = self.moments
+        c0, c1, v0, v01 = m['pa'], m['pd'], m['aa'], m['ad']
+        candidates = list(bounds)
+        denom = c1 * v01 - c0 * m['dd']
+        if denom != 0:
+            stationary = (c0 * v01 - c1 * v0) / denom
+            if bounds[0] < stationary < bounds[1]:
+                candidates.append(stationary)
+        values = self.corr(candidates)
+        return float(candidates[int(np.nanargmin(values))])
+
+    def sweep(self, alphas=None):
+        """DataFrame of alpha and the notebook's plotted sensitivity (-corr)."""
+        import pandas as pd
+        alphas = np.linspace(0, 1, 21) if alphas is None else np.asarray(alphas, dtype=float)
+        return pd.DataFrame({'alpha': alphas, 'corr': -self.corr(alphas)})
+
+def _bootstrap_groups(args):
+    """Worker: bootstrap weighted means for a list of (key, values, weights, seed)."""
+    groups, n_boot, levels = args
+    out = []
+    for key, x, w, seed in groups:
+        rng = np.random.default_rng(seed)
+        wx = x * w
+        means = np.empty(n_boot)
+        # Resampled respondent indices, one row per replicate, in blocks of ~10M cells
+        block = max(1, 10_000_000 // len(x))
+        for start in range(0, n_boot, block):
+            idx = rng.integers(0, len(x), size=(min(block, n_boot - start), len(x)), dtype=np.int32)
+            means[start:start + len(idx)] = wx[idx].sum(axis=1) / w[idx].sum(axis=1)
+        out.append((key, wx.sum() / w.sum(), *np.quantile(means, levels), means.std(ddof=1)))
+    return out
+
+@instrumented()
+def bootstrap_index(df, value, by='ESTU', weight='PESO', n_boot=1000, ci=0.95, seed=0, max_workers=None):
+    """
+    Percentile bootstrap CIs of the weighted mean of value per group (e.g. ESTU or [ESTU, CCAA]),
+    resampling respondents within each group. Every group has its own seed derived from seed,
+    so results do not depend on max_workers; max_workers > 1 spreads groups over processes.
+    """
+    import pandas as pd  # Not at module level: pool workers only need numpy
+    by = [by] if isinstance(by, str) else list(by)
+    data = df.loc[df[value].notna() & df[weight].notna(), by + [value, weight]]
+    grouped = list(data.groupby(by, sort=True, observed=True))
+    seeds = np.random.SeedSequence(seed).spawn(len(grouped))
+    groups = [(key, g[value].to_numpy(float), g[weight].to_numpy(float), s)
+              for (key, g), s in zip(grouped, seeds)]
+    levels = [(1 - ci) / 2, 1 - (1 - ci) / 2]
+
+    if max_workers and max_workers > 1 and len(groups) > 1:
+        chunks = [groups[i::max_workers] for i in range(max_workers)]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            rows = [r for part in pool.map(_bootstrap_groups, [(c, n_boot, levels) for c in chunks]) for r in part]
+    else:
+        rows = _bootstrap_groups((groups, n_boot, levels))
+
+    result = pd.DataFrame(rows, columns=['key', value, 'CI_low', 'CI_high', 'SE'])
+    keys = result.pop('key')
+    result.index = pd.MultiIndex.from_tuples(keys, names=by) if len(by) > 1 else pd.Index(
+        [k[0] if isinstance(k, tuple) else k for k in keys], name=by[0])
+    return result.sort_index()
@@ -0,0 +1,130 @@
+import os
+import glob
+import pandas as pd
+from .config import DATA_PROCESSED, STORAGE_FORMAT, CSV_EXPORT
+
+# Bump when the on-disk layout of indicator files changes
+SCHEMA_VERSION = 1
+
+STANDARD_COLUMNS = ['Fecha', 'Periodo', 'Region', 'Indicador', 'Valor', 'Frecuencia', 'Serie_Original']
+CATEGORICAL_COLUMNS = ['Periodo', 'Region', 'Indicador', 'Frecuencia', 'Serie_Original']
+
+# Consolidation outputs living next to the indicators, never read back as inputs
+EXCLUDED_NAMES = ('Master_Table', 'Results', 'Long_Store')
+
+def standardize(df):
+    """Typed copy of an indicator frame: datetime Fecha, float Valor, categorical labels."""
+    df = df.copy()
+    if 'Fecha' in df.columns:
+        df['Fecha'] = pd.to_datetime(df['Fecha'])
+    if 'Valor' in df.columns:
+        df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce').astype('float64')
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).where(df[col].notna()).astype('category')
+    return df
+
+class CsvBackend:
+    """Plain CSV files (the historical format, kept as an optional export)."""
+    ext = '.csv'
+
+    def write(self, df, path):
+        df.to_csv(path, index=False)
+
+    def read(self, path, columns=None):
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [c for c in columns if c in header] if columns else None
+        parse_dates = ['Fecha'] if 'Fecha' in (usecols or header) else False
+        return pd.read_csv(path, usecols=usecols, parse_dates=parse_dates)
+
+    def schema_version(self, path):
+        return None
+
+class ParquetBackend:
+    """Typed, categorical-encoded Parquet files carrying the schema version in their metadata."""
+    ext = '.parquet'
+    _version_key = b'ipa27_schema_version'
+
+    def __init__(self):
+        import pyarrow  # noqa: F401  (fail early so get_backend can fall back to CSV)
+
+    def write(self, df, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[self._version_key] = str(SCHEMA_VERSION).encode()
+        tmp = path + '.tmp'
+        pq.write_table(table.replace_schema_metadata(metadata), tmp, compression='zstd')
+        os.replace(tmp, path)
+
+    def read(self, path, columns=None):
+        if columns:
+            available = self._columns(path)
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(path, columns=columns)
+
+    def _columns(self, path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+
+    def schema_version(self, path):
+        import pyarrow.parquet as pq
+        metadata = pq.read_schema(path).metadata or {}
+        raw = metadata.get(self._version_key)
+        return int(raw) if raw else None
+
+_BACKENDS = {'csv': CsvBackend, 'parquet': ParquetBackend}
+
+def get_backend(fmt=None):
+    """Storage backend for fmt ('parquet' or 'csv'); falls back to CSV if pyarrow is missing."""
+    fmt = fmt or STORAGE_FORMAT
+    if fmt not in _BACKENDS:
+        raise ValueError(f"Unknown storage format: {fmt}")
+    try:
+        return _BACKENDS[fmt]()
+    except ImportError:
+        print(f"⚠️ pyarrow not installed, storing indicators as CSV instead of {fmt}")
+        return CsvBackend()
+
+def indicator_path(name, fmt=None, directory=DATA_PROCESSED):
+    return os.path.join(directory, f"{name}{get_backend(fmt).ext}")
+
+def save_indicator(df, name, directory=DATA_PROCESSED, fmt=None, export_csv=None):
+    """Writes an indicator with the configured backend (plus a CSV copy if export_csv). Returns the path."""
+    backend = get_backend(fmt)
+    df = standardize(df)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}{backend.ext}")
+    backend.write(df, path)
+    export_csv = CSV_EXPORT if export_csv is None else export_csv
+    if export_csv and backend.ext != CsvBackend.ext:
+        CsvBackend().write(df, os.path.join(directory, f"{name}{CsvBackend.ext}"))
+    return path
+
+def _backend_for(path):
+    return ParquetBackend() if path.endswith(ParquetBackend.ext) else CsvBackend()
+
+def list_indicators(directory=DATA_PROCESSED):
+    """{name: path} of stored indicators; a Parquet file wins over a CSV export of the same name."""
+    found = {}
+    for ext in (CsvBackend.ext, ParquetBackend.ext):
+        for path in sorted(glob.glob(os.path.join(directory, f"*{ext}"))):
+            name = os.path.basename(path)[:-len(ext)]
+            if any(x in name for x in EXCLUDED_NAMES):
+                continue
+            found[name] = path
+    return found
+
+def load_indicator(name_or_path, columns=None, directory=DATA_PROCESSED):
+    """Loads an indicator by name (or path), reading only the requested columns."""
+    path = name_or_path
+    if not os.path.exists(path):
+        path = list_indicators(directory).get(name_or_path)
+        if path is None:
+            raise FileNotFoundError(f"Indicator not found: {name_or_path}")
+    backend = _backend_for(path)
+    version = backend.schema_version(path)
+    if version is not None and version != SCHEMA_VERSION:
+        print(f"⚠️ {os.path.basename(path)} has schema version {version} (expected {SCHEMA_VERSION})")
+    return backend.read(path, columns)
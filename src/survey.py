@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_STATS = ('mean', 'n', 'weight', 'neff')
+
+def weighted_stats(df, by, value_cols, weight='PESO', stats=DEFAULT_STATS, quantiles=(0.5,)):
+    """
+    Weighted statistics of many columns per group in one pass over the data.
+
+    For every column, NaN values (and their weights) are left out, as in
+    np.average(x.dropna(), weights=w[x.notna()]). Available stats:
+      mean   weighted mean, bit-for-bit equal to that np.average call
+      std    weighted standard deviation (population), as sqrt(np.average((x - mean)**2, w))
+      n      number of non-NaN rows
+      weight sum of their weights
+      neff   Kish effective sample size, (sum w)^2 / sum w^2
+      q      weighted quantiles: the first value whose cumulative weight reaches q * sum w
+             (the notebooks' weighted_median for q=0.5)
+    Returns one row per group (by=None for a single total row) and columns named
+    <col> for the mean and <col>_<stat> / <col>_p<100q> for the rest.
+    """
+    if by:
+        by = [by] if isinstance(by, str) else list(by)
+        grouped = df.groupby(by, sort=True, observed=True, dropna=True)
+        codes = grouped.ngroup().fillna(-1).to_numpy(np.int64)
+        index = grouped.size().index
+    else:
+        codes = np.zeros(len(df), dtype=np.int64)
+        index = pd.Index(['Total'])
+
+    keep = codes >= 0  # Rows with a NaN key belong to no group
+    # Stable sort: each group becomes a contiguous slice that keeps the original row order
+    order = np.argsort(codes[keep], kind='stable')
+    codes_sorted = codes[keep][order]
+    w_all = df[weight].to_numpy(float)[keep][order]
+    out = {}
+
+    for col in value_cols:
+        x_all = df[col].to_numpy(float)[keep][order]
+        valid = ~np.isnan(x_all)
+        x, w, g = x_all[valid], w_all[valid], codes_sorted[valid]
+        # Contiguous per-group slices summed with np.sum (pairwise), exactly like np.average;
+        # groupby().sum() uses compensated summation and would differ in the last bits.
+        bounds = np.flatnonzero(np.diff(g)) + 1
+        starts, ends = np.r_[0, bounds], np.r_[bounds, len(g)]
+        present = g[starts] if len(g) else g
+        wx = np.multiply(x, w)
+        res = {s: np.full(len(index), np.nan) for s in stats if s != 'q'}
+        qs = np.full((len(index), len(quantiles)), np.nan)
+
+        for gid, s, e in zip(present, starts, ends):
+            ws = w[s:e]
+            total = ws.sum()
+            mean = wx[s:e].sum() / total
+            if 'mean' in res:
+                res['mean'][gid] = mean
+            if 'std' in res:
+                res['std'][gid] = np.sqrt(np.multiply((x[s:e] - mean) ** 2, ws).sum() / total)
+            if 'n' in res:
+                res['n'][gid] = e - s
+            if 'weight' in res:
+                res['weight'][gid] = total
+            if 'neff' in res:
+                res['neff'][gid] = total ** 2 / np.multiply(ws, ws).sum()
+            if 'q' in stats:
+                srt = np.argsort(x[s:e], kind='stable')
+                cum = np.cumsum(ws[srt])
+                pos = np.searchsorted(cum, np.asarray(quantiles) * total, side='left')
+                qs[gid] = x[s:e][srt][np.minimum(pos, e - s - 1)]
+
+        for s, values in res.items():
+            out[col if s == 'mean' else f"{col}_{s}"] = values
+        if 'q' in stats:
+            for j, q in enumerate(quantiles):
+                out[f"{col}_p{round(q * 100):g}"] = qs[:, j]
+
+    result = pd.DataFrame(out, index=index)
+    if 'n' in stats:
+        for col in value_cols:
+            result[f"{col}_n"] = result[f"{col}_n"].fillna(0).astype(int)
+    return result
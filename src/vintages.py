@@ -0,0 +1,170 @@
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+from .config import VINTAGES_DIR, REGIONS
+from .regions import resolve_region
+from .instrumentation import instrumented
+
+KEY = ['Indicador', 'Region', 'Periodo']
+
+# Some workbooks split one indicator over several sheets
+SPLIT_SHEETS = {'ECO_PIT_ESP_AND': 'ECO_PIT', 'ECO_PIT_REGIONAL': 'ECO_PIT'}
+
+class VintageStore:
+    """
+    Revision history of indicator values as a partitioned Parquet dataset:
+    <root>/vintage=YYYYMMDD/part-N.parquet holds only the (Indicador, Region, Periodo)
+    cells that changed in that vintage. Deleted cells are stored with Borrado=True.
+    """
+
+    def __init__(self, root=VINTAGES_DIR, tol=1e-4):
+        self.root = root
+        self.tol = tol
+
+    def vintages(self):
+        """Sorted list of stored vintage dates (YYYYMMDD)."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d.split('=', 1)[1] for d in os.listdir(self.root) if d.startswith('vintage='))
+
+    def _parts(self, vintage):
+        parts = glob.glob(os.path.join(self.root, f"vintage={vintage}", "part-*.parquet"))
+        return sorted(parts, key=lambda p: int(re.search(r"part-(\d+)", p).group(1)))
+
+    def deltas(self, upto=None, since=None):
+        """Stored change rows with their Vintage, optionally restricted to since < vintage <= upto."""
+        frames = []
+        for v in self.vintages():
+            if (upto and v > upto) or (since and v <= since):
+                continue
+            for part in self._parts(v):
+                frames.append(pd.read_parquet(part).assign(Vintage=v))
+        if not frames:
+            return pd.DataFrame(columns=KEY + ['Valor', 'Borrado', 'Vintage'])
+        return pd.concat(frames, ignore_index=True)
+
+    def as_of(self, vintage=None):
+        """State of every cell as published in vintage (default: latest)."""
+        d = self.deltas(upto=vintage)
+        # Parts are read in (vintage, part) order, so the last row per key is the newest
+        d = d.drop_duplicates(subset=KEY, keep='last')
+        return d[~d['Borrado'].astype(bool)][KEY + ['Valor']].reset_index(drop=True)
+
+    def _diff(self, old, new, indicators=None):
+        """Cells that differ between two states (joined on the key index)."""
+        if indicators is not None:
+            old = old[old['Indicador'].isin(indicators)]
+        m = old.merge(new, on=KEY, how='outer', suffixes=('_Anterior', ''), indicator=True)
+        a, b = m['Valor_Anterior'].to_numpy(float), m['Valor'].to_numpy(float)
+        revised = (m['_merge'] == 'both') & ~((np.abs(a - b) <= self.tol) | (np.isnan(a) & np.isnan(b)))
+        m['Tipo'] = np.select([m['_merge'] == 'right_only', m['_merge'] == 'left_only', revised],
+                              ['Nuevo', 'Borrado', 'Revisado'], default='')
+        return m[m['Tipo'] != ''].drop(columns='_merge').reset_index(drop=True)
+
+    def changes(self, df_long, vintage=None):
+        """Compares fresh long rows (Indicador, Region, Periodo, Valor) with the stored state."""
+        new = _as_cells(df_long)
+        return self._diff(self.as_of(vintage), new, indicators=new['Indicador'].unique())
+
+    @instrumented()
+    def commit(self, df_long, vintage=None):
+        """
+        Stores the cells of df_long that changed since the state as of vintage. Returns the changes.
+        Vintages are deltas on the previous one, so a vintage older than the latest stored one is
+        rejected (ValueError): the deltas stored after it would no longer apply.
+        """
+        vintage = vintage or pd.Timestamp.now().strftime('%Y%m%d')
+        stored = self.vintages()
+        if stored and vintage < stored[-1]:
+            raise ValueError(f"Vintage {vintage} is older than the latest stored one ({stored[-1]}); "
+                             "vintages must be committed in date order")
+        diff = self.changes(df_long, vintage)
+        if diff.empty:
+            return diff
+        out = pd.DataFrame({
+            'Indicador': diff['Indicador'].astype(str),
+            'Region': diff['Region'].astype(str),
+            'Periodo': diff['Periodo'].astype(str),
+            'Valor': diff['Valor'].astype(float),
+            'Borrado': (diff['Tipo'] == 'Borrado').to_numpy()
+        })
+        folder = os.path.join(self.root, f"vintage={vintage}")
+        os.makedirs(folder, exist_ok=True)
+        out.to_parquet(os.path.join(folder, f"part-{len(self._parts(vintage))}.parquet"), index=False)
+        return diff
+
+    def revisions(self, v_from, v_to=None):
+        """Cell-level revisions between two vintages."""
+        return self._diff(self.as_of(v_from), self.as_of(v_to))
+
+    @staticmethod
+    def summary(diff, indicators=()):
+        """{indicator: 'Nuevo; Revisado' / '-'} in the spirit of the notebook's comparar_con_anterior."""
+        status = {acr: '-' for acr in indicators}
+        for acr, tipos in diff.groupby('Indicador')['Tipo']:
+            status[acr] = '; '.join(sorted(tipos.unique()))
+        return status
+
+def _as_cells(df):
+    cells = pd.DataFrame({
+        'Indicador': df['Indicador'].astype(str).values,
+        'Region': df['Region'].astype(str).values,
+        'Periodo': df['Periodo'].astype(str).values,
+        'Valor': pd.to_numeric(df['Valor'], errors='coerce').values
+    })
+    return cells.drop_duplicates(subset=KEY)
+
+def _region_code(label):
+    label = str(label).strip()
+    return label if label in REGIONS else resolve_region(label)
+
+def _normalize_period(p):
+    p = str(p).strip()
+    m = re.match(r"^(\d{4})-(\d{2})(?:-\d{2}.*)?$", p)
+    return f"{m.group(1)}-M{m.group(2)}" if m else p
+
+def read_vintage_workbook(path):
+    """Long cells from an ipa27_raw_YYYYMMDD.xlsx (per-indicator or per-frequency sheet layouts)."""
+    frames = []
+    with pd.ExcelFile(path) as xls:
+        for sheet in xls.sheet_names:
+            if sheet == 'LEER':
+                continue
+            wide = pd.read_excel(xls, sheet_name=sheet)
+            if 'Periodo' not in wide.columns:
+                continue
+            long = wide.melt(id_vars='Periodo', var_name='Columna', value_name='Valor').dropna(subset=['Valor'])
+            if sheet in ('MENSUAL', 'TRIMESTRAL', 'ANUAL'):
+                # Columns named <ACRONYM>_<REGION>
+                split = long['Columna'].astype(str).str.rsplit('_', n=1, expand=True)
+                long['Indicador'], long['Region'] = split[0], split[1].map(_region_code)
+            else:
+                long['Indicador'] = SPLIT_SHEETS.get(sheet, sheet)
+                long['Region'] = long['Columna'].map(_region_code)
+            frames.append(long[long['Region'].notna()])
+    if not frames:
+        return pd.DataFrame(columns=KEY + ['Valor'])
+    cells = pd.concat(frames, ignore_index=True)
+    cells['Periodo'] = cells['Periodo'].map(_normalize_period)
+    return _as_cells(cells)
+
+def import_excel_vintages(store, pattern=None):
+    """
+    Loads the legacy ipa27_raw_YYYYMMDD*.xlsx workbooks into the store, oldest first. Workbooks
+    older than the latest stored vintage cannot be added (see VintageStore.commit) and are skipped.
+    """
+    pattern = pattern or os.path.join(os.path.dirname(store.root), "ipa27_raw_*.xlsx")
+    files = sorted(f for f in glob.glob(pattern) if not os.path.basename(f).startswith('~$'))
+    done = set(store.vintages())
+    for path in files:
+        m = re.search(r"(\d{8})", os.path.basename(path))
+        if not m or m.group(1) in done:
+            continue
+        latest = store.vintages()[-1] if store.vintages() else None
+        if latest and m.group(1) < latest:
+            print(f"   ⚠️ {os.path.basename(path)}: older than the stored vintage {latest}, not imported")
+            continue
+        diff = store.commit(read_vintage_workbook(path), vintage=m.group(1))
+        print(f"   ✅ {os.path.basename(path)}: {len(diff)} changed cells")